@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Measure the time taken to simulate networks of wide logic gates.
+
+Compares the truth-table gate evaluation of network.Network against the
+gate-by-gate evaluation of execute_gate, on layered networks of 16-input
+AND, OR, NAND and NOR gates driven by switches that change every cycle.
+
+Usage
+-----
+Show help: bench_gates.py -h
+Run the benchmark: bench_gates.py [-n <number of gates>] [-c <cycles>]
+"""
+import getopt
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from names import Names  # noqa: E402
+from devices import Devices  # noqa: E402
+from network import Network  # noqa: E402
+
+
+class ReferenceNetwork(Network):
+    """Simulate each logic gate with execute_gate."""
+
+    def execute_gates(self):
+        """Simulate every logic gate with execute_gate, kind by kind."""
+        gate_signals = [
+            (self.devices.AND, self.devices.HIGH, self.devices.HIGH),
+            (self.devices.OR, self.devices.LOW, self.devices.LOW),
+            (self.devices.NAND, self.devices.HIGH, self.devices.LOW),
+            (self.devices.NOR, self.devices.LOW, self.devices.HIGH),
+            (self.devices.XOR, None, None)]
+        for (device_kind, x, y) in gate_signals:
+            for device_id in self.devices.find_devices(device_kind):
+                if not self.execute_gate(device_id, x, y):
+                    return False
+        return True
+
+
+def make_network(network_class, number, seed):
+    """Return a layered network of number 16-input gates and its switches.
+
+    Each layer of gates takes its inputs from random outputs of the layer
+    before, and the first layer from 64 switches.
+    """
+    random.seed(seed)
+    names = Names()
+    devices = Devices(names)
+    network = network_class(names, devices)
+    input_ids = names.lookup(["".join(["I", str(i)]) for i in range(1, 17)])
+    gate_kinds = [devices.AND, devices.OR, devices.NAND, devices.NOR]
+
+    switch_ids = names.lookup(["".join(["sw", str(i)]) for i in range(64)])
+    for switch_id in switch_ids:
+        devices.make_device(switch_id, devices.SWITCH,
+                            [random.choice([0, 1])])
+
+    layer_width = 64
+    previous_layer = switch_ids
+    gate_number = 0
+    while gate_number < number:
+        layer = []
+        for _ in range(min(layer_width, number - gate_number)):
+            [gate_id] = names.lookup(["".join(["g", str(gate_number)])])
+            devices.make_device(gate_id, random.choice(gate_kinds), [16])
+            for input_id in input_ids:
+                network.make_connection(random.choice(previous_layer), None,
+                                        gate_id, input_id)
+            layer.append(gate_id)
+            gate_number += 1
+        previous_layer = layer
+    return network, switch_ids
+
+
+def measure(network_class, number, cycles):
+    """Return the seconds per cycle and the final gate outputs."""
+    network, switch_ids = make_network(network_class, number, 0)
+    devices = network.devices
+    start_time = time.perf_counter()
+    for _ in range(cycles):
+        # Toggle a few switches each cycle to keep the gates busy
+        for switch_id in random.sample(switch_ids, 8):
+            switch = devices.get_device(switch_id)
+            devices.set_switch(switch_id, 1 - switch.switch_state)
+        if not network.execute_network():
+            print("Error! Network oscillating.")
+            sys.exit()
+    elapsed_time = time.perf_counter() - start_time
+    outputs = [device.outputs.get(None) for device in devices.devices_list]
+    return elapsed_time / cycles, outputs
+
+
+def main(arg_list):
+    """Parse the command line options and print the benchmark results."""
+    usage_message = ("Usage:\n"
+                     "Show help: bench_gates.py -h\n"
+                     "Run the benchmark: bench_gates.py "
+                     "[-n <number of gates>] [-c <cycles>]")
+    try:
+        options, arguments = getopt.getopt(arg_list, "hn:c:")
+    except getopt.GetoptError:
+        print("Error: invalid command line arguments\n")
+        print(usage_message)
+        sys.exit()
+
+    number = 500
+    cycles = 10
+    for option, value in options:
+        if option == "-h":
+            print(usage_message)
+            sys.exit()
+        elif option == "-n":
+            number = int(value)
+        elif option == "-c":
+            cycles = int(value)
+
+    print("".join(["Simulating ", str(number), " 16-input gates for ",
+                   str(cycles), " cycles"]))
+    print("{:<20}{:>16}".format("gate evaluation", "ms/cycle"))
+    results = []
+    for name, network_class in [("execute_gate", ReferenceNetwork),
+                                ("truth tables", Network)]:
+        cycle_time, outputs = measure(network_class, number, cycles)
+        results.append(outputs)
+        print("{:<20}{:>16.2f}".format(name, 1000 * cycle_time))
+    if results[0] != results[1]:
+        print("Error! The gate outputs differ.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
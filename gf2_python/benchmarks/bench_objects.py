@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Measure the memory and allocation time of devices and symbols.
+
+Compares the slotted devices.Device and scanner.Symbol classes against
+equivalent classes that store their properties in a per-instance dictionary.
+
+Usage
+-----
+Show help: bench_objects.py -h
+Run the benchmark: bench_objects.py [-n <number of objects>]
+"""
+import getopt
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from devices import Device  # noqa: E402
+from scanner import Symbol  # noqa: E402
+
+
+class DictDevice:
+    """Store device properties in a per-instance dictionary."""
+
+    __init__ = Device.__init__
+
+
+class DictSymbol:
+    """Store symbol properties in a per-instance dictionary."""
+
+    __init__ = Symbol.__init__
+
+
+def measure(make_object, number):
+    """Return the bytes per object and seconds taken to make number objects.
+
+    The objects are kept alive until they have all been made, as the
+    devices in a network or the symbols of a parse would be.
+    """
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    objects = [make_object(object_id) for object_id in range(number)]
+    elapsed_time = time.perf_counter() - start_time
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size / number, elapsed_time
+
+
+def main(arg_list):
+    """Parse the command line options and print the benchmark results."""
+    usage_message = ("Usage:\n"
+                     "Show help: bench_objects.py -h\n"
+                     "Run the benchmark: bench_objects.py "
+                     "[-n <number of objects>]")
+    try:
+        options, arguments = getopt.getopt(arg_list, "hn:")
+    except getopt.GetoptError:
+        print("Error: invalid command line arguments\n")
+        print(usage_message)
+        sys.exit()
+
+    number = 1000000
+    for option, value in options:
+        if option == "-h":
+            print(usage_message)
+            sys.exit()
+        elif option == "-n":
+            number = int(value)
+
+    print("".join(["Making ", str(number), " objects of each class"]))
+    print("{:<12}{:>16}{:>16}".format("class", "bytes/object", "seconds"))
+    for name, make_object in [("Device", Device),
+                              ("DictDevice", DictDevice),
+                              ("Symbol", lambda _: Symbol()),
+                              ("DictSymbol", lambda _: DictSymbol())]:
+        size, elapsed_time = measure(make_object, number)
+        print("{:<12}{:>16.1f}{:>16.3f}".format(name, size, elapsed_time))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
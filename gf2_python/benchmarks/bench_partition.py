@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Measure the speed-up of simulating partitions in parallel processes.
+
+Generates networks of loosely coupled blocks of logic gates, divides them
+into one partition per worker process, and compares the time per cycle with
+that of the serial network.Network, for each number of workers up to the
+number of processor cores.
+
+Usage
+-----
+Show help: bench_partition.py -h
+Run the benchmark: bench_partition.py [-b <blocks>] [-g <gates per block>]
+                   [-c <cycles>] [-p <maximum workers>]
+"""
+import getopt
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from names import Names  # noqa: E402
+from devices import Devices  # noqa: E402
+from network import Network  # noqa: E402
+from partition import Partitioner, ParallelNetwork  # noqa: E402
+
+
+def make_network(blocks, gates, seed):
+    """Return a network of blocks of gates and its switches.
+
+    Each block has eight switches and gates with 2 to 4 inputs, each
+    driven by earlier gates or switches of the block. The first gates of
+    each block also read two gates of the block before.
+    """
+    random.seed(seed)
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    input_ids = names.lookup(["I1", "I2", "I3", "I4"])
+    gate_kinds = [devices.AND, devices.OR, devices.NAND, devices.NOR]
+
+    switch_ids = []
+    previous_gates = None
+    for block in range(blocks):
+        prefix = "".join(["b", str(block), "_"])
+        block_switches = names.lookup([prefix + "sw" + str(i)
+                                       for i in range(8)])
+        for switch_id in block_switches:
+            devices.make_device(switch_id, devices.SWITCH,
+                                [random.choice([0, 1])])
+        switch_ids.extend(block_switches)
+
+        drivers = list(block_switches)
+        gate_ids = names.lookup([prefix + "g" + str(i) for i in range(gates)])
+        for index, gate_id in enumerate(gate_ids):
+            no_of_inputs = random.randint(2, 4)
+            devices.make_device(gate_id, random.choice(gate_kinds),
+                                [no_of_inputs])
+            for input_id in input_ids[:no_of_inputs]:
+                if index < 2 and input_id == input_ids[0] and \
+                        previous_gates is not None:
+                    driver_id = random.choice(previous_gates)
+                else:
+                    driver_id = random.choice(drivers[-64:])
+                network.make_connection(driver_id, None, gate_id, input_id)
+            drivers.append(gate_id)
+        previous_gates = gate_ids
+    return names, devices, network, switch_ids
+
+
+def measure(blocks, gates, cycles, workers):
+    """Return the seconds per cycle and the final outputs.
+
+    The network is simulated serially if workers is None.
+    """
+    names, devices, network, switch_ids = make_network(blocks, gates, 0)
+    if workers is None:
+        simulator = network
+    else:
+        partitions = Partitioner(names, devices, network).partition(workers)
+        simulator = ParallelNetwork(names, devices, network, partitions)
+        simulator.start()
+    try:
+        start_time = time.perf_counter()
+        for _ in range(cycles):
+            # Toggle a few switches each cycle to keep the gates busy
+            for switch_id in random.sample(switch_ids, blocks):
+                switch = devices.get_device(switch_id)
+                devices.set_switch(switch_id, 1 - switch.switch_state)
+            if not simulator.execute_network():
+                print("Error! Network oscillating.")
+                sys.exit()
+        elapsed_time = time.perf_counter() - start_time
+    finally:
+        if workers is not None:
+            simulator.stop()
+    outputs = [device.outputs.get(None) for device in devices.devices_list]
+    return elapsed_time / cycles, outputs
+
+
+def main(arg_list):
+    """Parse the command line options and print the benchmark results."""
+    usage_message = ("Usage:\n"
+                     "Show help: bench_partition.py -h\n"
+                     "Run the benchmark: bench_partition.py [-b <blocks>] "
+                     "[-g <gates per block>] [-c <cycles>] "
+                     "[-p <maximum workers>]")
+    try:
+        options, arguments = getopt.getopt(arg_list, "hb:g:c:p:")
+    except getopt.GetoptError:
+        print("Error: invalid command line arguments\n")
+        print(usage_message)
+        sys.exit()
+
+    blocks = 8
+    gates = 2000
+    cycles = 20
+    max_workers = os.cpu_count() or 1
+    for option, value in options:
+        if option == "-h":
+            print(usage_message)
+            sys.exit()
+        elif option == "-b":
+            blocks = int(value)
+        elif option == "-g":
+            gates = int(value)
+        elif option == "-c":
+            cycles = int(value)
+        elif option == "-p":
+            max_workers = int(value)
+
+    print("".join(["Simulating ", str(blocks), " blocks of ", str(gates),
+                   " gates for ", str(cycles), " cycles on ",
+                   str(os.cpu_count()), " cores"]))
+    print("{:<10}{:>16}{:>12}".format("workers", "ms/cycle", "speed-up"))
+    serial_time, serial_outputs = measure(blocks, gates, cycles, None)
+    print("{:<10}{:>16.2f}{:>12.2f}".format("serial", 1000 * serial_time,
+                                            1.0))
+    for workers in range(1, max_workers + 1):
+        cycle_time, outputs = measure(blocks, gates, cycles, workers)
+        print("{:<10}{:>16.2f}{:>12.2f}".format(
+            workers, 1000 * cycle_time, serial_time / cycle_time))
+        if outputs != serial_outputs:
+            print("Error! The outputs differ.")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
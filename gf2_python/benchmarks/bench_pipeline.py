@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Measure each phase of the simulator on generated circuits of growing size.
+
+Generates random networks, ripple-carry adders and shift registers with
+generator.CircuitGenerator, and times the phases of loading and running
+each of them:
+
+names - interning every name in the file with Names.lookup.
+scan - reading every symbol of the file with the Scanner.
+parse - Parser.parse_network, which scans the file and builds the network.
+devices - making every device of the parsed network again.
+execute - running the network with Network.execute_network.
+record - recording the monitored signals with Monitors.record_signals.
+
+The time of each phase is the least of several repeats, and its peak memory
+is measured in one more run under tracemalloc. The results are written as
+JSON and compared with a stored baseline, and phases that are slower or use
+more memory than the baseline by more than the threshold are listed as
+regressions. Times depend on the machine, so a baseline is only comparable
+with results from the machine it was made on.
+
+Usage
+-----
+Show help: bench_pipeline.py -h
+Run the benchmark: bench_pipeline.py [-n <sizes>] [-c <cycles>]
+                   [-r <repeats>] [-o <output path>]
+Compare with a baseline: bench_pipeline.py -b <baseline path>
+                         [-t <threshold>] ...
+Store the results as the baseline: bench_pipeline.py -w <baseline path> ...
+
+The sizes are a comma separated list, such as 2,4,8. The exit status is
+1 if there are regressions.
+"""
+import getopt
+import json
+import os
+import pickle
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from names import Names  # noqa: E402
+from devices import Devices  # noqa: E402
+from network import Network  # noqa: E402
+from monitors import Monitors  # noqa: E402
+from scanner import Scanner  # noqa: E402
+from parse import Parser  # noqa: E402
+from generator import CircuitGenerator  # noqa: E402
+
+PHASES = ["names", "scan", "parse", "devices", "execute", "record"]
+
+# Changes smaller than these are noise rather than regressions
+MINIMUM_CHANGES = {"seconds": 0.005, "peak_bytes": 1024}
+
+
+def make_circuits(sizes, seed=0):
+    """Return a list of (name, text) of the circuits of each size."""
+    circuits = []
+    for size in sizes:
+        generator = CircuitGenerator(seed)
+        circuits.append(("".join(["dag-", str(4 * size)]),
+                         generator.make_random_dag(4 * size)))
+        circuits.append(("".join(["ripple-", str(size)]),
+                         generator.make_ripple_adder(size)))
+        circuits.append(("".join(["shift-", str(size)]),
+                         CircuitGenerator(seed, 8).make_shift_register(size)))
+    return circuits
+
+
+def parse(path):
+    """Return [names, devices, network, monitors] parsed from the file."""
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    scanner = Scanner(path, names)
+    parser = Parser(names, devices, network, monitors, scanner)
+    if not parser.parse_network():
+        raise ValueError("".join(["cannot parse ", path]))
+    scanner.close_file()
+    return [names, devices, network, monitors]
+
+
+def get_phases(path, cycles):
+    """Return {phase: (setup, run)} for the circuit in the file at path.
+
+    setup() returns the argument of run(), which carries out the phase, so
+    that only run() is measured.
+    """
+    with open(path) as circuit_file:
+        strings = re.findall("[A-Za-z][A-Za-z0-9]*", circuit_file.read())
+
+    def scan(names):
+        scanner = Scanner(path, names)
+        while scanner.get_symbol().type != scanner.EOF:
+            pass
+        scanner.close_file()
+
+    # Later phases start from copies of one parse
+    snapshot = pickle.dumps(parse(path))
+
+    def get_properties():
+        names, devices, network, monitors = pickle.loads(snapshot)
+        properties = [(device.device_id, device.device_kind,
+                       devices.get_device_property(device.device_id))
+                      for device in devices.devices_list]
+        return names, properties
+
+    def make_devices(arguments):
+        names, properties = arguments
+        devices = Devices(names)
+        for device_id, device_kind, device_property in properties:
+            devices.make_device(device_id, device_kind, device_property)
+
+    def execute(network):
+        for _ in range(cycles):
+            network.execute_network()
+
+    def record(monitors):
+        for _ in range(cycles):
+            monitors.record_signals()
+
+    return {"names": (lambda: Names(), lambda names: names.lookup(strings)),
+            "scan": (lambda: Names(), scan),
+            "parse": (lambda: path, parse),
+            "devices": (get_properties, make_devices),
+            "execute": (lambda: pickle.loads(snapshot)[2], execute),
+            "record": (lambda: pickle.loads(snapshot)[3], record)}
+
+
+def measure(setup, run, repeats):
+    """Return the least time in seconds and the peak memory of a phase."""
+    times = []
+    for _ in range(repeats):
+        argument = setup()
+        start_time = time.perf_counter()
+        run(argument)
+        times.append(time.perf_counter() - start_time)
+    argument = setup()
+    tracemalloc.start()
+    run(argument)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def run_benchmark(sizes, cycles, repeats):
+    """Return {circuit: {phase: {"seconds": s, "peak_bytes": b}}}."""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, text in make_circuits(sizes):
+            path = os.path.join(directory, "".join([name, ".txt"]))
+            with open(path, "w") as circuit_file:
+                circuit_file.write(text)
+            phases = get_phases(path, cycles)
+            results[name] = {}
+            for phase in PHASES:
+                setup, run = phases[phase]
+                seconds, peak = measure(setup, run, repeats)
+                results[name][phase] = {"seconds": seconds,
+                                        "peak_bytes": peak}
+    return results
+
+
+def get_regressions(results, baseline, threshold):
+    """Return the phases that are worse than the baseline by the threshold.
+
+    Each regression is a dictionary of the circuit, phase, measure, and the
+    baseline and current values. Changes below MINIMUM_CHANGES, and
+    circuits and phases missing from the baseline, are skipped.
+    """
+    regressions = []
+    for circuit, phases in results.items():
+        for phase, measures in phases.items():
+            old_measures = baseline.get(circuit, {}).get(phase)
+            if old_measures is None:
+                continue
+            for measure_name, value in measures.items():
+                old_value = old_measures.get(measure_name)
+                if old_value is not None and \
+                        value > old_value * (1 + threshold) and \
+                        value - old_value >= MINIMUM_CHANGES[measure_name]:
+                    regressions.append({"circuit": circuit, "phase": phase,
+                                        "measure": measure_name,
+                                        "baseline": old_value,
+                                        "current": value})
+    return regressions
+
+
+def main(arg_list):
+    """Parse the command line options and write the benchmark results."""
+    usage_message = ("Usage:\n"
+                     "Show help: bench_pipeline.py -h\n"
+                     "Run the benchmark: bench_pipeline.py [-n <sizes>] "
+                     "[-c <cycles>] [-r <repeats>] [-o <output path>]\n"
+                     "Compare with a baseline: bench_pipeline.py "
+                     "-b <baseline path> [-t <threshold>] ...\n"
+                     "Store the results as the baseline: bench_pipeline.py "
+                     "-w <baseline path> ...")
+    try:
+        options, arguments = getopt.getopt(arg_list, "hn:c:r:o:b:t:w:")
+    except getopt.GetoptError:
+        print("Error: invalid command line arguments\n")
+        print(usage_message)
+        sys.exit()
+
+    sizes = [2, 4, 8]
+    cycles = 500
+    repeats = 3
+    threshold = 0.25
+    option_values = {}
+    for option, value in options:
+        if option == "-h":
+            print(usage_message)
+            sys.exit()
+        elif option == "-n":
+            sizes = [int(size) for size in value.split(",")]
+        elif option == "-c":
+            cycles = int(value)
+        elif option == "-r":
+            repeats = int(value)
+        elif option == "-t":
+            threshold = float(value)
+        else:
+            option_values[option] = value
+
+    report = {"sizes": sizes, "cycles": cycles, "repeats": repeats,
+              "results": run_benchmark(sizes, cycles, repeats)}
+    if "-b" in option_values:
+        with open(option_values["-b"]) as baseline_file:
+            baseline = json.load(baseline_file)
+        report["threshold"] = threshold
+        report["regressions"] = get_regressions(
+            report["results"], baseline["results"], threshold)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if "-o" in option_values:
+        with open(option_values["-o"], "w") as output_file:
+            output_file.write(text + "\n")
+    else:
+        print(text)
+    if "-w" in option_values:
+        with open(option_values["-w"], "w") as baseline_file:
+            json.dump({"sizes": sizes, "cycles": cycles, "repeats": repeats,
+                       "results": report["results"]}, baseline_file,
+                      indent=2, sort_keys=True)
+            baseline_file.write("\n")
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Check that each phase of the simulator scales linearly with circuit size.
+
+Times the phases of bench_pipeline.py on random networks whose numbers of
+gates form a geometric series, and fits the exponent k of time = c size^k
+by least squares on the logarithms. A phase fails if its exponent is above
+the limit, which catches code that has become quadratic in the size of the
+network, such as searching a list for every device or name, or reading the
+whole file for every symbol. The network is run once before the execute
+phase is timed, so that only the steady state is measured.
+
+Usage
+-----
+Show help: bench_scaling.py -h
+Run the check: bench_scaling.py [-s <smallest number of gates>]
+               [-f <factor>] [-k <number of sizes>] [-r <repeats>]
+               [-l <limit>]
+
+The exit status is 1 if any phase fails.
+"""
+import getopt
+import math
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from generator import CircuitGenerator  # noqa: E402
+from bench_pipeline import PHASES, get_phases, measure  # noqa: E402
+
+
+def fit_exponent(sizes, times):
+    """Return the exponent k that best fits time = c size^k."""
+    log_sizes = [math.log(size) for size in sizes]
+    log_times = [math.log(max(time, 1e-9)) for time in times]
+    mean_size = sum(log_sizes) / len(log_sizes)
+    mean_time = sum(log_times) / len(log_times)
+    covariance = sum((log_size - mean_size) * (log_time - mean_time)
+                     for log_size, log_time in zip(log_sizes, log_times))
+    variance = sum((log_size - mean_size) ** 2 for log_size in log_sizes)
+    return covariance / variance
+
+
+def get_warm_setup(setup, run):
+    """Return a setup that also runs the phase once before it is timed.
+
+    The first cycles of a network take many more passes to settle than
+    later ones, and their share of the time depends on the circuit rather
+    than on its size.
+    """
+    def warm_setup():
+        argument = setup()
+        run(argument)
+        return argument
+    return warm_setup
+
+
+def get_times(sizes, cycles, repeats, seed=0):
+    """Return {phase: [seconds]} for random networks of each size."""
+    times = {phase: [] for phase in PHASES}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, "".join(["dag", str(size),
+                                                    ".txt"]))
+            with open(path, "w") as circuit_file:
+                circuit_file.write(
+                    CircuitGenerator(seed).make_random_dag(size))
+            phases = get_phases(path, cycles)
+            for phase in PHASES:
+                setup, run = phases[phase]
+                if phase == "execute":
+                    setup = get_warm_setup(setup, run)
+                seconds, _ = measure(setup, run, repeats)
+                times[phase].append(seconds)
+    return times
+
+
+def main(arg_list):
+    """Parse the command line options and print the fitted exponents."""
+    usage_message = ("Usage:\n"
+                     "Show help: bench_scaling.py -h\n"
+                     "Run the check: bench_scaling.py "
+                     "[-s <smallest number of gates>] [-f <factor>] "
+                     "[-k <number of sizes>] [-r <repeats>] [-l <limit>]")
+    try:
+        options, arguments = getopt.getopt(arg_list, "hs:f:k:r:l:")
+    except getopt.GetoptError:
+        print("Error: invalid command line arguments\n")
+        print(usage_message)
+        sys.exit()
+
+    smallest = 250
+    factor = 2
+    count = 4
+    repeats = 5
+    limit = 1.2
+    for option, value in options:
+        if option == "-h":
+            print(usage_message)
+            sys.exit()
+        elif option == "-s":
+            smallest = int(value)
+        elif option == "-f":
+            factor = float(value)
+        elif option == "-k":
+            count = int(value)
+        elif option == "-r":
+            repeats = int(value)
+        elif option == "-l":
+            limit = float(value)
+
+    sizes = [int(smallest * factor ** step) for step in range(count)]
+    times = get_times(sizes, 20, repeats)
+    print("".join(["Gates: ", ", ".join(str(size) for size in sizes)]))
+    print("{:<10}{:>12}{:>10}".format("phase", "exponent", "result"))
+    failed = False
+    for phase in PHASES:
+        exponent = fit_exponent(sizes, times[phase])
+        result = "ok" if exponent <= limit else "FAIL"
+        failed = failed or exponent > limit
+        print("{:<10}{:>12.2f}{:>10}".format(phase, exponent, result))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
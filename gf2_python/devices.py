@@ -23,6 +23,13 @@ class Device:
     No public methods.
     """
 
+    # Store the properties in fixed slots rather than a per-instance
+    # dictionary, as large networks hold millions of devices
+    __slots__ = ("device_id", "inputs", "outputs", "bus_inputs",
+                 "bus_outputs", "bus_width", "device_kind",
+                 "clock_half_period", "clock_counter", "switch_state",
+                 "dtype_memory", "siggen_signal", "siggen_counter")
+
     def __init__(self, device_id):
         """Initialise device properties."""
         self.device_id = device_id
@@ -34,6 +41,14 @@ class Device:
         # outputs dictionary stores {output_id: output_signal}
         self.outputs = {}
 
+        # Bus devices only. bus_inputs dictionary stores
+        # {input_id: [(first_bit, width, connected_output_device_id,
+        #              connected_output_port_id, connected_output_bit)]}
+        # and bus_outputs dictionary stores {output_id: output_word}
+        self.bus_inputs = None
+        self.bus_outputs = None
+        self.bus_width = None
+
         self.device_kind = None
         self.clock_half_period = None
         self.clock_counter = None
@@ -64,6 +79,12 @@ class Devices:
     add_device(self, device_id, device_kind): Adds the specified device to the
                                               network.
 
+    remove_device(self, device_id): Removes the specified device from the
+                                    network.
+
+    get_device_property(self, device_id): Returns the property the specified
+                                          device was made with.
+
     add_input(self, device_id, input_id): Adds the specified input to the
                                           specified device.
 
@@ -76,9 +97,27 @@ class Devices:
     get_signal_ids(self, signal_name): Returns the device and output IDs of
                                        the specified signal.
 
+    add_bus_input(self, device_id, input_id): Adds the specified bus input
+                                              to the specified device.
+
+    add_bus_output(self, device_id, output_id, word=0): Adds the specified
+                                          bus output to the specified device.
+
+    make_bit_port(self, port_id, bit): Returns the port ID of a single bit of
+                                       the specified bus port.
+
+    get_bit_port(self, port_id): Returns the bus port ID and bit of a bit
+                                 port ID, or None.
+
+    is_output(self, device_id, port_id): Returns True if the port is an
+                                         output or a bit of a bus output.
+
     set_switch(self, device_id, signal): Sets switch_state of specified device
                                          to signal.
 
+    fix_switches(self, device_ids): Marks the given switches as constant, so
+                                    that the logic they decide is folded.
+
     make_switch(self, device_id, initial_state): Makes a switch device and sets
                                                  its initial state.
 
@@ -93,7 +132,13 @@ class Devices:
 
     make_d_type(self, device_id): Makes a D-type device.
 
-    cold_startup(self): Simulates cold start-up of D-types and clocks.
+    make_register(self, device_id, width): Makes a bus register device.
+
+    make_bus_gate(self, device_id, device_kind, width): Makes a two-input
+                                       logic gate over buses of given width.
+
+    cold_startup(self, device_id=None): Simulates cold start-up of D-types
+                                        and clocks.
 
     make_device(self, device_id, device_kind, device_property=None): Creates
                        the specified device and returns errors if unsuccessful.
@@ -104,11 +149,15 @@ class Devices:
         self.names = names
 
         self.devices_list = []
+        # devices_dictionary stores {device_id: Device}, so that devices are
+        # found without searching the list
+        self.devices_dictionary = {}
 
         gate_strings = ["AND", "OR", "NAND", "NOR", "XOR"]
         device_strings = ["CLOCK", "SWITCH", "DTYPE", "SIGGEN"]
         dtype_inputs = ["CLK", "SET", "CLEAR", "DATA"]
         dtype_outputs = ["Q", "QBAR"]
+        bus_gate_strings = ["BAND", "BOR", "BNAND", "BNOR", "BXOR"]
 
         [self.NO_ERROR, self.INVALID_QUALIFIER, self.NO_QUALIFIER,
          self.BAD_DEVICE, self.QUALIFIER_PRESENT,
@@ -125,15 +174,34 @@ class Devices:
                                 self.DATA_ID] = self.names.lookup(dtype_inputs)
         self.dtype_output_ids = [
             self.Q_ID, self.QBAR_ID] = self.names.lookup(dtype_outputs)
+        self.bus_gate_types = [self.BAND, self.BOR, self.BNAND, self.BNOR,
+                               self.BXOR] = self.names.lookup(bus_gate_strings)
+        [self.REG] = self.names.lookup(["REG"])
+        self.bus_gate_input_ids = self.names.lookup(["I1", "I2"])
+        self.bus_types = [self.REG] + self.bus_gate_types
+
+        # bit_ports dictionary stores {bit_port_id: (bus_port_id, bit)}
+        self.bit_ports = {}
 
         self.max_gate_inputs = 16
+        self.max_bus_width = 64
+
+        # Counts the devices added and removed, so that anything compiled
+        # from the devices list can tell when it is out of date
+        self.device_changes = 0
+
+        # Counts the start-ups, which set the memory of the D-types without
+        # executing them
+        self.startup_changes = 0
+
+        # The IDs of the switches treated as constants, and the number of
+        # times the set has changed
+        self.fixed_switches = set()
+        self.fixed_switch_changes = 0
 
     def get_device(self, device_id):
         """Return the Device object corresponding to device_id."""
-        for device in self.devices_list:
-            if device.device_id == device_id:
-                return device
-        return None
+        return self.devices_dictionary.get(device_id)
 
     def find_devices(self, device_kind=None):
         """Return a list of device IDs of the specified device_kind.
@@ -154,6 +222,45 @@ class Devices:
         new_device = Device(device_id)
         new_device.device_kind = device_kind
         self.devices_list.append(new_device)
+        self.devices_dictionary[device_id] = new_device
+        self.device_changes += 1
+
+    def remove_device(self, device_id):
+        """Remove the specified device from the network.
+
+        Return True if successful. Connections to the device's outputs are
+        left for the caller to replace.
+        """
+        device = self.get_device(device_id)
+        if device is None:
+            return False
+        self.devices_list.remove(device)
+        del self.devices_dictionary[device_id]
+        self.device_changes += 1
+        return True
+
+    def get_device_property(self, device_id):
+        """Return the property the specified device was made with.
+
+        The property is in the form make_device takes, using the current
+        state of a switch. Return None if the device has no property or does
+        not exist.
+        """
+        device = self.get_device(device_id)
+        if device is None:
+            return None
+        elif device.device_kind == self.SWITCH:
+            return [device.switch_state]
+        elif device.device_kind == self.CLOCK:
+            return [device.clock_half_period]
+        elif device.device_kind == self.SIGGEN:
+            return list(device.siggen_signal)
+        elif device.device_kind in self.bus_types:
+            return [device.bus_width]
+        elif device.device_kind in self.gate_types and \
+                device.device_kind != self.XOR:
+            return [len(device.inputs)]
+        return None
 
     def add_input(self, device_id, input_id):
         """Add the specified input to the specified device.
@@ -188,20 +295,36 @@ class Devices:
         device = self.get_device(device_id)
         if device is not None:
             device_name = self.names.get_name_string(device_id)
+            bus_ports = list(device.bus_inputs or []) + \
+                list(device.bus_outputs or [])
             if port_id is None:
                 signal_name = device_name
                 return signal_name
-            elif port_id in device.outputs or port_id in device.inputs:
+            elif (port_id in device.outputs or port_id in device.inputs or
+                  port_id in bus_ports):
                 port_name = self.names.get_name_string(port_id)
                 signal_name = ".".join([device_name, port_name])
                 return signal_name
+            elif self.is_output(device_id, port_id):
+                # A single bit of a bus output, e.g. reg.Q[3]
+                [bus_port_id, bit] = self.get_bit_port(port_id)
+                bus_name = self.get_signal_name(device_id, bus_port_id)
+                signal_name = "".join([bus_name, "[", str(bit), "]"])
+                return signal_name
             else:
                 return None
         else:
             return None
 
     def get_signal_ids(self, signal_name):
-        """Return the device and output IDs of the specified signal."""
+        """Return the device and output IDs of the specified signal.
+
+        A signal name ending in [bit] selects a single bit of a bus output.
+        """
+        bit = None
+        if signal_name.endswith("]") and "[" in signal_name:
+            [signal_name, bit_string] = signal_name[:-1].rsplit("[", 1)
+            bit = int(bit_string)
         name_string_list = signal_name.split(".")
         name_id_list = self.names.lookup(name_string_list)
         device_id = name_id_list[0]
@@ -209,9 +332,79 @@ class Devices:
             output_id = name_id_list[1]
         else:
             output_id = None
+        if bit is not None:
+            output_id = self.make_bit_port(output_id, bit)
 
         return [device_id, output_id]
 
+    def add_bus_input(self, device_id, input_id):
+        """Add the specified bus input to the specified device.
+
+        Return True if successful. The bus input starts unconnected.
+        """
+        device = self.get_device(device_id)
+        if device is not None:
+            if device.bus_inputs is None:
+                device.bus_inputs = {}
+            device.bus_inputs[input_id] = []
+            return True
+        else:
+            return False
+
+    def add_bus_output(self, device_id, output_id, word=0):
+        """Add the specified bus output to the specified device.
+
+        Return True if successful. The default output word is all LOW (0).
+        """
+        device = self.get_device(device_id)
+        if device is not None:
+            if device.bus_outputs is None:
+                device.bus_outputs = {}
+            device.bus_outputs[output_id] = word
+            return True
+        else:
+            return False
+
+    def make_bit_port(self, port_id, bit):
+        """Return the port ID of a single bit of the specified bus port.
+
+        The bit port is named like the bus port with the bit index in
+        square brackets, e.g. Q[3].
+        """
+        if port_id is None:
+            port_name = ""
+        else:
+            port_name = self.names.get_name_string(port_id)
+        [bit_port_id] = self.names.lookup(["".join([port_name, "[", str(bit),
+                                                    "]"])])
+        self.bit_ports[bit_port_id] = (port_id, bit)
+        return bit_port_id
+
+    def get_bit_port(self, port_id):
+        """Return the bus port ID and bit of the specified bit port.
+
+        Return None if port_id is not a bit port.
+        """
+        if port_id in self.bit_ports:
+            return list(self.bit_ports[port_id])
+        return None
+
+    def is_output(self, device_id, port_id):
+        """Return True if the port is an output of the specified device.
+
+        A single bit of a bus output is also an output.
+        """
+        device = self.get_device(device_id)
+        if device is None:
+            return False
+        if port_id in device.outputs:
+            return True
+        if device.bus_outputs and port_id in self.bit_ports:
+            (bus_port_id, bit) = self.bit_ports[port_id]
+            return bus_port_id in device.bus_outputs and \
+                bit < device.bus_width
+        return False
+
     def set_switch(self, device_id, signal):
         """Set the switch state of the specified device to signal.
 
@@ -223,9 +416,23 @@ class Devices:
         elif device.device_kind != self.SWITCH:
             return False
         else:
+            if device_id in self.fixed_switches and \
+                    signal != device.switch_state:
+                # The switch is no longer constant, so unfold its logic
+                self.fixed_switches.discard(device_id)
+                self.fixed_switch_changes += 1
             device.switch_state = signal
             return True
 
+    def fix_switches(self, device_ids):
+        """Mark the given switches as constant.
+
+        The network folds the logic gates decided by the fixed switches.
+        A switch stops being fixed when set_switch changes it.
+        """
+        self.fixed_switches = set(device_ids)
+        self.fixed_switch_changes += 1
+
     def make_switch(self, device_id, initial_state):
         """Make a switch device and set its initial state."""
         self.add_device(device_id, self.SWITCH)
@@ -241,7 +448,8 @@ class Devices:
         self.add_device(device_id, self.CLOCK)
         device = self.get_device(device_id)
         device.clock_half_period = clock_half_period
-        self.cold_startup()  # clock initialised to a random point in its cycle
+        # Clock initialised to a random point in its cycle
+        self.cold_startup(device_id)
 
     def make_siggen(self, device_id, signal):
         """Make a signal generator device with the specified signal.
@@ -278,18 +486,51 @@ class Devices:
             self.add_input(device_id, input_id)
         for output_id in self.dtype_output_ids:
             self.add_output(device_id, output_id)
-        self.cold_startup()  # D-type initialised to a random state
+        self.cold_startup(device_id)  # D-type initialised to a random state
+
+    def make_register(self, device_id, width):
+        """Make a bus register device of the specified width.
 
-    def cold_startup(self):
+        The register stores its DATA bus when its CLK input rises, and drives
+        the stored word on its Q bus.
+        """
+        self.add_device(device_id, self.REG)
+        device = self.get_device(device_id)
+        device.bus_width = width
+        self.add_input(device_id, self.CLK_ID)
+        self.add_bus_input(device_id, self.DATA_ID)
+        self.add_bus_output(device_id, self.Q_ID)
+        self.cold_startup(device_id)  # register initialised to a random state
+
+    def make_bus_gate(self, device_id, device_kind, width):
+        """Make a two-input logic gate over buses of the specified width."""
+        self.add_device(device_id, device_kind)
+        device = self.get_device(device_id)
+        device.bus_width = width
+        self.add_bus_output(device_id, output_id=None)
+
+        for input_id in self.bus_gate_input_ids:
+            self.add_bus_input(device_id, input_id)
+
+    def cold_startup(self, device_id=None):
         """Simulate cold start-up of D-types and clocks.
 
         Set the memory of the D-types to a random state and make the clocks
-        begin from a random point in their cycles.
+        begin from a random point in their cycles. If a device_id is given,
+        only that device is started up.
         """
-        for device in self.devices_list:
+        if device_id is None:
+            startup_devices = self.devices_list
+        else:
+            startup_devices = [self.get_device(device_id)]
+        self.startup_changes += 1
+        for device in startup_devices:
             if device.device_kind == self.D_TYPE:
                 device.dtype_memory = random.choice([self.LOW, self.HIGH])
 
+            elif device.device_kind == self.REG:
+                device.dtype_memory = random.getrandbits(device.bus_width)
+
             elif device.device_kind == self.CLOCK:
                 clock_signal = random.choice([self.LOW, self.HIGH])
                 self.add_output(device.device_id, output_id=None,
@@ -374,6 +615,24 @@ class Devices:
                 self.make_d_type(device_id)
                 error_type = self.NO_ERROR
 
+        elif device_kind in self.bus_types:
+            # Device property is the bus width
+            if device_property is None:
+                error_type = self.NO_QUALIFIER
+            elif len(device_property) == 1:
+                if device_property[0] not in range(1,
+                                                   self.max_bus_width + 1):
+                    error_type = self.INVALID_QUALIFIER
+                elif device_kind == self.REG:
+                    self.make_register(device_id, device_property[0])
+                    error_type = self.NO_ERROR
+                else:
+                    self.make_bus_gate(device_id, device_kind,
+                                       device_property[0])
+                    error_type = self.NO_ERROR
+            else:
+                error_type = self.EXCESS_QUALIFIER
+
         else:
             error_type = self.BAD_DEVICE
 
@@ -0,0 +1,513 @@
+"""Grade a stimulus by simulating the stuck-at faults of a network.
+
+Used in the Logic Simulator project to find how many of the faults that a
+manufactured circuit may have would be detected by a stimulus. Every device
+output and input can be stuck at 0 or stuck at 1, and a fault is detected if
+it makes a monitored signal settle to a different level in some cycle.
+
+Classes
+-------
+FaultSimulator - simulates the faulty networks of many stuck-at faults at
+                 once.
+"""
+import collections
+import functools
+import operator
+
+
+class FaultSimulator:
+    """Simulate the faulty networks of many stuck-at faults at once.
+
+    The signals of the network are held as words, which are Python
+    integers. Bit 0 of a word is the signal in the fault-free network, and
+    each other bit is the same signal in a network with one fault, so each
+    device is evaluated once for a whole word of faulty networks with
+    Python's bitwise operators. A fault is injected by forcing its bit of
+    the stuck output, or of the stuck input as its device reads it.
+
+    A fault is detected in the first cycle in which a monitored signal of
+    its network settles to a different level from the fault-free network.
+    It is then dropped: its bit is no longer compared, and a word is not
+    simulated any further once all its faults have been dropped. A fault
+    whose network does not settle within the limit of passes is dropped as
+    oscillating, rather than detected.
+
+    The networks are simulated with the LOW and HIGH levels of the signals.
+    In each cycle, the switches, clocks and signal generators are updated
+    first. The D-types then take in the DATA they would have read before
+    the update, if their CLK has risen, and the gates are evaluated in the
+    order of their connections, skipping those whose inputs have not
+    changed since they were last evaluated. Further passes are made only
+    while a signal read by a loop of gates, or by the CLK, SET or CLEAR of
+    a D-type, changes. The faults are simulated from the state the devices
+    are in, and the stimulus is applied from its first cycle.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class.
+    stimulus: instance of the stimulus.Stimulus() class, or None.
+    word_width: number of faults simulated together in each word.
+
+    Public methods
+    --------------
+    get_faults(self): Returns the stuck-at faults of every device output and
+                      input.
+
+    get_fault_name(self, fault): Returns the name string of a fault.
+
+    compile_network(self): Returns the devices in the order they are
+                           evaluated and the signals read before they are
+                           updated.
+
+    run(self, cycles=None): Simulates every fault for the specified number
+                            of simulation cycles.
+
+    simulate_word(self, faults, cycles, signals=None): Simulates the
+                            fault-free network and a word of faulty
+                            networks.
+
+    get_word_faults(self, faults, bits): Returns the faults of the set bits
+                                         of a word.
+
+    get_coverage(self): Returns the fraction of the faults detected.
+
+    get_report(self): Returns a description of the faults detected.
+    """
+
+    def __init__(self, names, devices, network, monitors, stimulus=None,
+                 word_width=16384):
+        """Initialise the simulator errors and results."""
+        self.names = names
+        self.devices = devices
+        self.network = network
+        self.monitors = monitors
+        self.stimulus = stimulus
+        self.word_width = word_width
+
+        [self.NO_ERROR, self.NOT_SUPPORTED, self.OSCILLATING,
+         self.BAD_STIMULUS] = self.names.unique_error_codes(4)
+
+        # Number of passes to wait for the signals of a cycle to settle
+        self.iteration_limit = 20
+
+        # The compiled network and the device and connection counts it was
+        # compiled from
+        self.compiled = None
+        self.compiled_key = None
+
+        # The faults of the last run, {fault: cycle} of the detected faults,
+        # and the set of the oscillating faults
+        self.faults = []
+        self.detected = {}
+        self.oscillating = set()
+        self.cycles = 0
+        self.words = 0
+
+    def get_faults(self):
+        """Return the stuck-at faults of every device output and input.
+
+        Each fault is (device_id, port_id, signal), where signal is LOW or
+        HIGH. The output and input IDs of a device are different, so the
+        port_id gives whether the fault is on an output or an input.
+        """
+        faults = []
+        for device in self.devices.devices_list:
+            for port_id in list(device.outputs) + list(device.inputs):
+                for signal in [self.devices.LOW, self.devices.HIGH]:
+                    faults.append((device.device_id, port_id, signal))
+        return faults
+
+    def get_fault_name(self, fault):
+        """Return the name string of a fault, such as a.I1 stuck-at-0."""
+        (device_id, port_id, signal) = fault
+        return "".join([self.devices.get_signal_name(device_id, port_id),
+                        " stuck-at-", str(signal)])
+
+    def compile_network(self):
+        """Return the devices in the order they are evaluated.
+
+        Return (slots, sources, d_types, gates, watched), where slots is a
+        dictionary of {(device_id, output_id): slot} giving the index of
+        every output in the list of words, and sources is a list of
+        (device, slot) of the switches, clocks and signal generators.
+        d_types is a list of (device, [(input_id, slot)], Q slot, QBAR
+        slot), with the slots of the outputs driving CLK, SET, CLEAR and
+        DATA, and gates is a list of (device, [(input_id, slot)], slot) in
+        which a gate follows the gates that drive it, unless they are in a
+        loop. watched lists the slots read before they are updated in a
+        pass, which must not change for the signals to have settled.
+
+        Return None if the network has bus devices or an unconnected input.
+        The network is compiled again whenever devices or connections are
+        added.
+        """
+        key = (self.devices.device_changes, self.network.connection_changes)
+        if self.compiled_key == key:
+            return self.compiled
+        self.compiled_key = key
+        self.compiled = None
+
+        slots = {}
+        sources = []
+        d_types = []
+        gate_devices = []
+        for device in self.devices.devices_list:
+            if device.device_kind in self.devices.bus_types or \
+                    device.bus_inputs or device.bus_outputs:
+                return None
+            for output_id in device.outputs:
+                slots[(device.device_id, output_id)] = len(slots)
+            if device.device_kind == self.devices.D_TYPE:
+                d_types.append(device)
+            elif device.device_kind in self.devices.gate_types:
+                gate_devices.append(device)
+            else:
+                sources.append((device, slots[(device.device_id, None)]))
+        for device in d_types + gate_devices:
+            for connected_output in device.inputs.values():
+                if connected_output not in slots:
+                    return None  # unconnected, or a single bit of a bus
+
+        # The gates are ordered so that they follow the gates driving them,
+        # and the gates in loops follow the rest in the order of the list
+        gate_ids = set([device.device_id for device in gate_devices])
+        waiting = {}
+        readers = collections.defaultdict(list)
+        for device in gate_devices:
+            waiting[device.device_id] = 0
+            for (output_device_id, output_port_id) in device.inputs.values():
+                if output_device_id in gate_ids:
+                    waiting[device.device_id] += 1
+                    readers[output_device_id].append(device)
+        ready = [device for device in reversed(gate_devices)
+                 if waiting[device.device_id] == 0]
+        order = []
+        while ready:
+            device = ready.pop()
+            order.append(device)
+            for reader in readers[device.device_id]:
+                waiting[reader.device_id] -= 1
+                if waiting[reader.device_id] == 0:
+                    ready.append(reader)
+        ordered_ids = set([device.device_id for device in order])
+        order.extend([device for device in gate_devices
+                      if device.device_id not in ordered_ids])
+
+        # positions stores {device_id: position in the order of a pass}
+        positions = {}
+        for device in d_types + order:
+            positions[device.device_id] = len(positions)
+        watched = set()
+        for device in d_types + order:
+            for input_id, connected_output in device.inputs.items():
+                if input_id == self.devices.DATA_ID:
+                    continue  # only taken in when CLK rises
+                driver_position = positions.get(connected_output[0])
+                if driver_position is not None and \
+                        driver_position >= positions[device.device_id]:
+                    watched.add(slots[connected_output])
+
+        compiled_d_types = [
+            (device, [(input_id, slots[device.inputs[input_id]]) for
+                      input_id in self.devices.dtype_input_ids],
+             slots[(device.device_id, self.devices.Q_ID)],
+             slots[(device.device_id, self.devices.QBAR_ID)])
+            for device in d_types]
+        gates = [(device, [(input_id, slots[connected_output]) for
+                           input_id, connected_output in
+                           device.inputs.items()],
+                  slots[(device.device_id, None)]) for device in order]
+        self.compiled = (slots, sources, compiled_d_types, gates,
+                         sorted(watched))
+        return self.compiled
+
+    def run(self, cycles=None):
+        """Simulate every fault for the specified number of cycles.
+
+        If cycles is None, run until the last change in the stimulus has
+        been applied. The faults are simulated in words of word_width
+        faults, and the stimulus is read again from its start for each
+        word. The switches are set back as they were after each word, and
+        the other devices are not changed. Return self.NO_ERROR if
+        successful, or the corresponding error if not.
+        """
+        self.faults = self.get_faults()
+        self.detected = {}
+        self.oscillating = set()
+        self.words = 0
+        if cycles is None:
+            cycles = 0
+            if self.stimulus is not None:
+                for cycle, changes in self.stimulus.read_changes():
+                    cycles = cycle + 1
+        self.cycles = cycles
+        if self.compile_network() is None:
+            return self.NOT_SUPPORTED
+
+        switch_states = [
+            (device_id, self.devices.get_device(device_id).switch_state)
+            for device_id in self.devices.find_devices(self.devices.SWITCH)]
+        error_type = self.NO_ERROR
+        for start in range(0, len(self.faults), self.word_width):
+            if self.stimulus is not None:
+                self.stimulus.restart()
+            error_type = self.simulate_word(
+                self.faults[start:start + self.word_width], cycles)
+            self.words += 1
+
+            # The next word starts from the same switches, and the devices
+            # are left as they were
+            for device_id, switch_state in switch_states:
+                self.devices.set_switch(device_id, switch_state)
+            if error_type != self.NO_ERROR:
+                break
+        return error_type
+
+    def simulate_word(self, faults, cycles, signals=None):
+        """Simulate the fault-free network and a word of faulty networks.
+
+        The faults detected are added to self.detected and the oscillating
+        faults to self.oscillating. If signals is a dictionary, it is set
+        to {(device_id, output_id): [signal]} of the monitored signals of
+        the fault-free network in each cycle, and the word is simulated for
+        every cycle. Return self.NO_ERROR if successful, or the
+        corresponding error if not.
+        """
+        (slots, sources, d_types, gates, watched) = self.compile_network()
+        ones = (1 << (len(faults) + 1)) - 1
+        HIGH = self.devices.HIGH
+
+        # masks stores {(device_id, port_id): [keep, force]}, where a word
+        # is made faulty by word & keep | force
+        masks = collections.defaultdict(lambda: [-1, 0])
+        for bit, (device_id, port_id, signal) in enumerate(faults, 1):
+            if signal == HIGH:
+                masks[(device_id, port_id)][1] |= 1 << bit
+            else:
+                masks[(device_id, port_id)][0] &= ~(1 << bit)
+
+        def get_masks(device_id, port_id):
+            if (device_id, port_id) in masks:
+                return tuple(masks[(device_id, port_id)])
+            return (-1, 0)
+
+        def get_reads(device, inputs):
+            return [(slot,) + get_masks(device.device_id, input_id)
+                    for input_id, slot in inputs]
+
+        # The signals the devices are in, with each output made faulty
+        values = [0] * len(slots)
+        for (device_id, output_id), slot in slots.items():
+            signal = self.devices.get_device(device_id).outputs[output_id]
+            if signal in [HIGH, self.devices.RISING]:
+                values[slot] = ones
+            (keep, force) = get_masks(device_id, output_id)
+            values[slot] = values[slot] & keep | force
+
+        # source_states stores [device, slot, level, counter, position,
+        # keep, force] of each source, where counter and position are the
+        # clock and signal generator counters
+        source_states = []
+        for (device, slot) in sources:
+            level = values[slot] & 1
+            source_states.append([device, slot, level, device.clock_counter,
+                                  device.siggen_counter] +
+                                 list(get_masks(device.device_id, None)))
+
+        word_d_types = []
+        memory = []
+        last_clocks = []
+        for (device, inputs, Q_slot, QBAR_slot) in d_types:
+            reads = get_reads(device, inputs)
+            word_d_types.append(
+                (len(memory), reads, Q_slot) +
+                get_masks(device.device_id, self.devices.Q_ID) +
+                (QBAR_slot,) +
+                get_masks(device.device_id, self.devices.QBAR_ID))
+            memory.append(ones if device.dtype_memory == HIGH else 0)
+            (slot, keep, force) = reads[0]
+            last_clocks.append(values[slot] & keep | force)
+
+        word_gates = []
+        for (device, inputs, slot) in gates:
+            if device.device_kind in [self.devices.AND, self.devices.NAND]:
+                function = operator.and_
+            elif device.device_kind == self.devices.XOR:
+                function = operator.xor
+            else:
+                function = operator.or_
+            inverse = ones if device.device_kind in [
+                self.devices.NAND, self.devices.NOR] else 0
+            input_slots = [input_slot for input_id, input_slot in inputs]
+            input_faults = [(position,) + get_masks(device.device_id,
+                                                    input_id)
+                            for position, (input_id, input_slot) in
+                            enumerate(inputs)
+                            if (device.device_id, input_id) in masks]
+            word_gates.append((len(word_gates), function, input_slots,
+                               input_faults, inverse, slot) +
+                              get_masks(device.device_id, None))
+
+        # A gate is only evaluated if one of its inputs has changed since it
+        # was last evaluated. stamps stores the count of changes at the
+        # last change of each word, and evaluations the count when each
+        # gate was last evaluated.
+        changes = 1
+        stamps = [changes] * len(slots)
+        evaluations = [0] * len(word_gates)
+
+        monitored_slots = [slots.get(key) for key in
+                           self.monitors.monitors_dictionary]
+        if signals is not None:
+            signals.clear()
+            for key in self.monitors.monitors_dictionary:
+                signals[key] = []
+        live = ones ^ 1  # the bits of the faults not yet dropped
+
+        for cycle in range(cycles):
+            if self.stimulus is not None and \
+                    self.stimulus.apply_changes(cycle) != \
+                    self.stimulus.NO_ERROR:
+                return self.BAD_STIMULUS
+            # D-types take in DATA as it was before the sources changed
+            previous = values[:]
+
+            for state in source_states:
+                [device, slot, level, counter, position, keep,
+                 force] = state
+                if device.device_kind == self.devices.SWITCH:
+                    level = device.switch_state == HIGH
+                else:
+                    if counter == device.clock_half_period:
+                        counter = 0
+                        if device.device_kind == self.devices.CLOCK:
+                            level = not level
+                        else:
+                            position = ((position + 1) %
+                                        len(device.siggen_signal))
+                            level = device.siggen_signal[position] == HIGH
+                    state[2:5] = [level, counter + 1, position]
+                word = (ones if level else 0) & keep | force
+                if word != values[slot]:
+                    changes += 1
+                    values[slot] = word
+                    stamps[slot] = changes
+
+            data_values = previous
+            for iteration in range(self.iteration_limit):
+                watched_words = [values[slot] for slot in watched]
+                for (index, reads, Q_slot, Q_keep, Q_force, QBAR_slot,
+                     QBAR_keep, QBAR_force) in word_d_types:
+                    [(clock_slot, clock_keep, clock_force),
+                     (set_slot, set_keep, set_force),
+                     (clear_slot, clear_keep, clear_force),
+                     (data_slot, data_keep, data_force)] = reads
+                    clock = values[clock_slot] & clock_keep | clock_force
+                    rising = clock & ~last_clocks[index]
+                    last_clocks[index] = clock
+                    word = memory[index]
+                    if rising:
+                        data = data_values[data_slot] & data_keep | \
+                            data_force
+                        word = word & ~rising | data & rising
+                    word |= values[set_slot] & set_keep | set_force
+                    word &= ~(values[clear_slot] & clear_keep | clear_force)
+                    memory[index] = word
+                    for (slot, word) in [
+                            (Q_slot, word & Q_keep | Q_force),
+                            (QBAR_slot, (word ^ ones) & QBAR_keep |
+                             QBAR_force)]:
+                        if word != values[slot]:
+                            changes += 1
+                            values[slot] = word
+                            stamps[slot] = changes
+                data_values = values
+
+                for (index, function, input_slots, input_faults, inverse,
+                     slot, keep, force) in word_gates:
+                    if max(map(stamps.__getitem__, input_slots)) <= \
+                            evaluations[index]:
+                        continue
+                    evaluations[index] = changes
+                    if input_faults:
+                        words = [values[input_slot] for input_slot in
+                                 input_slots]
+                        for (position, input_keep,
+                             input_force) in input_faults:
+                            words[position] = words[position] & \
+                                input_keep | input_force
+                        word = functools.reduce(function, words)
+                    else:
+                        word = functools.reduce(function, map(
+                            values.__getitem__, input_slots))
+                    word = (word ^ inverse) & keep | force
+                    if word != values[slot]:
+                        changes += 1
+                        values[slot] = word
+                        stamps[slot] = changes
+
+                changed = 0
+                for slot, word in zip(watched, watched_words):
+                    changed |= values[slot] ^ word
+                if not changed:
+                    break
+            if changed & 1:
+                return self.OSCILLATING
+            if changed & live:
+                self.oscillating.update(self.get_word_faults(
+                    faults, changed & live))
+                live &= ~changed
+
+            differences = 0
+            for slot in monitored_slots:
+                word = values[slot]
+                differences |= word ^ (ones if word & 1 else 0)
+            if differences & live:
+                for fault in self.get_word_faults(faults,
+                                                  differences & live):
+                    self.detected[fault] = cycle
+                live &= ~differences
+            if signals is not None:
+                for key, slot in zip(self.monitors.monitors_dictionary,
+                                     monitored_slots):
+                    signals[key].append(values[slot] & 1)
+            elif not live:
+                break  # every fault of the word has been dropped
+        return self.NO_ERROR
+
+    def get_word_faults(self, faults, bits):
+        """Return the faults of the set bits of a word."""
+        word_faults = []
+        while bits:
+            bit = bits & -bits
+            word_faults.append(faults[bit.bit_length() - 2])
+            bits ^= bit
+        return word_faults
+
+    def get_coverage(self):
+        """Return the fraction of the faults detected by the last run."""
+        if not self.faults:
+            return 0.0
+        return len(self.detected) / len(self.faults)
+
+    def get_report(self):
+        """Return a description of the faults detected by the last run."""
+        undetected = [fault for fault in self.faults if fault not in
+                      self.detected and fault not in self.oscillating]
+        report = ["".join([
+            "Simulated ", str(len(self.faults)), " stuck-at faults over ",
+            str(self.cycles), " cycles in ", str(self.words),
+            " word." if self.words == 1 else " words."]),
+            "".join([
+                "Detected ", str(len(self.detected)), ", undetected ",
+                str(len(undetected)), ", oscillating ",
+                str(len(self.oscillating)), ". Fault coverage ",
+                "{:.1f}".format(100 * self.get_coverage()), "%."])]
+        if undetected:
+            report.append("Undetected faults:")
+            report.extend([self.get_fault_name(fault) for fault in
+                           undetected])
+        return "\n".join(report)
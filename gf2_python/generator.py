@@ -0,0 +1,580 @@
+#!/usr/bin/env python3
+"""Generate definition files of large circuits for scale testing.
+
+Used in the Logic Simulator project to make circuits far larger than the
+example files, in the definition file grammar, so that the simulator can be
+tested and benchmarked at scale. The same seed always gives the same file.
+
+The gates of each kind are executed in the order they are declared, and the
+kinds one after the other, so the arithmetic circuits are built from NAND
+gates declared in the order their signals flow. A gate reading a NAND output
+that has just risen still sees it as LOW until the next pass, so a change
+takes about one pass for every two levels of NAND gates it goes through.
+The adders settle in around ten passes for random inputs, a carry through
+every bit of a wide ripple adder taking longer, and the multiplier adds in a
+tree, so that its depth grows with the logarithm of its width and widths up
+to 16 settle within the network's limit of 20 passes. The random networks
+mix every kind of gate, and take up to one pass for each level of gates.
+
+Usage
+-----
+Show help: generator.py -h
+Write a circuit: generator.py -k <kind> -n <size> [-s <seed>]
+                 [-q <sequence length>] [-o <output path>]
+Write a random network: generator.py -k dag -n <gates> [-d <depth>]
+                        [-f <fanout>] [-s <seed>] ...
+
+The kinds are ripple and lookahead (adders of width size), multiplier
+(a Wallace tree multiplier of width size), shift (a shift register of size
+stages), ring (a ring counter of size stages) and dag (a random network of
+size gates). Inputs are switches with random initial values, or signal
+generators with random sequences of the given length.
+
+Classes
+-------
+Netlist - builds the text of a definition file.
+CircuitGenerator - generates circuits with inputs from a seeded generator.
+"""
+import getopt
+import random
+import sys
+
+
+class Netlist:
+    """Build the text of a definition file.
+
+    Parameters
+    ----------
+    No parameters.
+
+    Public methods
+    --------------
+    add_device(self, name, kind, qualifier=None): Declares a device.
+
+    connect(self, output, inputs): Connects an output to inputs.
+
+    add_gate(self, kind, inputs, name=None): Declares a logic gate driven by
+                                             the given outputs.
+
+    add_monitor(self, signal): Monitors a signal.
+
+    get_text(self): Returns the text of the definition file.
+    """
+
+    def __init__(self):
+        """Initialise the lists of devices, connections and monitors."""
+        self.devices = []
+        self.connections = []
+        self.monitors = []
+        self.gate_count = 0
+
+    def add_device(self, name, kind, qualifier=None):
+        """Declare a device of the given kind, and return its name.
+
+        The qualifier is the text after the kind, such as "inputs 2".
+        """
+        if qualifier is None:
+            self.devices.append("".join([name, ": ", kind, ";"]))
+        else:
+            self.devices.append("".join([name, ": ", kind, ", ", qualifier,
+                                         ";"]))
+        return name
+
+    def connect(self, output, inputs):
+        """Connect the output signal to each of the input signals."""
+        for input_signal in inputs:
+            self.connections.append("".join([output, " = ", input_signal,
+                                             ";"]))
+
+    def add_gate(self, kind, inputs, name=None):
+        """Declare a logic gate driven by the inputs, and return its name.
+
+        Gates are named g0, g1 and so on unless a name is given.
+        """
+        if name is None:
+            name = "".join(["g", str(self.gate_count)])
+        self.gate_count += 1
+        if kind == "XOR":
+            self.add_device(name, kind)
+        else:
+            self.add_device(name, kind, "".join(["inputs ",
+                                                 str(len(inputs))]))
+        for input_number, input_signal in enumerate(inputs, 1):
+            self.connect(input_signal, ["".join([name, ".I",
+                                                 str(input_number)])])
+        return name
+
+    def add_monitor(self, signal):
+        """Monitor the signal."""
+        self.monitors.append("".join([signal, ";"]))
+
+    def get_text(self):
+        """Return the text of the definition file."""
+        return "\n".join(["DEVICES {"] + self.devices +
+                         ["}", "", "CONNECT {"] + self.connections +
+                         ["}", "", "MONITOR {"] + self.monitors +
+                         ["}", "", "END", ""])
+
+
+class CircuitGenerator:
+    """Generate circuits with inputs from a seeded random number generator.
+
+    Each make_ method returns the text of a definition file. Inputs are
+    switches with random initial values, or signal generators with random
+    sequences if sequence_length is given, for a testbench that changes the
+    inputs as it runs.
+
+    Parameters
+    ----------
+    seed: seed of the random number generator.
+    sequence_length: length of the signal generator sequences, or None for
+                     switches.
+
+    Public methods
+    --------------
+    add_input(self, netlist, name): Declares an input of the circuit.
+
+    add_not(self, netlist, signal): Declares an inverter.
+
+    add_xor(self, netlist, x, y, nand_xy=None): Declares the exclusive OR
+                                                of two signals.
+
+    add_bits(self, netlist, bits): Declares an adder of up to three bits.
+
+    add_full_adder(self, netlist, bits): Declares an adder of three bits
+                                         from two levels of NAND gates.
+
+    add_zero(self, netlist): Declares a signal that is always 0.
+
+    add_lookahead(self, netlist, a_bits, b_bits, block=4): Declares a
+                                        carry-lookahead adder of two
+                                        numbers.
+
+    add_operands(self, netlist, width): Declares the inputs of two operands.
+
+    add_outputs(self, netlist, bits): Names and monitors the bits of a
+                                      result.
+
+    add_flip_flops(self, netlist, stages): Declares a chain of D-types.
+
+    make_ripple_adder(self, width): Returns a ripple-carry adder.
+
+    make_lookahead_adder(self, width, block=4): Returns a carry-lookahead
+                                                adder.
+
+    make_multiplier(self, width): Returns a Wallace tree multiplier.
+
+    make_shift_register(self, stages): Returns a shift register of D-types.
+
+    make_ring_counter(self, stages): Returns a ring counter of D-types.
+
+    make_random_dag(self, gates, depth=8, fanout=4, inputs=None,
+                    kinds=None): Returns a random network of logic gates.
+
+    choose(self, signals, loads, fanout): Returns a random signal, preferring
+                                          those driving few inputs.
+    """
+
+    def __init__(self, seed=0, sequence_length=None):
+        """Initialise the random number generator."""
+        self.random = random.Random(seed)
+        self.sequence_length = sequence_length
+
+    def add_input(self, netlist, name):
+        """Declare an input of the circuit, and return its name."""
+        if self.sequence_length is None:
+            return netlist.add_device(name, "SWITCH", "".join([
+                "initial ", str(self.random.randint(0, 1))]))
+        sequence = [str(self.random.randint(0, 1))
+                    for _ in range(self.sequence_length)]
+        return netlist.add_device(name, "SIGGEN", "".join([
+            "sequence ", ", ".join(sequence)]))
+
+    def add_not(self, netlist, signal):
+        """Declare an inverter of the signal, and return its output."""
+        return netlist.add_gate("NAND", [signal])
+
+    def add_xor(self, netlist, x, y, nand_xy=None):
+        """Declare the exclusive OR of x and y from four NAND gates.
+
+        nand_xy is the NAND of x and y if it has already been declared.
+        Return the output.
+        """
+        if nand_xy is None:
+            nand_xy = netlist.add_gate("NAND", [x, y])
+        return netlist.add_gate("NAND", [netlist.add_gate("NAND", [x,
+                                                                   nand_xy]),
+                                         netlist.add_gate("NAND", [y,
+                                                                   nand_xy])])
+
+    def add_bits(self, netlist, bits):
+        """Declare an adder of the bits that are not None.
+
+        A full adder takes nine NAND gates and a half adder six. Return the
+        sum and carry, where either is None if it is always 0.
+        """
+        bits = [bit for bit in bits if bit is not None]
+        if len(bits) < 2:
+            return (bits[0] if bits else None), None
+        [x, y] = bits[:2]
+        nand_xy = netlist.add_gate("NAND", [x, y])
+        half_sum = self.add_xor(netlist, x, y, nand_xy)
+        if len(bits) == 2:
+            return half_sum, self.add_not(netlist, nand_xy)
+        carry_in = bits[2]
+        nand_carry = netlist.add_gate("NAND", [half_sum, carry_in])
+        total = self.add_xor(netlist, half_sum, carry_in, nand_carry)
+        return total, netlist.add_gate("NAND", [nand_xy, nand_carry])
+
+    def add_operands(self, netlist, width):
+        """Declare the inputs of two operands, and return their bits.
+
+        The bits are named a0, a1, ... and b0, b1, ..., least significant
+        first.
+        """
+        a_bits = [self.add_input(netlist, "".join(["a", str(bit)]))
+                  for bit in range(width)]
+        b_bits = [self.add_input(netlist, "".join(["b", str(bit)]))
+                  for bit in range(width)]
+        return a_bits, b_bits
+
+    def add_outputs(self, netlist, bits):
+        """Name and monitor the bits of a result, s0, s1, ...
+
+        Each bit is buffered by an AND gate named after it, so the result
+        can be looked up by name. Bits that are always 0 are driven by the
+        AND of a0 and its inverse.
+        """
+        for bit, signal in enumerate(bits):
+            name = "".join(["s", str(bit)])
+            if signal is None:
+                low = self.add_not(netlist, "a0")
+                netlist.add_gate("AND", [low, "a0"], name)
+            else:
+                netlist.add_gate("AND", [signal], name)
+            netlist.add_monitor(name)
+
+    def make_ripple_adder(self, width):
+        """Return a ripple-carry adder of two width-bit numbers.
+
+        The sum is s0 to s<width>, where the last bit is the carry out.
+        """
+        netlist = Netlist()
+        a_bits, b_bits = self.add_operands(netlist, width)
+        carry = None
+        sum_bits = []
+        for a_bit, b_bit in zip(a_bits, b_bits):
+            total, carry = self.add_bits(netlist, [a_bit, b_bit, carry])
+            sum_bits.append(total)
+        self.add_outputs(netlist, sum_bits + [carry])
+        return netlist.get_text()
+
+    def make_lookahead_adder(self, width, block=4):
+        """Return a carry-lookahead adder of two width-bit numbers.
+
+        The sum is s0 to s<width>, where the last bit is the carry out.
+        """
+        netlist = Netlist()
+        a_bits, b_bits = self.add_operands(netlist, width)
+        self.add_outputs(netlist, self.add_lookahead(netlist, a_bits, b_bits,
+                                                     block))
+        return netlist.get_text()
+
+    def add_full_adder(self, netlist, bits):
+        """Declare an adder of three bits from two levels of NAND gates.
+
+        The sum is the NAND of the four NAND gates that find the odd
+        numbers of bits set, from the bits and their inverses, and the
+        carry is the NAND of the NANDs of each pair of bits. Changes pass
+        through it in half the levels of add_bits. Return the sum and
+        carry.
+        """
+        inverses = [self.add_not(netlist, bit) for bit in bits]
+        terms = []
+        for pattern in [(1, 1, 1), (1, 0, 0), (0, 1, 0), (0, 0, 1)]:
+            terms.append(netlist.add_gate("NAND", [
+                bit if set_bit else inverse for bit, inverse, set_bit in
+                zip(bits, inverses, pattern)]))
+        [x, y, z] = bits
+        carry = netlist.add_gate("NAND", [
+            netlist.add_gate("NAND", [x, y]), netlist.add_gate("NAND", [y, z]),
+            netlist.add_gate("NAND", [x, z])])
+        return netlist.add_gate("NAND", terms), carry
+
+    def add_zero(self, netlist):
+        """Declare a signal that is always 0, and return its name."""
+        return self.add_not(netlist, netlist.add_gate(
+            "NAND", ["a0", self.add_not(netlist, "a0")]))
+
+    def add_lookahead(self, netlist, a_bits, b_bits, block=4):
+        """Declare a carry-lookahead adder of two numbers of equal width.
+
+        The carries within each block of bits are found from the generate
+        and propagate signals of the bits by two levels of NAND gates, and
+        the carry out of each block goes to the next. Return the bits of the
+        sum, where the last bit is the carry out, or None if it is always 0.
+        """
+        width = len(a_bits)
+        carry = None  # carry into the block
+        sum_bits = []
+        for block_start in range(0, width, block):
+            # Generate and propagate signals of each bit of the block
+            inverse_generates = []
+            generates = []
+            propagates = []
+            for bit in range(block_start, min(block_start + block, width)):
+                nand_ab = netlist.add_gate("NAND", [a_bits[bit], b_bits[bit]])
+                inverse_generates.append(nand_ab)
+                generates.append(self.add_not(netlist, nand_ab))
+                propagates.append(self.add_xor(netlist, a_bits[bit],
+                                               b_bits[bit], nand_ab))
+            carries = [carry]
+            for bit in range(len(generates)):
+                # c[i + 1] = g[i] + p[i] g[i - 1] + ... + p[i] ... p[0] c
+                terms = [inverse_generates[bit]]
+                for lower in range(bit - 1, -1, -1):
+                    terms.append(netlist.add_gate(
+                        "NAND", propagates[lower + 1:bit + 1] +
+                        [generates[lower]]))
+                if carry is not None:
+                    terms.append(netlist.add_gate(
+                        "NAND", propagates[:bit + 1] + [carry]))
+                carries.append(netlist.add_gate("NAND", terms))
+            for bit, propagate in enumerate(propagates):
+                if carries[bit] is None:
+                    sum_bits.append(propagate)
+                else:
+                    sum_bits.append(self.add_xor(netlist, propagate,
+                                                 carries[bit]))
+            carry = carries[-1]
+        return sum_bits + [carry]
+
+    def make_multiplier(self, width):
+        """Return a Wallace tree multiplier of two width-bit numbers.
+
+        The partial products, the AND of each bit of a with each bit of b,
+        are summed in columns of equal weight. Each stage of the tree adds
+        the bits of every column three at a time with add_full_adder, and
+        a pair left over with a half adder, until no column has more than
+        two bits, and these two numbers are added by a carry-lookahead
+        adder. The number of stages grows with the logarithm of width. The
+        product is s0 to s<2 width - 1>.
+        """
+        netlist = Netlist()
+        a_bits, b_bits = self.add_operands(netlist, width)
+        columns = [[] for _ in range(2 * width)]
+        for row, b_bit in enumerate(b_bits):
+            for column, a_bit in enumerate(a_bits):
+                columns[row + column].append(netlist.add_gate("AND",
+                                                              [a_bit, b_bit]))
+        while max([len(bits) for bits in columns]) > 2:
+            next_columns = [[] for _ in columns]
+            for column, bits in enumerate(columns):
+                for start in range(0, len(bits), 3):
+                    group = bits[start:start + 3]
+                    if len(group) == 1:
+                        next_columns[column].extend(group)
+                        continue
+                    if len(group) == 3:
+                        total, carry = self.add_full_adder(netlist, group)
+                    else:
+                        total, carry = self.add_bits(netlist, group)
+                    next_columns[column].append(total)
+                    # The product has no bits above the last column
+                    if column + 1 < len(columns):
+                        next_columns[column + 1].append(carry)
+            columns = next_columns
+
+        # The columns below the first with two bits need no adding
+        first = len(columns)
+        for column, bits in enumerate(columns):
+            if len(bits) == 2:
+                first = column
+                break
+        product = [bits[0] if bits else None for bits in columns[:first]]
+        if first < len(columns):
+            zero = self.add_zero(netlist)
+            a_row = [(bits + [zero])[0] for bits in columns[first:]]
+            b_row = [(bits + [zero, zero])[1] for bits in columns[first:]]
+            product.extend(self.add_lookahead(netlist, a_row,
+                                              b_row)[:len(a_row)])
+        self.add_outputs(netlist, product)
+        return netlist.get_text()
+
+    def add_flip_flops(self, netlist, stages):
+        """Declare a chain of D-types d0, d1, ... sharing a clock.
+
+        The SET and CLEAR inputs are connected to the switches set and
+        clear, which are off. Return the names of the D-types.
+        """
+        netlist.add_device("clock", "CLOCK", "period 1")
+        netlist.add_device("set", "SWITCH", "initial 0")
+        netlist.add_device("clear", "SWITCH", "initial 0")
+        names = [netlist.add_device("".join(["d", str(stage)]), "DTYPE")
+                 for stage in range(stages)]
+        netlist.connect("clock", ["".join([name, ".CLK"]) for name in names])
+        for name in names:
+            netlist.connect("set", ["".join([name, ".SET"])])
+            netlist.connect("clear", ["".join([name, ".CLEAR"])])
+        return names
+
+    def make_shift_register(self, stages):
+        """Return a shift register of stages D-types d0, d1, ...
+
+        The input of d0 is data, and the output of each D-type is the input
+        of the next.
+        """
+        netlist = Netlist()
+        data = self.add_input(netlist, "data")
+        names = self.add_flip_flops(netlist, stages)
+        netlist.connect(data, ["".join([names[0], ".DATA"])])
+        for stage in range(1, stages):
+            netlist.connect("".join([names[stage - 1], ".Q"]),
+                            ["".join([names[stage], ".DATA"])])
+        netlist.add_monitor("".join([names[-1], ".Q"]))
+        return netlist.get_text()
+
+    def make_ring_counter(self, stages):
+        """Return a ring counter of stages D-types d0, d1, ...
+
+        The output of each D-type is the input of the next, and the last
+        drives the first. The signal generator load sets d0 and clears the
+        others for the first cycle of every 4 stages cycles, so exactly one
+        D-type is HIGH.
+        """
+        netlist = Netlist()
+        netlist.add_device("load", "SIGGEN", "".join([
+            "sequence ", ", ".join(["1"] + ["0"] * (4 * stages - 1))]))
+        netlist.add_device("clock", "CLOCK", "period 1")
+        netlist.add_device("off", "SWITCH", "initial 0")
+        names = [netlist.add_device("".join(["d", str(stage)]), "DTYPE")
+                 for stage in range(stages)]
+        netlist.connect("clock", ["".join([name, ".CLK"]) for name in names])
+        netlist.connect("load", ["".join([names[0], ".SET"])] +
+                        ["".join([name, ".CLEAR"]) for name in names[1:]])
+        netlist.connect("off", ["".join([names[0], ".CLEAR"])] +
+                        ["".join([name, ".SET"]) for name in names[1:]])
+        for stage in range(stages):
+            netlist.connect("".join([names[stage - 1], ".Q"]),
+                            ["".join([names[stage], ".DATA"])])
+        netlist.add_monitor("".join([names[0], ".Q"]))
+        netlist.add_monitor("".join([names[-1], ".Q"]))
+        return netlist.get_text()
+
+    def make_random_dag(self, gates, depth=8, fanout=4, inputs=None,
+                        kinds=None):
+        """Return a random network of gates logic gates in depth levels.
+
+        Each gate takes one input from the level before and the others from
+        any earlier level or the inputs, choosing outputs that drive fewer
+        than fanout inputs where possible. kinds is a list of the gate kinds
+        to choose from, or None for all of them. There are no more levels
+        than gates, so that every level has a gate. The outputs of the last
+        level are monitored.
+        """
+        depth = max(1, min(depth, gates))
+        if inputs is None:
+            inputs = max(2, gates // (2 * depth))
+        if kinds is None:
+            kinds = ["AND", "OR", "NAND", "NOR", "XOR"]
+        netlist = Netlist()
+        levels = [[self.add_input(netlist, "".join(["x", str(bit)]))
+                   for bit in range(inputs)]]
+        loads = {signal: 0 for signal in levels[0]}
+        for level in range(depth):
+            level_gates = gates * (level + 1) // depth - gates * level // depth
+            earlier = [signal for signals in levels for signal in signals]
+            outputs = []
+            for _ in range(level_gates):
+                kind = self.random.choice(kinds)
+                count = 2 if kind == "XOR" else self.random.randint(2, 4)
+                count = min(count, len(earlier))
+                chosen = [self.choose(levels[-1], loads, fanout)]
+                while len(chosen) < count:
+                    signal = self.choose(earlier, loads, fanout)
+                    if signal not in chosen:
+                        chosen.append(signal)
+                if len(chosen) < 2 and kind == "XOR":
+                    kind = "AND"
+                for signal in chosen:
+                    loads[signal] += 1
+                output = netlist.add_gate(kind, chosen)
+                loads[output] = 0
+                outputs.append(output)
+            levels.append(outputs)
+        for signal in levels[-1]:
+            netlist.add_monitor(signal)
+        return netlist.get_text()
+
+    def choose(self, signals, loads, fanout):
+        """Return a random signal, preferring those below the fanout."""
+        for _ in range(4):
+            signal = self.random.choice(signals)
+            if loads[signal] < fanout:
+                return signal
+        return signal
+
+
+def main(arg_list):
+    """Parse the command line options and write the circuit."""
+    usage_message = ("Usage:\n"
+                     "Show help: generator.py -h\n"
+                     "Write a circuit: generator.py -k <kind> -n <size> "
+                     "[-s <seed>] [-q <sequence length>] "
+                     "[-o <output path>]\n"
+                     "Write a random network: generator.py -k dag "
+                     "-n <gates> [-d <depth>] [-f <fanout>] ...\n"
+                     "The kinds are ripple, lookahead, multiplier, shift, "
+                     "ring and dag.")
+    try:
+        options, arguments = getopt.getopt(arg_list, "hk:n:s:q:o:d:f:")
+    except getopt.GetoptError:
+        print("Error: invalid command line arguments\n")
+        print(usage_message)
+        sys.exit()
+
+    option_values = dict(options)
+    if "-h" in option_values or arguments or "-k" not in option_values or \
+            "-n" not in option_values:
+        print(usage_message)
+        sys.exit()
+    numbers = {}
+    for option, default in [("-n", None), ("-s", "0"), ("-q", None),
+                            ("-d", "8"), ("-f", "4")]:
+        value = option_values.get(option, default)
+        if value is None:
+            numbers[option] = None
+        elif not value.isdigit() or (option != "-s" and int(value) == 0):
+            print("Error: the size, seed, sequence length, depth and fanout "
+                  "must be numbers\n")
+            print(usage_message)
+            sys.exit()
+        else:
+            numbers[option] = int(value)
+
+    generator = CircuitGenerator(numbers["-s"], numbers["-q"])
+    size = numbers["-n"]
+    makers = {"ripple": generator.make_ripple_adder,
+              "lookahead": generator.make_lookahead_adder,
+              "multiplier": generator.make_multiplier,
+              "shift": generator.make_shift_register,
+              "ring": generator.make_ring_counter}
+    kind = option_values["-k"]
+    if kind == "dag":
+        text = generator.make_random_dag(size, numbers["-d"], numbers["-f"])
+    elif kind in makers:
+        text = makers[kind](size)
+    else:
+        print("Error: unknown kind of circuit " + kind + "\n")
+        print(usage_message)
+        sys.exit()
+
+    if "-o" in option_values:
+        with open(option_values["-o"], "w") as output_file:
+            output_file.write(text)
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
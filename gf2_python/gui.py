@@ -7,10 +7,10 @@ Classes:
 --------
 MyGLCanvas - handles all canvas drawing operations.
 My3DGLCanvas - handles all 3D canvas drawing operations.
+NameListCtrl - lists a filtered set of names in a virtual list control.
 Gui - configures the main window and all the widgets.
 """
 import wx
-import wx.lib.scrolledpanel as scrolled
 import random
 import os
 import wx.glcanvas as wxcanvas
@@ -24,6 +24,9 @@ from network import Network
 from monitors import Monitors
 from scanner import Scanner
 from parse import Parser
+from library import LibraryCache
+from netdiff import NetworkDiff
+from scheduler import Scheduler
 
 
 class MyGLCanvas(wxcanvas.GLCanvas):
@@ -48,6 +51,8 @@ class MyGLCanvas(wxcanvas.GLCanvas):
 
     on_mouse(self, event): Handles mouse events.
 
+    get_visible_cycles(self, cycles): Returns the range of cycles in view.
+
     render_text(self, text, x_pos, y_pos): Handles text drawing
                                            operations.
 
@@ -105,7 +110,8 @@ class MyGLCanvas(wxcanvas.GLCanvas):
         if monitors is not None:
             self.current_signal, self.current_monitor_points = (
                 monitors.get_signals())
-            for i in range(len(self.current_monitor_points)):
+            for i in range(len(self.signal_colours),
+                           len(self.current_monitor_points)):
                 self.signal_colours.append([random.uniform(0.0, 1.0), (
                     random.uniform(0.0, 1.0)), random.uniform(0.0, 1.0)])
         self.SetCurrent(self.context)
@@ -122,12 +128,15 @@ class MyGLCanvas(wxcanvas.GLCanvas):
 
         # Draw signals
         if self.current_signal != []:
+            # Only the cycles in view are drawn
+            cycles = len(self.current_signal[0])
+            first, last = self.get_visible_cycles(cycles)
             # Draw each signal
             for j in range(len(self.current_signal)):
                 GL.glColor3f(self.signal_colours[j][0], (
                     self.signal_colours[j][1]), self.signal_colours[j][2])
                 GL.glBegin(GL.GL_LINE_STRIP)
-                for i in range(len(self.current_signal[j])):
+                for i in range(first, min(last, len(self.current_signal[j]))):
                     if self.current_signal[j][i] != 4:
                         x = (i * 20) + 40
                         x_next = (i * 20) + 60
@@ -146,20 +155,20 @@ class MyGLCanvas(wxcanvas.GLCanvas):
                     75*(j+1)+10))
 
             # Measure maximuum dimensions of signal for setting panning limits
-            self.max_x = (len(self.current_signal[0])*20) + 60
+            self.max_x = (cycles*20) + 60
             self.max_y = ((len(self.current_signal)+1)*75) + 55
 
             # Draw time-step axis
             GL.glColor3f(0, 0, 0)
             GL.glBegin(GL.GL_LINE_STRIP)
-            for i in range(len(self.current_signal[0])):
+            for i in range(first, last):
                 x = (i * 20) + 40
                 x_next = (i * 20) + 60
                 y = 50
                 GL.glVertex2f(x, y)
                 GL.glVertex2f(x_next, y)
             GL.glEnd()
-            for i in range(len(self.current_signal[0])+1):
+            for i in range(first, min(last + 1, cycles + 1)):
                 GL.glColor3f(0, 0, 0)
                 GL.glBegin(GL.GL_LINE_STRIP)
                 x = (i * 20) + 40
@@ -170,7 +179,7 @@ class MyGLCanvas(wxcanvas.GLCanvas):
                 GL.glEnd()
 
             # Label time-step axis
-            for i in range(len(self.current_signal[0])+1):
+            for i in range(first, min(last + 1, cycles + 1)):
                 self.render_text(str(i), (i * 20) + 39, 25)
             self.render_text(_('time'), 10, 45)
 
@@ -238,6 +247,18 @@ class MyGLCanvas(wxcanvas.GLCanvas):
         self.render(text)
         self.Refresh()  # triggers the paint event
 
+    def get_visible_cycles(self, cycles):
+        """Return the first cycle in view and the cycle after the last.
+
+        Only these cycles of the signals need to be drawn, however long the
+        signals are.
+        """
+        width = self.GetClientSize().width
+        # Cycle i is drawn from x = i*20 + 40 to x = i*20 + 60
+        first = int((-self.pan_x / self.zoom - 60) // 20) + 1
+        last = int(math.ceil(((width - self.pan_x) / self.zoom - 40) / 20))
+        return max(first, 0), min(max(last, 0), cycles)
+
     def render_text(self, text, x_pos, y_pos):
         """Handle text drawing operations."""
         GL.glColor3f(0.0, 0.0, 0.0)  # text is black
@@ -400,7 +421,8 @@ class My3DGLCanvas(wxcanvas.GLCanvas):
         if monitors is not None:
             self.current_signal, self.current_monitor_points = (
                 monitors.get_signals())
-            for i in range(len(self.current_monitor_points)):
+            for i in range(len(self.signal_colours),
+                           len(self.current_monitor_points)):
                 self.signal_colours.append([random.uniform(0.0, 1.0), (
                     random.uniform(0.0, 1.0)), random.uniform(0.0, 1.0)])
 
@@ -589,6 +611,104 @@ class My3DGLCanvas(wxcanvas.GLCanvas):
         self.render(_('Canvas Cleared'))
 
 
+class NameListCtrl(wx.ListCtrl):
+    """List a filtered set of names in a virtual list control.
+
+    The control only asks for the rows that are in view, so its cost does
+    not grow with the number of names it holds.
+
+    Parameters
+    ----------
+    parent: parent window.
+    columns: list of (heading, width) pairs, one for each column.
+    get_row: function of a name returning the strings in its row.
+    get_attr: function of a name returning the wx.ItemAttr of its row, or
+              None for the default attributes.
+
+    Public methods
+    --------------
+    OnGetItemText(self, item, column): Returns the text in a cell.
+
+    OnGetItemAttr(self, item): Returns the attributes of a row.
+
+    set_names(self, names): Replaces the names in the list.
+
+    add_name(self, name): Adds a name to the end of the list.
+
+    remove_name(self, name): Removes a name from the list.
+
+    set_filter(self, text): Shows only the names containing the text.
+
+    get_name(self, item): Returns the name shown in a row.
+
+    get_selected_names(self): Returns the names in the selected rows.
+    """
+
+    def __init__(self, parent, columns, get_row, get_attr=None):
+        """Initialise the columns and the list of names."""
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL |
+                         wx.LC_HRULES | wx.SUNKEN_BORDER)
+        self.get_row = get_row
+        self.get_attr = get_attr
+        for column, (heading, width) in enumerate(columns):
+            self.InsertColumn(column, heading, width=width)
+
+        self.names = []  # every name, in order
+        self.shown_names = []  # names matching the filter
+        self.filter_text = ''
+
+    def OnGetItemText(self, item, column):
+        """Return the text in the given cell."""
+        return self.get_row(self.shown_names[item])[column]
+
+    def OnGetItemAttr(self, item):
+        """Return the attributes of the given row."""
+        if self.get_attr is None:
+            return None
+        return self.get_attr(self.shown_names[item])
+
+    def set_names(self, names):
+        """Replace the names in the list."""
+        self.names = list(names)
+        self.set_filter(self.filter_text)
+
+    def add_name(self, name):
+        """Add a name to the end of the list."""
+        self.names.append(name)
+        if self.filter_text in name.lower():
+            self.shown_names.append(name)
+            self.SetItemCount(len(self.shown_names))
+
+    def remove_name(self, name):
+        """Remove a name from the list."""
+        self.names.remove(name)
+        if name in self.shown_names:
+            self.shown_names.remove(name)
+            self.SetItemCount(len(self.shown_names))
+            self.Refresh()
+
+    def set_filter(self, text):
+        """Show only the names containing the text, ignoring case."""
+        self.filter_text = text.lower()
+        self.shown_names = [name for name in self.names
+                            if self.filter_text in name.lower()]
+        self.SetItemCount(len(self.shown_names))
+        self.Refresh()
+
+    def get_name(self, item):
+        """Return the name shown in the given row."""
+        return self.shown_names[item]
+
+    def get_selected_names(self):
+        """Return the names in the selected rows."""
+        selected_names = []
+        item = self.GetFirstSelected()
+        while item != -1:
+            selected_names.append(self.shown_names[item])
+            item = self.GetNextSelected(item)
+        return selected_names
+
+
 class Gui(wx.Frame):
     """Configure the main window and all the widgets.
 
@@ -598,6 +718,9 @@ class Gui(wx.Frame):
     Parameters
     ----------
     title: title of the window.
+    trace_reader: instance of the sharedtrace.TraceReader() class to view
+                  the signals published by another process, read-only, or
+                  None.
 
     Public methods
     --------------
@@ -623,14 +746,23 @@ class Gui(wx.Frame):
 
     onAddMP(self, event): Handle the event when the user clicks the Add button.
 
-    onRemoveMP(self, event): Handle the event when the user clicks the
-                             remove button.
+    onRemoveMP(self, event): Handle the event when the user removes the
+                             selected monitor points.
+
+    onToggleSwitch(self, event): Handle the event when the user activates a
+                                 switch in the switch list.
 
-    onToggleButton(self, event): Handle the event when the user clicks a
-                                 switch's toggle button.
+    get_switch_row(self, switch_name): Returns the strings in a switch's row.
+
+    get_switch_attr(self, switch_name): Returns the colours of a switch's
+                                        row.
 
     checkFile(self, event): Check file selected is successfully parsed.
 
+    on_reload_timer(self, event): Reload the network if the file has changed.
+
+    reloadNetwork(self): Applies the changes in the file to the loaded network.
+
     loadNetwork(self): Loads switches and monitoring points from file into GUI.
 
     clearNetwork(self): Clears the switches and monitoring points from the GUI.
@@ -642,10 +774,17 @@ class Gui(wx.Frame):
                               of runtime error.
 
     switchCanvas(self, event): Switches the OpenGL from 2D to 3D or vice-versa.
+
+    set_read_only(self): Disables the controls that change the network and
+                         starts following the published signals.
+
+    on_trace_timer(self, event): Draws the latest published signals if they
+                                 have changed.
     """
 
     def __init__(self, title, names, devices, network,
-                 monitors, path=None, scanner=None, parser=None):
+                 monitors, path=None, scanner=None, parser=None,
+                 trace_reader=None):
         """Initialise widgets and layout."""
         super().__init__(parent=None, title=title, size=(800, 600))
 
@@ -657,12 +796,19 @@ class Gui(wx.Frame):
         self.path = path
         self.scanner = scanner
         self.parser = parser
+        self.trace_reader = trace_reader
+
+        # Included library files are parsed once per session
+        self.library_cache = LibraryCache()
 
         self.loaded_network = False
-        self.number_of_mps = 0
-        self.all_mp_names = []
         self.cycles_completed = 0
-        self.loaded_switches = False
+        self.file_mtime = None
+
+        # Check the definition file for changes once a second
+        self.reload_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_reload_timer, self.reload_timer)
+        self.reload_timer.Start(1000)
 
         # Configure the file menu
         fileMenu = wx.Menu()
@@ -675,11 +821,6 @@ class Gui(wx.Frame):
         # Create panels for the frame
         self.main_panel = wx.Panel(self)
         self.top_panel = wx.Panel(self)
-        self.mp_panel = scrolled.ScrolledPanel(self.main_panel,
-                                               size=wx.Size(250, 250),
-                                               style=wx.SUNKEN_BORDER)
-        self.mp_panel.SetAutoLayout(1)
-        self.mp_panel.SetupScrolling(False, True)
 
         # Canvas for drawing signals
         self.canvas = My3DGLCanvas(self.main_panel)
@@ -708,6 +849,29 @@ class Gui(wx.Frame):
         self.mp_names = wx.Choice(self.main_panel, wx.ID_ANY,
                                   choices=[_('SELECT')])
         self.mp_names.SetSelection(0)
+        self.remove_button = wx.Button(self.main_panel, wx.ID_ANY,
+                                       _("Remove"))
+        self.text_switches = wx.StaticText(self.main_panel, wx.ID_ANY,
+                                           _("Switch Values:"))
+
+        # Monitor points and switches are listed in virtual list controls,
+        # which only draw the rows in view, with a search filter above each
+        self.mp_search = wx.SearchCtrl(self.main_panel, wx.ID_ANY)
+        self.mp_search.ShowCancelButton(True)
+        self.mp_list = NameListCtrl(
+            self.main_panel, [(_("Monitor Point"), 230)],
+            lambda mp_name: [mp_name])
+        self.mp_list.SetMinSize(wx.Size(250, 200))
+        self.switch_search = wx.SearchCtrl(self.main_panel, wx.ID_ANY)
+        self.switch_search.ShowCancelButton(True)
+        self.switch_on_attr = wx.ItemAttr()
+        self.switch_on_attr.SetBackgroundColour(wx.Colour(100, 255, 100))
+        self.switch_off_attr = wx.ItemAttr()
+        self.switch_off_attr.SetBackgroundColour(wx.Colour(255, 130, 130))
+        self.switch_list = NameListCtrl(
+            self.main_panel, [(_("Switch"), 150), (_("State"), 80)],
+            self.get_switch_row, self.get_switch_attr)
+        self.switch_list.SetMinSize(wx.Size(250, 200))
 
         # Bind events to widgets
         self.Bind(wx.EVT_MENU, self.on_menu)
@@ -716,6 +880,18 @@ class Gui(wx.Frame):
         self.continue_button.Bind(wx.EVT_BUTTON, self.on_continue_button)
         self.exit_button.Bind(wx.EVT_BUTTON, self.on_exit_button)
         self.add_button.Bind(wx.EVT_BUTTON, self.onAddMP)
+        self.remove_button.Bind(wx.EVT_BUTTON, self.onRemoveMP)
+        self.mp_list.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.onRemoveMP)
+        self.switch_list.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.onToggleSwitch)
+        self.mp_search.Bind(wx.EVT_TEXT, lambda event: self.mp_list.set_filter(
+            self.mp_search.GetValue()))
+        self.mp_search.Bind(wx.EVT_SEARCHCTRL_CANCEL_BTN,
+                            lambda event: self.mp_search.SetValue(''))
+        self.switch_search.Bind(
+            wx.EVT_TEXT, lambda event: self.switch_list.set_filter(
+                self.switch_search.GetValue()))
+        self.switch_search.Bind(wx.EVT_SEARCHCTRL_CANCEL_BTN,
+                                lambda event: self.switch_search.SetValue(''))
         self.file_picker.Bind(wx.EVT_FILEPICKER_CHANGED, self.checkFile)
         self.canvas_button.Bind(wx.EVT_BUTTON, self.switchCanvas)
         self.pos_reset_button.Bind(wx.EVT_BUTTON, self.on_reset_button)
@@ -727,8 +903,8 @@ class Gui(wx.Frame):
         self.side_sizer = wx.BoxSizer(wx.VERTICAL)
         cycle_sizer = wx.BoxSizer(wx.HORIZONTAL)
         buttons_sizer = wx.BoxSizer(wx.HORIZONTAL)
-        self.mp_sizer = wx.BoxSizer(wx.VERTICAL)
         mp_sizer_all = wx.BoxSizer(wx.VERTICAL)
+        switch_sizer_all = wx.BoxSizer(wx.VERTICAL)
         mp_control_sizer = wx.BoxSizer(wx.HORIZONTAL)
         control_buttons_sizer = wx.BoxSizer(wx.HORIZONTAL)
 
@@ -746,7 +922,8 @@ class Gui(wx.Frame):
         self.side_sizer.Add(cycle_sizer, 0, wx.ALL, 5)
         self.side_sizer.Add(buttons_sizer, 0, wx.ALL | wx.EXPAND, 5)
         self.side_sizer.Add(control_buttons_sizer, 0, wx.ALL | wx.EXPAND, 5)
-        self.side_sizer.Add(mp_sizer_all, 1, wx.ALL, 5)
+        self.side_sizer.Add(mp_sizer_all, 1, wx.ALL | wx.EXPAND, 5)
+        self.side_sizer.Add(switch_sizer_all, 1, wx.ALL | wx.EXPAND, 5)
 
         cycle_sizer.Add(self.text_cycles, 1, wx.EXPAND)
         cycle_sizer.Add(self.spin, 3, wx.LEFT | wx.RIGHT, 5)
@@ -764,9 +941,15 @@ class Gui(wx.Frame):
 
         mp_sizer_all.Add(self.text_mps, 0, wx.RIGHT, 5)
         mp_sizer_all.Add(mp_control_sizer, 0, wx.RIGHT | wx.TOP, 5)
-        mp_sizer_all.Add(self.mp_panel, 1, wx.RIGHT | wx.TOP | wx.EXPAND, 5)
+        mp_sizer_all.Add(self.mp_search, 0, wx.RIGHT | wx.TOP | wx.EXPAND, 5)
+        mp_sizer_all.Add(self.mp_list, 1, wx.RIGHT | wx.TOP | wx.EXPAND, 5)
+        mp_sizer_all.Add(self.remove_button, 0, wx.RIGHT | wx.TOP, 5)
 
-        self.mp_panel.SetSizer(self.mp_sizer)
+        switch_sizer_all.Add(self.text_switches, 0, wx.RIGHT, 5)
+        switch_sizer_all.Add(self.switch_search, 0,
+                             wx.RIGHT | wx.TOP | wx.EXPAND, 5)
+        switch_sizer_all.Add(self.switch_list, 1,
+                             wx.RIGHT | wx.TOP | wx.EXPAND, 5)
 
         # If filepath given in command line, loads network
         if self.path is not None:
@@ -779,6 +962,9 @@ class Gui(wx.Frame):
         self.SetSizeHints(800, 800)
         self.SetSizer(frame_sizer)
 
+        if self.trace_reader is not None:
+            self.set_read_only()
+
     def on_menu(self, event):
         """Handle the event when the user selects a menu item."""
         Id = event.GetId()
@@ -801,15 +987,15 @@ class Gui(wx.Frame):
 
         If successful, return True. If unsuccessful, display error message.
         """
-        for i in range(cycles):
-            if self.network.execute_network():
-                self.monitors.record_signals()
-                self.canvas.render(_('Drawing signal'), self.monitors)
-            else:
-                text = _("Error! Network oscillating.")
-                print(text)
-                self.displayError(text)
-                return False
+        self.scheduler.reset_report()
+        if self.scheduler.run(cycles, self.cycles_completed) != \
+                self.scheduler.NO_ERROR:
+            text = _("Error! Network oscillating.")
+            print(text)
+            self.displayError(text)
+            return False
+        print(self.scheduler.get_report())
+        self.canvas.render(_('Drawing signal'), self.monitors)
         return True
 
     def on_run_button(self, event):
@@ -864,13 +1050,7 @@ class Gui(wx.Frame):
         mp_name = self.mp_names.GetString(index)
         if mp_name != _('SELECT'):
             self.mp_names.Delete(index)
-            mp = mp_name.split('.')
-            if len(mp) == 1:
-                device = self.names.query(mp[0])
-                port = None
-            else:
-                device = self.names.query(mp[0])
-                port = self.names.query(mp[1])
+            [device, port] = self.devices.get_signal_ids(mp_name)
             self.monitors.make_monitor(
                 device, port, self.cycles_completed)
 
@@ -878,80 +1058,83 @@ class Gui(wx.Frame):
             reset_index = self.mp_names.FindString(_('SELECT'))
             self.mp_names.SetSelection(reset_index)
 
-            # Adds monitor point and remove button to GUI
+            # Adds monitor point to the monitor point list
             text = _("Monitor Point %s added.") % mp_name
             self.canvas.render(text)
-            self.number_of_mps += 1
-            self.all_mp_names.append(mp_name)
-            new_button = wx.Button(
-                self.mp_panel, label=_('Remove'), name=mp_name)
-            new_sizer = wx.BoxSizer(wx.HORIZONTAL)
-            new_sizer.Add(wx.StaticText(self.mp_panel, wx.ID_ANY, mp_name),
-                          1, wx.ALIGN_CENTRE)
-            new_sizer.Add(new_button, 1, wx.LEFT | wx.RIGHT | wx.TOP, 5)
-            new_button.Bind(wx.EVT_BUTTON, self.onRemoveMP)
-            self.mp_sizer.Add(new_sizer, 0, wx.RIGHT, 5)
-            self.Layout()
+            self.mp_list.add_name(mp_name)
 
     def onRemoveMP(self, event):
-        """Handle the event when the user clicks the remove button."""
-        # Finds selected monitor points and removes from monitor object
-        mp_name = event.GetEventObject().GetName()
-        mp = mp_name.split('.')
-        if len(mp) == 1:
-            device = self.names.query(mp[0])
-            port = None
-        else:
-            device = self.names.query(mp[0])
-            port = self.names.query(mp[1])
-        self.monitors.remove_monitor(device, port)
+        """Handle the event when the user removes monitor points.
 
-        # Adds monitor point to drop-down list
-        self.mp_names.Append(mp_name)
+        The selected monitor points are removed, either with the remove
+        button or by activating a row of the monitor point list.
+        """
+        for mp_name in self.mp_list.get_selected_names():
+            # Removes monitor point from monitor object
+            [device, port] = self.devices.get_signal_ids(mp_name)
+            self.monitors.remove_monitor(device, port)
 
-        # Removes monitor point and remove button from GUI
-        index = self.all_mp_names.index(mp_name)
-        text = _("Monitor Point %s removed.") % mp_name
-        self.canvas.render(text)
-        self.mp_sizer.Hide(index)
-        self.mp_sizer.Remove(index)
-        self.number_of_mps -= 1
-        self.Layout()
-        del self.all_mp_names[index]
-
-    def onToggleButton(self, event):
-        """Handle the event when the user clicks a switch's toggle button."""
-        button = event.GetEventObject()
-        switch_id = self.names.query(button.GetName())
-        if button.GetValue():
-            # Switch is off, so turn button on and green
-            self.devices.set_switch(switch_id, 1)
-            button.SetBackgroundColour(wx.Colour(100, 255, 100))
-            button.SetLabel(_('On'))
-            text = _("%s turned on.") % button.GetName()
+            # Adds monitor point to drop-down list
+            self.mp_names.Append(mp_name)
+
+            # Removes monitor point from the monitor point list
+            self.mp_list.remove_name(mp_name)
+            text = _("Monitor Point %s removed.") % mp_name
             self.canvas.render(text)
+
+    def onToggleSwitch(self, event):
+        """Handle the event when the user activates a switch in the list."""
+        item = event.GetIndex()
+        switch_name = self.switch_list.get_name(item)
+        switch_id = self.names.query(switch_name)
+        if self.devices.get_device(switch_id).switch_state == 0:
+            # Switch is off, so turn it on
+            self.devices.set_switch(switch_id, 1)
+            text = _("%s turned on.") % switch_name
         else:
-            # Switch is on, so turn button off and red
+            # Switch is on, so turn it off
             self.devices.set_switch(switch_id, 0)
-            button.SetBackgroundColour(wx.Colour(255, 130, 130))
-            button.SetLabel(_('Off'))
-            text = _("%s turned off.") % button.GetName()
-            self.canvas.render(text)
+            text = _("%s turned off.") % switch_name
+        self.switch_list.RefreshItem(item)
+        self.canvas.render(text)
+
+    def get_switch_row(self, switch_name):
+        """Return the strings in the row of the switch list for a switch."""
+        switch_id = self.names.query(switch_name)
+        if self.devices.get_device(switch_id).switch_state == 1:
+            return [switch_name, _('On')]
+        else:
+            return [switch_name, _('Off')]
+
+    def get_switch_attr(self, switch_name):
+        """Return the colours of the row of the switch list for a switch."""
+        switch_id = self.names.query(switch_name)
+        if self.devices.get_device(switch_id).switch_state == 1:
+            return self.switch_on_attr
+        else:
+            return self.switch_off_attr
 
     def checkFile(self, event):
         """Check file selected is successfully parsed.
 
         If succesful, load network. If unsuccessful, display error message.
         """
+        # Reselecting the loaded file only applies its changes
+        path = event.GetEventObject().GetPath()
+        if self.loaded_network and path == self.path:
+            self.reloadNetwork()
+            return
+
         # Run selected file path through scanner and parser
         self.names = Names()
         self.devices = Devices(self.names)
         self.network = Network(self.names, self.devices)
         self.monitors = Monitors(self.names, self.devices, self.network)
-        self.path = event.GetEventObject().GetPath()
+        self.path = path
         self.scanner = Scanner(self.path, self.names)
         self.parser = Parser(self.names, self.devices,
-                             self.network, self.monitors, self.scanner)
+                             self.network, self.monitors, self.scanner,
+                             self.library_cache)
         # Check network definition file is correctly configured
         if self.parser.parse_network():
             # Clear old network, load new and reset file picker colour
@@ -964,117 +1147,109 @@ class Gui(wx.Frame):
             self.displaySyntaxErrors()
             self.top_panel.SetBackgroundColour(wx.Colour(255, 130, 130))
 
+    def on_reload_timer(self, event):
+        """Reload the network if the definition file has changed."""
+        if not self.loaded_network or self.path is None:
+            return
+        try:
+            file_mtime = os.path.getmtime(self.path)
+        except OSError:  # the file is being replaced
+            return
+        if file_mtime != self.file_mtime:
+            self.reloadNetwork()
+
+    def reloadNetwork(self):
+        """Apply the changes in the definition file to the loaded network.
+
+        The file is parsed into a new network, which is compared with the
+        loaded one. Only the devices, connections, monitor points and
+        switches that differ are replaced, so the rest of the network keeps
+        its signals and traces. If the file has errors, the loaded network
+        is kept.
+        """
+        self.file_mtime = os.path.getmtime(self.path)
+        names = Names()
+        devices = Devices(names)
+        network = Network(names, devices)
+        monitors = Monitors(names, devices, network)
+        scanner = Scanner(self.path, names)
+        parser = Parser(names, devices, network, monitors, scanner,
+                        self.library_cache)
+        if not parser.parse_network():
+            self.scanner = scanner
+            self.displaySyntaxErrors()
+            self.file_picker.SetPath(self.path)
+            self.top_panel.SetBackgroundColour(wx.Colour(255, 130, 130))
+            return
+        self.top_panel.SetBackgroundColour(wx.NullColour)
+
+        diff = NetworkDiff(self.names, self.devices, self.network,
+                           self.monitors, names, devices, network, monitors)
+        if diff.is_empty():
+            return
+        switch_kind = self.names.query('SWITCH')
+        removed_switches = [
+            device_name for device_name in
+            diff.removed_devices + diff.changed_devices
+            if device_name in self.switch_list.names]
+        diff.apply(self.cycles_completed)
+
+        # Update only the rows of the parts that changed
+        for mp_name in diff.removed_monitors:
+            if mp_name in self.mp_list.names:
+                self.mp_list.remove_name(mp_name)
+        for mp_name in diff.added_monitors:
+            self.mp_list.add_name(mp_name)
+        for switch_name in removed_switches:
+            self.switch_list.remove_name(switch_name)
+        for device_name in diff.changed_devices + diff.added_devices:
+            [device_id] = self.names.lookup([device_name])
+            if self.devices.get_device(device_id).device_kind == switch_kind:
+                self.switch_list.add_name(device_name)
+        self.switch_list.Refresh()
+
+        self.mp_names.Clear()
+        self.mp_names.Append(_('SELECT'))
+        self.mp_names.Append(self.monitors.get_signal_names()[1])
+        self.mp_names.SetSelection(0)
+
+        text = _("Network reloaded.")
+        self.canvas.render(text, self.monitors)
+
     def loadNetwork(self):
         """Load switches and monitoring points from file into GUI."""
+        self.file_mtime = os.path.getmtime(self.path)
+        self.scheduler = Scheduler(self.names, self.devices, self.network,
+                                   self.monitors)
+
         # Find list of monitored and unmonitored signals
         signal_list = self.monitors.get_signal_names()
         monitored_signal_list = signal_list[0]
         unmonitored_signal_list = signal_list[1]
         self.mp_names.Append(unmonitored_signal_list)
 
-        # Find list of switch names
-        device_kind = self.names.query('SWITCH')
-        switch_ids = self.devices.find_devices(device_kind)
-        switch_initials = []
-        switch_names = []
-        for i in switch_ids:
-            switch = self.devices.get_device(i)
-            switch_initials.append(switch.switch_state)
-            switch_names.append(self.names.get_name_string(i))
-
         # Load monitored signals from file to GUI
-        if monitored_signal_list != []:
-            for i in monitored_signal_list:
-                mp = i.split('.')
-                if len(mp) == 1:
-                    device = self.names.query(mp[0])
-                    port = None
-                else:
-                    device = self.names.query(mp[0])
-                    port = self.names.query(mp[1])
-                self.monitors.make_monitor(
-                    device, port, self.cycles_completed)
-                self.number_of_mps += 1
-                self.all_mp_names.append(i)
-                new_button = wx.Button(
-                    self.mp_panel, label=_('Remove'), name=i)
-                new_sizer = wx.BoxSizer(wx.HORIZONTAL)
-                new_sizer.Add(wx.StaticText(self.mp_panel, wx.ID_ANY, i),
-                              1, wx.ALIGN_CENTRE)
-                new_sizer.Add(new_button, 1, wx.LEFT | wx.RIGHT | wx.TOP, 5)
-                new_button.Bind(wx.EVT_BUTTON, self.onRemoveMP)
-                self.mp_sizer.Add(new_sizer, 0, wx.RIGHT, 5)
-            self.Layout()
+        self.mp_list.set_names(monitored_signal_list)
 
         # Load switches from file to GUI
-        if switch_names != []:
-            text_switches = wx.StaticText(
-                self.main_panel, wx.ID_ANY, _("Switch Values:"))
-            switchpanel = scrolled.ScrolledPanel(
-                self.main_panel, size=wx.Size(250, 250),
-                style=wx.SUNKEN_BORDER)
-            switchpanel.SetAutoLayout(1)
-            switchpanel.SetupScrolling(False, True)
-
-            switch_sizer_container = wx.BoxSizer(wx.VERTICAL)
-            switch_sizer_all = wx.BoxSizer(wx.VERTICAL)
-
-            self.side_sizer.Add(switch_sizer_all, 1, wx.ALL, 5)
-
-            switchpanel.SetSizer(switch_sizer_container)
-
-            switch_sizer_all.Add(text_switches, 0, wx.RIGHT, 5)
-            switch_sizer_all.Add(switchpanel, 1,
-                                 wx.TOP | wx.RIGHT | wx.EXPAND, 5)
-
-            for i in range(len(switch_ids)):
-                switch_sizer = wx.BoxSizer(wx.HORIZONTAL)
-                switch_sizer.Add(wx.StaticText(
-                    switchpanel, wx.ID_ANY, '{}'.format(switch_names[i])),
-                    1, wx.ALIGN_CENTRE)
-                if switch_initials[i] == 1:
-                    button = wx.ToggleButton(
-                        switchpanel, wx.ID_ANY, _('On'),
-                        name='{}'.format(switch_names[i]))
-                    button.SetBackgroundColour(wx.Colour(100, 255, 100))
-                    button.SetValue(True)
-                else:
-                    button = wx.ToggleButton(
-                        switchpanel, wx.ID_ANY, _('Off'),
-                        name='{}'.format(switch_names[i]))
-                    button.SetBackgroundColour(wx.Colour(255, 130, 130))
-                button.Bind(wx.EVT_TOGGLEBUTTON, self.onToggleButton)
-                switch_sizer.Add(button, 1,
-                                 wx.ALIGN_CENTRE | wx.LEFT | wx.RIGHT, 5)
-                switch_sizer_container.Add(switch_sizer, 0,
-                                           wx.TOP | wx.RIGHT, 5)
-
-            self.loaded_switches = True
-            self.Layout()
+        device_kind = self.names.query('SWITCH')
+        switch_ids = self.devices.find_devices(device_kind)
+        self.switch_list.set_names([self.names.get_name_string(i)
+                                    for i in switch_ids])
 
         self.loaded_network = True
 
     def clearNetwork(self):
         """Clear the switches and monitoring points from the GUI."""
         # Clear monitored points from GUI
-        for i in range(len(self.all_mp_names)-1, -1, -1):
-            name = self.all_mp_names[i]
-            self.mp_sizer.Hide(i)
-            self.mp_sizer.Remove(i)
-            self.number_of_mps -= 1
-            self.Layout()
-            self.all_mp_names.remove(name)
+        self.mp_list.set_names([])
 
         self.mp_names.Clear()
         self.mp_names.Append(_('SELECT'))
         self.mp_names.SetSelection(0)
 
         # Clear switches from GUI
-        if self.loaded_switches is True:
-            self.side_sizer.Hide(4)
-            self.side_sizer.Remove(4)
-            self.Layout()
-            self.loaded_switches = False
+        self.switch_list.set_names([])
 
         # Clears canvas of previous signals
         self.canvas.clear()
@@ -1146,3 +1321,39 @@ class Gui(wx.Frame):
 
         # Rerender up to the current point.
         self.canvas.render(_("Switching signal"), self.monitors)
+
+    def set_read_only(self):
+        """Disable the controls that change the network.
+
+        The signals published by another process are drawn as they arrive,
+        and the cycles control sets how many of the latest cycles are shown.
+        """
+        self.reload_timer.Stop()
+        for widget in [self.file_picker, self.run_button,
+                       self.continue_button, self.add_button, self.mp_names,
+                       self.remove_button, self.mp_search, self.mp_list,
+                       self.switch_search, self.switch_list]:
+            widget.Disable()
+        self.SetTitle(" - ".join([self.GetTitle(), _("Read-only")]))
+        self.mp_list.set_names(self.trace_reader.get_names())
+
+        # (layout, cycles published, cycles shown) of the last drawing
+        self.trace_drawn = None
+        self.trace_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_trace_timer, self.trace_timer)
+        self.trace_timer.Start(200)
+
+    def on_trace_timer(self, event):
+        """Draw the latest published signals if they have changed."""
+        cycles_published = self.trace_reader.read_header()[1]
+        self.trace_reader.view_cycles = self.spin.GetValue()
+        trace_drawn = (self.trace_reader.layout, cycles_published,
+                       self.trace_reader.view_cycles)
+        if trace_drawn == self.trace_drawn:
+            return
+        if self.trace_drawn is None or \
+                self.trace_drawn[0] != self.trace_reader.layout:
+            self.mp_list.set_names(self.trace_reader.get_names())
+        self.trace_drawn = trace_drawn
+        text = "".join([_("Published cycles: "), str(cycles_published)])
+        self.canvas.render(text, self.trace_reader)
@@ -0,0 +1,123 @@
+"""Store and cache the contents of included definition files.
+
+Used in the Logic Simulator project to let a definition file include shared
+libraries of devices and connections from other definition files. Each
+library file is parsed once and cached by the hash of its contents.
+
+Classes
+-------
+Library - stores the devices, connections and includes of a library file.
+LibraryCache - caches parsed library files by content hash.
+"""
+import hashlib
+
+
+class Library:
+    """Store the devices, connections and includes of a library file.
+
+    Everything is stored as name strings rather than name IDs, so that a
+    library parsed in one session can be replayed into the Names, Devices
+    and Network instances of another.
+
+    Parameters
+    ----------
+    digest: hash of the contents of the library file.
+
+    Public methods
+    --------------
+    add_include(self, include_path): Records an included file.
+
+    add_device(self, device_name, device_kind_name, device_property): Records
+                                                    a device declaration.
+
+    add_connection(self, first_device_name, first_port_name, first_slice,
+                   second_device_name, second_port_name, second_slice):
+                                                    Records a connection.
+    """
+
+    def __init__(self, digest):
+        """Initialise the declaration lists."""
+        self.digest = digest
+
+        # includes stores the paths of included files as written, relative
+        # to the directory of the library file
+        self.includes = []
+
+        # devices stores [(device_name, device_kind_name, device_property)]
+        self.devices = []
+
+        # connections stores [(first_device_name, first_port_name,
+        #                       first_slice, second_device_name,
+        #                       second_port_name, second_slice)]
+        self.connections = []
+
+    def add_include(self, include_path):
+        """Record an included file."""
+        self.includes.append(include_path)
+
+    def add_device(self, device_name, device_kind_name, device_property):
+        """Record a device declaration."""
+        if device_property is not None:
+            device_property = list(device_property)
+        self.devices.append((device_name, device_kind_name, device_property))
+
+    def add_connection(self, first_device_name, first_port_name, first_slice,
+                       second_device_name, second_port_name, second_slice):
+        """Record a connection between two ports.
+
+        A port name of None refers to the single output of a device, and a
+        slice of None refers to the whole of a port.
+        """
+        self.connections.append((first_device_name, first_port_name,
+                                 first_slice, second_device_name,
+                                 second_port_name, second_slice))
+
+
+class LibraryCache:
+    """Cache parsed library files by the hash of their contents.
+
+    A single cache is kept for a whole session, so that reloading a
+    definition file whose libraries are unchanged only re-parses the
+    top-level file.
+
+    Parameters
+    ----------
+    No parameters.
+
+    Public methods
+    --------------
+    get_digest(self, path): Returns the hash of the contents of the file.
+
+    get_library(self, digest): Returns the cached Library with the given
+                               digest, or None.
+
+    add_library(self, library): Adds a parsed Library to the cache.
+    """
+
+    def __init__(self):
+        """Initialise the cache and its hit counters."""
+        # libraries stores {digest: Library}
+        self.libraries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_digest(self, path):
+        """Return the hash of the contents of the file at path."""
+        with open(path, "rb") as library_file:
+            return hashlib.sha256(library_file.read()).hexdigest()
+
+    def get_library(self, digest):
+        """Return the cached Library with the given digest.
+
+        Return None if no library with these contents has been parsed yet.
+        """
+        library = self.libraries.get(digest)
+        if library is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return library
+
+    def add_library(self, library):
+        """Add a parsed Library to the cache."""
+        self.libraries[library.digest] = library
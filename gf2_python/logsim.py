@@ -8,7 +8,16 @@ Usage
 -----
 Show help: logsim.py -h
 Command line user interface: logsim.py -c <file path>
+Batch run with a stimulus file: logsim.py -c <file path> -s <stimulus path>
+                                [-n <cycles>]
+Grade a stimulus file by fault simulation: logsim.py -c <file path> -f
+                                           [-s <stimulus path>] [-n <cycles>]
+Publish the signals of a command line run: logsim.py -c <file path>
+                                           -p <shared memory name> ...
+Wrap and shorten the displayed signals: logsim.py -c <file path>
+                                        [-w <width>] [-z <length>]
 Graphical user interface: logsim.py <file path>
+Read-only view of published signals: logsim.py -r <shared memory name>
 """
 import getopt
 import sys
@@ -24,6 +33,8 @@ from monitors import Monitors
 from scanner import Scanner
 from parse import Parser
 from userint import UserInterface
+from stimulus import Stimulus
+from sharedtrace import TraceReader
 from gui import Gui
 
 
@@ -36,9 +47,21 @@ def main(arg_list):
     usage_message = ("Usage:\n"
                      "Show help: logsim.py -h\n"
                      "Command line user interface: logsim.py -c <file path>\n"
-                     "Graphical user interface: logsim.py <file path>")
+                     "Batch run with a stimulus file: "
+                     "logsim.py -c <file path> -s <stimulus path> "
+                     "[-n <cycles>]\n"
+                     "Grade a stimulus file by fault simulation: "
+                     "logsim.py -c <file path> -f [-s <stimulus path>] "
+                     "[-n <cycles>]\n"
+                     "Publish the signals of a command line run: "
+                     "logsim.py -c <file path> -p <shared memory name> ...\n"
+                     "Wrap and shorten the displayed signals: "
+                     "logsim.py -c <file path> [-w <width>] [-z <length>]\n"
+                     "Graphical user interface: logsim.py <file path>\n"
+                     "Read-only view of published signals: "
+                     "logsim.py -r <shared memory name>")
     try:
-        options, arguments = getopt.getopt(arg_list, "hc:")
+        options, arguments = getopt.getopt(arg_list, "hc:s:n:p:r:w:z:f")
     except getopt.GetoptError:
         print("Error: invalid command line arguments\n")
         print(usage_message)
@@ -50,18 +73,99 @@ def main(arg_list):
     network = Network(names, devices)
     monitors = Monitors(names, devices, network)
 
-    for option, path in options:
-        if option == "-h":  # print the usage message
+    option_values = dict(options)
+    if "-h" in option_values:  # print the usage message
+        print(usage_message)
+        sys.exit()
+    if ("-s" in option_values or "-n" in option_values or
+            "-f" in option_values) and "-c" not in option_values:
+        print("Error: a stimulus file needs the command line interface\n")
+        print(usage_message)
+        sys.exit()
+    if "-p" in option_values and "-c" not in option_values:
+        print("Error: only command line runs can publish their signals\n")
+        print(usage_message)
+        sys.exit()
+    cycles = None
+    if "-n" in option_values:
+        if not option_values["-n"].isdigit():
+            print("Error: the number of cycles must be a number\n")
             print(usage_message)
             sys.exit()
-        elif option == "-c":  # use the command line user interface
-            scanner = Scanner(path, names)
-            parser = Parser(names, devices, network, monitors, scanner)
-            if parser.parse_network():
-                # Initialise an instance of the userint.UserInterface() class
-                userint = UserInterface(names, devices, network,
-                                        monitors, scanner)
-                userint.command_interface()
+        cycles = int(option_values["-n"])
+    display_options = {}
+    for option, keyword in [("-w", "width"), ("-z", "min_run")]:
+        if option in option_values:
+            if "-c" not in option_values:
+                print("Error: only command line runs display their signals "
+                      "as text\n")
+                print(usage_message)
+                sys.exit()
+            if not option_values[option].isdigit() or \
+                    int(option_values[option]) == 0:
+                print("Error: the width and length must be positive "
+                      "numbers\n")
+                print(usage_message)
+                sys.exit()
+            display_options[keyword] = int(option_values[option])
+
+    if "-c" in option_values:  # use the command line user interface
+        path = option_values["-c"]
+        scanner = Scanner(path, names)
+        parser = Parser(names, devices, network, monitors, scanner)
+        if parser.parse_network():
+            if "-p" in option_values:  # publish the signals as they run
+                if not monitors.publish_signals(option_values["-p"]):
+                    print("Error: cannot publish the signals in shared "
+                          "memory named " + option_values["-p"])
+                    sys.exit(1)
+            # The shared memory is removed however the run ends
+            try:
+                if "-f" in option_values:  # grade the stimulus by its faults
+                    stimulus = None
+                    if "-s" in option_values:
+                        stimulus = Stimulus(names, devices,
+                                            option_values["-s"])
+                    userint = UserInterface(names, devices, network, monitors,
+                                            scanner, stimulus)
+                    if not userint.fault_run(cycles):
+                        sys.exit(1)
+                elif "-s" in option_values:  # run the stimulus file in batch
+                    stimulus = Stimulus(names, devices, option_values["-s"])
+                    userint = UserInterface(names, devices, network, monitors,
+                                            scanner, stimulus, display_options)
+                    if not userint.batch_run(cycles):
+                        sys.exit(1)
+                else:
+                    # Initialise an instance of the userint.UserInterface()
+                    # class
+                    userint = UserInterface(names, devices, network,
+                                            monitors, scanner,
+                                            display_options=display_options)
+                    userint.command_interface()
+            finally:
+                monitors.stop_publishing()
+
+    if "-r" in option_values:  # view published signals in the GUI
+        try:
+            trace_reader = TraceReader(option_values["-r"])
+        except (OSError, ValueError):
+            print("Error: no signals published in shared memory named " +
+                  option_values["-r"])
+            sys.exit(1)
+        app = wx.App()
+
+        # Internationalisation
+        builtins._ = wx.GetTranslation
+        locale = wx.Locale()
+        locale.Init(wx.LANGUAGE_DEFAULT)
+        locale.AddCatalogLookupPathPrefix('./locale')
+        locale.AddCatalog('logicsimapp')
+
+        gui = Gui("Logic Simulator", names, devices, network, monitors,
+                  trace_reader=trace_reader)
+        gui.Show(True)
+        app.MainLoop()
 
     if not options:  # no option given, use the graphical user interface
 
@@ -6,9 +6,69 @@ signals.
 Classes
 -------
 Monitors - records and displays specified output signals.
+TraceWindow - a read-only view of a range of cycles of a signal trace.
 
 """
 import collections
+import itertools
+import operator
+import re
+import sys
+
+from sharedtrace import TracePublisher
+
+
+class TraceWindow:
+    """A read-only view of a range of cycles of a signal trace.
+
+    The window refers to the monitor's signal list instead of copying it, so
+    it only costs the cycles that are read from it. Indexes are relative to
+    the start of the window.
+
+    Parameters
+    ----------
+    signal_list: list of signal levels of the monitor.
+    start: first cycle in the window.
+    end: cycle after the last in the window.
+
+    Public methods
+    --------------
+    tolist(self): Returns a copy of the signals in the window as a list.
+    """
+
+    __slots__ = ("signal_list", "start", "end")
+
+    def __init__(self, signal_list, start, end):
+        """Clamp the window to the cycles recorded in the signal list."""
+        self.signal_list = signal_list
+        self.start = min(max(start, 0), len(signal_list))
+        self.end = min(max(end, self.start), len(signal_list))
+
+    def __len__(self):
+        """Return the number of cycles in the window."""
+        return self.end - self.start
+
+    def __getitem__(self, index):
+        """Return the signal at index, or a window of a slice of cycles."""
+        if isinstance(index, slice):
+            [start, end, step] = index.indices(len(self))
+            if step != 1:
+                return self.tolist()[index]
+            return TraceWindow(self.signal_list, self.start + start,
+                               self.start + end)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("trace window index out of range")
+        return self.signal_list[self.start + index]
+
+    def __iter__(self):
+        """Iterate over the signals in the window."""
+        return itertools.islice(self.signal_list, self.start, self.end)
+
+    def tolist(self):
+        """Return a copy of the signals in the window as a list."""
+        return self.signal_list[self.start:self.end]
 
 
 class Monitors:
@@ -34,7 +94,11 @@ class Monitors:
     get_monitor_signal(self, device_id, output_id): Returns the signal level of
                                                     the specified monitor.
 
-    record_signals(self): Records the current signal level of all monitors.
+    record_signals(self, cycles=1): Records the current signal level of all
+                                    monitors for the given number of cycles.
+
+    repeat_signals(self, period, repeats): Repeats the last period of every
+                                           monitor's signal trace.
 
     get_signal_names(self): Returns two lists of signal names: monitored and
                             not monitored.
@@ -43,10 +107,33 @@ class Monitors:
 
     get_margin(self): Returns the length of the longest monitor's name.
 
-    display_signals(self): Displays signal trace(s) in the text console.
+    get_trace_text(self, signal_list, min_run=None): Returns the characters
+                                                    showing a list of
+                                                    signal levels.
+
+    get_run_text(self, match): Returns the shortened text of a run of equal
+                               signals.
+
+    display_signals(self, start=0, end=None, width=None, min_run=None,
+                    file=None): Displays signal trace(s) in the text console.
 
     get_signals(self): Returns the signals and names of monitor points
                        in a list.
+
+    query_signals(self, monitors=None, start=0, end=None, buckets=None):
+                  Returns a window of cycles of the given monitors,
+                  optionally summarised in buckets.
+
+    summarise_signals(self, window, buckets): Returns the lowest and highest
+                                              level, number of changes and
+                                              number of blank cycles in each
+                                              bucket of a window.
+
+    publish_signals(self, memory_name, capacity=1024, max_monitors=64):
+                    Publishes the latest signals in named shared memory.
+
+    stop_publishing(self): Stops publishing the signals and removes the
+                           shared memory.
     """
 
     def __init__(self, names, devices, network):
@@ -59,9 +146,23 @@ class Monitors:
         # {(device_id, output_id): [signal_list]}
         self.monitors_dictionary = collections.OrderedDict()
 
+        # Counts the monitors made and removed, so that anything worked out
+        # from the monitored points can tell when it is out of date
+        self.monitor_changes = 0
+
         [self.NO_ERROR, self.NOT_OUTPUT,
          self.MONITOR_PRESENT] = self.names.unique_error_codes(3)
 
+        # Publishes the signals in shared memory for other processes, or None
+        self.publisher = None
+
+        # Translates signal levels to the characters that display them
+        self.trace_table = bytes.maketrans(
+            bytes([self.devices.LOW, self.devices.HIGH, self.devices.RISING,
+                   self.devices.FALLING, self.devices.BLANK]), b"_-/\\ ")
+        # Compiled patterns of runs of equal characters, by minimum length
+        self.run_patterns = {}
+
     def make_monitor(self, device_id, output_id, cycles_completed=0):
         """Add the specified signal to the monitors dictionary.
 
@@ -70,7 +171,7 @@ class Monitors:
         monitor_device = self.devices.get_device(device_id)
         if monitor_device is None:
             return self.network.DEVICE_ABSENT
-        elif output_id not in monitor_device.outputs:
+        elif not self.devices.is_output(device_id, output_id):
             return self.NOT_OUTPUT
         elif (device_id, output_id) in self.monitors_dictionary:
             return self.MONITOR_PRESENT
@@ -81,6 +182,9 @@ class Monitors:
             # list.
             self.monitors_dictionary[(device_id, output_id)] = [
                 self.devices.BLANK] * cycles_completed
+            self.monitor_changes += 1
+            if self.publisher is not None:
+                self.publisher.sync(self)
             return self.NO_ERROR
 
     def remove_monitor(self, device_id, output_id):
@@ -92,6 +196,9 @@ class Monitors:
             return False
         else:
             del self.monitors_dictionary[(device_id, output_id)]
+            self.monitor_changes += 1
+            if self.publisher is not None:
+                self.publisher.sync(self)
             return True
 
     def get_monitor_signal(self, device_id, output_id):
@@ -104,15 +211,36 @@ class Monitors:
         else:
             return None
 
-    def record_signals(self):
+    def record_signals(self, cycles=1):
         """Record the current signal level for every monitor.
 
-        This function is called at every simulation cycle.
+        This function is called at every simulation cycle. The level is
+        recorded once for each of the given number of cycles, for cycles in
+        which the signals do not change.
         """
         for device_id, output_id in self.monitors_dictionary:
             signal_level = self.get_monitor_signal(device_id, output_id)
-            self.monitors_dictionary[(device_id,
-                                      output_id)].append(signal_level)
+            if cycles == 1:
+                self.monitors_dictionary[(device_id,
+                                          output_id)].append(signal_level)
+            else:
+                self.monitors_dictionary[(device_id, output_id)].extend(
+                    [signal_level] * cycles)
+        if self.publisher is not None:
+            self.publisher.append(self)
+
+    def repeat_signals(self, period, repeats):
+        """Repeat the last period cycles of every signal trace.
+
+        The traces are extended by repeats copies of their last period
+        signal levels, for networks that repeat themselves every period
+        cycles.
+        """
+        for device_id, output_id in self.monitors_dictionary:
+            signal_list = self.monitors_dictionary[(device_id, output_id)]
+            signal_list.extend(signal_list[-period:] * repeats)
+        if self.publisher is not None:
+            self.publisher.append(self)
 
     def get_signal_names(self):
         """Return two signal name lists: monitored and not monitored."""
@@ -124,7 +252,13 @@ class Monitors:
 
         for device_id in self.devices.find_devices():
             device = self.devices.get_device(device_id)
-            for output_id in device.outputs:
+            output_ids = list(device.outputs)
+            for bus_output_id in device.bus_outputs or []:
+                # Each bit of a bus output can be monitored
+                output_ids.extend([
+                    self.devices.make_bit_port(bus_output_id, bit)
+                    for bit in range(device.bus_width)])
+            for output_id in output_ids:
                 if (device_id, output_id) not in self.monitors_dictionary:
                     signal_name = self.devices.get_signal_name(device_id,
                                                                output_id)
@@ -139,6 +273,8 @@ class Monitors:
         """
         for device_id, output_id in self.monitors_dictionary:
             self.monitors_dictionary[(device_id, output_id)] = []
+        if self.publisher is not None:
+            self.publisher.sync(self)
 
     def get_margin(self):
         """Return the length of the longest monitor's name.
@@ -157,26 +293,56 @@ class Monitors:
         else:
             return None
 
-    def display_signals(self):
-        """Display the signal trace(s) in the text console."""
+    def get_trace_text(self, signal_list, min_run=None):
+        """Return the characters showing a list of signal levels.
+
+        The whole list is translated at once with a table. If min_run is
+        given, runs of at least min_run equal signals are shortened to the
+        character followed by "x" and the length of the run, such as "_x500".
+        """
+        text = bytes(signal_list).translate(self.trace_table).decode("ascii")
+        if min_run is None:
+            return text
+        pattern = self.run_patterns.get(min_run)
+        if pattern is None:
+            pattern = re.compile("".join(["(.)\\1{", str(max(min_run, 2) - 1),
+                                          ",}"]))
+            self.run_patterns[min_run] = pattern
+        return pattern.sub(self.get_run_text, text)
+
+    def get_run_text(self, match):
+        """Return the text of a run of equal signals matched by a pattern."""
+        run = match.group()
+        return "".join([run[0], "x", str(len(run))])
+
+    def display_signals(self, start=0, end=None, width=None, min_run=None,
+                        file=None):
+        """Display the signal trace(s) in the text console.
+
+        The cycles from start to end are shown, in blocks of width cycles
+        if width is given, with runs of at least min_run equal signals
+        shortened by get_trace_text(). Each line is written to file, or to
+        the standard output, in a single write.
+        """
+        if file is None:
+            file = sys.stdout
+        windows, monitor_names = self.query_signals(start=start, end=end)
+        if not windows:
+            return
         margin = self.get_margin()
-        for device_id, output_id in self.monitors_dictionary:
-            monitor_name = self.devices.get_signal_name(device_id, output_id)
-            name_length = len(monitor_name)
-            signal_list = self.monitors_dictionary[(device_id, output_id)]
-            print(monitor_name + (margin - name_length) * " ", end=": ")
-            for signal in signal_list:
-                if signal == self.devices.HIGH:
-                    print("-", end="")
-                if signal == self.devices.LOW:
-                    print("_", end="")
-                if signal == self.devices.RISING:
-                    print("/", end="")
-                if signal == self.devices.FALLING:
-                    print("\\", end="")
-                if signal == self.devices.BLANK:
-                    print(" ", end="")
-            print("\n", end="")
+        labels = [monitor_name + (margin - len(monitor_name)) * " " + ": "
+                  for monitor_name in monitor_names]
+        cycles = max([len(window) for window in windows])
+        if width is None or width <= 0:
+            width = max(cycles, 1)
+        for block_start in range(0, max(cycles, 1), width):
+            if block_start:
+                file.write("\n")
+            for label, window in zip(labels, windows):
+                block = window[block_start:block_start + width]
+                file.write("".join([label,
+                                    self.get_trace_text(block.tolist(),
+                                                        min_run), "\n"]))
 
     def get_signals(self):
         """Return the signals and names of monitor points in a list."""
@@ -188,3 +354,95 @@ class Monitors:
             signal_list = self.monitors_dictionary[(device_id, output_id)]
             all_signals.append(signal_list)
         return all_signals, all_names
+
+    def query_signals(self, monitors=None, start=0, end=None, buckets=None):
+        """Return the cycles from start to end of the given monitors.
+
+        monitors is a list of (device_id, output_id) monitors, or None for
+        every monitor. The signals are returned as TraceWindow() views of
+        the monitors' signal lists, clamped to the cycles recorded, along
+        with the names of the monitors. If buckets is given, each window is
+        summarised by summarise_signals() instead. Return None if one of the
+        monitors does not exist.
+        """
+        if monitors is None:
+            monitors = list(self.monitors_dictionary)
+        if end is None:
+            end = max([len(signal_list) for signal_list in
+                       self.monitors_dictionary.values()], default=0)
+        all_signals = []
+        all_names = []
+        for device_id, output_id in monitors:
+            signal_list = self.monitors_dictionary.get((device_id, output_id))
+            if signal_list is None:
+                return None
+            all_names.append(self.devices.get_signal_name(device_id,
+                                                          output_id))
+            window = TraceWindow(signal_list, start, end)
+            if buckets is not None:
+                window = self.summarise_signals(window, buckets)
+            all_signals.append(window)
+        return all_signals, all_names
+
+    def summarise_signals(self, window, buckets):
+        """Summarise a window of a signal trace in at most buckets buckets.
+
+        The window is split into buckets of nearly equal numbers of cycles,
+        and each bucket is described by a tuple of (start cycle, lowest
+        level, highest level, number of changes, number of blank cycles).
+        The levels are LOW or HIGH, with a rising or falling signal read as
+        the level it changes to, and are None if every cycle of the bucket
+        is blank because the signal was not monitored. A change is counted
+        in the bucket of the cycle whose signal differs from the cycle
+        before, so the changes add up to those of the whole window.
+        """
+        signal_list = window.signal_list
+        cycles = len(window)
+        buckets = min(buckets, cycles)
+        levels = {self.devices.LOW: self.devices.LOW,
+                  self.devices.HIGH: self.devices.HIGH,
+                  self.devices.RISING: self.devices.HIGH,
+                  self.devices.FALLING: self.devices.LOW}
+        summary = []
+        for bucket in range(buckets):
+            bucket_start = window.start + bucket * cycles // buckets
+            bucket_end = window.start + (bucket + 1) * cycles // buckets
+            signals = [levels[signal] for signal in
+                       signal_list[bucket_start:bucket_end]
+                       if signal in levels]
+            blanks = bucket_end - bucket_start - len(signals)
+            # Compare each cycle with the one before, within the window
+            previous_start = max(bucket_start - 1, window.start)
+            changes = sum(map(operator.ne, itertools.islice(
+                signal_list, previous_start + 1, bucket_end),
+                itertools.islice(signal_list, previous_start,
+                                 bucket_end - 1)))
+            if signals:
+                summary.append((bucket_start, min(signals), max(signals),
+                                changes, blanks))
+            else:
+                summary.append((bucket_start, None, None, changes, blanks))
+        return summary
+
+    def publish_signals(self, memory_name, capacity=1024, max_monitors=64):
+        """Publish the latest signals in named shared memory.
+
+        From now on, the latest capacity signals of the first max_monitors
+        monitors are kept in the shared memory block memory_name, for
+        sharedtrace.TraceReader() instances in other processes to read.
+        Return True if successful, or False if the block cannot be made.
+        """
+        self.stop_publishing()
+        try:
+            self.publisher = TracePublisher(memory_name, capacity,
+                                            max_monitors)
+        except (OSError, ValueError):  # the name is taken or invalid
+            return False
+        self.publisher.sync(self)
+        return True
+
+    def stop_publishing(self):
+        """Stop publishing the signals and remove the shared memory."""
+        if self.publisher is not None:
+            self.publisher.close()
+            self.publisher = None
@@ -40,6 +40,9 @@ class Names:
     def __init__(self):
         """Initialise names list."""
         self.names = []
+        # name_ids stores {name_string: name_id}, so that names are found
+        # without searching the list
+        self.name_ids = {}
         self.error_code_count = 0  # how many error codes have been declared
 
     def unique_error_codes(self, num_error_codes):
@@ -60,9 +63,7 @@ class Names:
         if not type(name_string) is str:
             raise TypeError("Expected name_string to be a string")
 
-        if not (name_string in self.names):
-            return None
-        return self.names.index(name_string)
+        return self.name_ids.get(name_string)
 
     def lookup(self, name_string_list):
         """Return a list of name IDs for each name string in name_string_list.
@@ -78,10 +79,12 @@ class Names:
             if not type(name_string) is str:
                 raise TypeError("Expected name_string to be a string")
 
-            if not (name_string in self.names):
+            name_id = self.name_ids.get(name_string)
+            if name_id is None:
+                name_id = len(self.names)
                 self.names.append(name_string)
-
-            IDs.append(self.names.index(name_string))
+                self.name_ids[name_string] = name_id
+            IDs.append(name_id)
 
         return IDs
 
@@ -0,0 +1,252 @@
+"""Find and apply the differences between two parsed networks.
+
+Used in the Logic Simulator project to reload a changed definition file
+without discarding the simulation state of the unchanged parts of the
+network.
+
+Classes
+-------
+NetworkDiff - finds and applies the differences between two networks.
+"""
+
+
+class NetworkDiff:
+    """Find and apply the differences between a loaded and a new network.
+
+    The two networks have their own Names instances, so devices, ports and
+    monitors are matched by their name strings. A device is changed if its
+    kind or its property differs. Switches keep their current state, as the
+    user may have set them since the network was loaded.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class for the loaded network.
+    devices: instance of the devices.Devices() class for the loaded network.
+    network: instance of the network.Network() class for the loaded network.
+    monitors: instance of the monitors.Monitors() class for the loaded
+              network.
+    new_names: instance of the names.Names() class for the new network.
+    new_devices: instance of the devices.Devices() class for the new network.
+    new_network: instance of the network.Network() class for the new network.
+    new_monitors: instance of the monitors.Monitors() class for the new
+                  network.
+
+    Public methods
+    --------------
+    get_port_name(self, names, port_id): Returns the name string of a port,
+                                         or None for a device's only output.
+
+    get_device_description(self, devices, device_id): Returns the kind and
+                                 property of a device as name strings.
+
+    get_input_drivers(self, devices, device_id): Returns the outputs driving
+                                 each input of a device as name strings.
+
+    find_differences(self): Finds the devices, connections and monitors that
+                            differ between the two networks.
+
+    is_empty(self): Returns True if the two networks are the same.
+
+    apply(self, cycles_completed=0): Applies the differences to the loaded
+                                     network.
+    """
+
+    def __init__(self, names, devices, network, monitors, new_names,
+                 new_devices, new_network, new_monitors):
+        """Find the differences between the two networks."""
+        self.names = names
+        self.devices = devices
+        self.network = network
+        self.monitors = monitors
+        self.new_names = new_names
+        self.new_devices = new_devices
+        self.new_network = new_network
+        self.new_monitors = new_monitors
+
+        # Device names
+        self.added_devices = []
+        self.removed_devices = []
+        self.changed_devices = []
+
+        # changed_inputs stores [(device_name, input_name, drivers)], where
+        # drivers is as returned by get_input_drivers
+        self.changed_inputs = []
+
+        # Monitored signal names
+        self.added_monitors = []
+        self.removed_monitors = []
+
+        self.find_differences()
+
+    def get_port_name(self, names, port_id):
+        """Return the name string of a port.
+
+        Return None if port_id is None, the single output of a device.
+        """
+        if port_id is None:
+            return None
+        return names.get_name_string(port_id)
+
+    def get_device_description(self, devices, device_id):
+        """Return the kind and property of a device as name strings.
+
+        The property of a switch is left out, as it is simulation state.
+        """
+        device = devices.get_device(device_id)
+        device_kind_name = devices.names.get_name_string(device.device_kind)
+        if device.device_kind == devices.SWITCH:
+            return (device_kind_name, None)
+        device_property = devices.get_device_property(device_id)
+        if device_property is not None:
+            device_property = tuple(device_property)
+        return (device_kind_name, device_property)
+
+    def get_input_drivers(self, devices, device_id):
+        """Return the outputs driving each input of a device as name strings.
+
+        Return {input_name: drivers}, where drivers is a tuple of
+        (output_device_name, output_port_name, output_slice, input_slice)
+        connections in the form Network.make_bus_connection takes.
+        Unconnected inputs have no drivers.
+        """
+        names = devices.names
+        device = devices.get_device(device_id)
+        input_drivers = {}
+        for input_id, connected_output in device.inputs.items():
+            drivers = ()
+            if connected_output is not None:
+                (output_device_id, output_port_id) = connected_output
+                output_slice = None
+                bit_port = devices.get_bit_port(output_port_id)
+                if bit_port is not None:
+                    # A single bit of a bus output
+                    [output_port_id, bit] = bit_port
+                    output_slice = (bit, bit + 1)
+                drivers = ((names.get_name_string(output_device_id),
+                            self.get_port_name(names, output_port_id),
+                            output_slice, None),)
+            input_drivers[names.get_name_string(input_id)] = drivers
+
+        for input_id, segments in (device.bus_inputs or {}).items():
+            drivers = []
+            for (first_bit, width, output_device_id, output_port_id,
+                 output_bit) in sorted(segments):
+                output_device = devices.get_device(output_device_id)
+                if output_port_id in (output_device.bus_outputs or {}):
+                    output_slice = (output_bit, output_bit + width)
+                else:
+                    output_slice = None  # a scalar output
+                drivers.append((names.get_name_string(output_device_id),
+                                self.get_port_name(names, output_port_id),
+                                output_slice, (first_bit, first_bit + width)))
+            input_drivers[names.get_name_string(input_id)] = tuple(drivers)
+        return input_drivers
+
+    def find_differences(self):
+        """Find the devices, connections and monitors that differ."""
+        loaded_devices = {}
+        for device_id in self.devices.find_devices():
+            loaded_devices[self.names.get_name_string(device_id)] = device_id
+
+        new_device_names = set()
+        for new_device_id in self.new_devices.find_devices():
+            device_name = self.new_names.get_name_string(new_device_id)
+            new_device_names.add(device_name)
+            new_drivers = self.get_input_drivers(self.new_devices,
+                                                 new_device_id)
+            if device_name not in loaded_devices:
+                self.added_devices.append(device_name)
+                loaded_drivers = {}
+            else:
+                device_id = loaded_devices[device_name]
+                if self.get_device_description(self.devices, device_id) != \
+                        self.get_device_description(self.new_devices,
+                                                    new_device_id):
+                    self.changed_devices.append(device_name)
+                    loaded_drivers = {}
+                else:
+                    loaded_drivers = self.get_input_drivers(self.devices,
+                                                            device_id)
+            for input_name, drivers in new_drivers.items():
+                if loaded_drivers.get(input_name) != drivers:
+                    self.changed_inputs.append((device_name, input_name,
+                                                drivers))
+
+        for device_name in loaded_devices:
+            if device_name not in new_device_names:
+                self.removed_devices.append(device_name)
+
+        # Monitors on changed devices are made again, as their traces are
+        # discarded with the device
+        replaced_devices = set(self.removed_devices + self.changed_devices)
+        loaded_monitors = self.monitors.get_signal_names()[0]
+        new_monitors = self.new_monitors.get_signal_names()[0]
+        loaded_monitor_set = set(loaded_monitors)
+        new_monitor_set = set(new_monitors)
+        for signal_name in loaded_monitors:
+            device_name = signal_name.split(".")[0].split("[")[0]
+            if signal_name not in new_monitor_set or \
+                    device_name in replaced_devices:
+                self.removed_monitors.append(signal_name)
+        removed_monitor_set = set(self.removed_monitors)
+        for signal_name in new_monitors:
+            if signal_name not in loaded_monitor_set or \
+                    signal_name in removed_monitor_set:
+                self.added_monitors.append(signal_name)
+
+    def is_empty(self):
+        """Return True if the two networks are the same."""
+        return not (self.added_devices or self.removed_devices or
+                    self.changed_devices or self.changed_inputs or
+                    self.added_monitors or self.removed_monitors)
+
+    def apply(self, cycles_completed=0):
+        """Apply the differences to the loaded network.
+
+        Unchanged devices keep their signals, memory and monitor traces.
+        New monitors are padded with cycles_completed BLANK signals.
+        """
+        for signal_name in self.removed_monitors:
+            [device_id, output_id] = self.devices.get_signal_ids(signal_name)
+            self.monitors.remove_monitor(device_id, output_id)
+
+        for device_name in self.removed_devices + self.changed_devices:
+            [device_id] = self.names.lookup([device_name])
+            self.devices.remove_device(device_id)
+
+        # A changed device keeps its name ID, so connections from its outputs
+        # stay valid wherever the new network has the same connection
+        for device_name in self.changed_devices + self.added_devices:
+            new_device_id = self.new_names.query(device_name)
+            new_device = self.new_devices.get_device(new_device_id)
+            device_kind_name = self.new_names.get_name_string(
+                new_device.device_kind)
+            [device_id, device_kind] = self.names.lookup([device_name,
+                                                          device_kind_name])
+            self.devices.make_device(
+                device_id, device_kind,
+                self.new_devices.get_device_property(new_device_id))
+
+        for (device_name, input_name, drivers) in self.changed_inputs:
+            [device_id, input_id] = self.names.lookup([device_name,
+                                                       input_name])
+            device = self.devices.get_device(device_id)
+            if input_id in device.inputs:
+                device.inputs[input_id] = None
+            else:
+                device.bus_inputs[input_id] = []
+            for (output_device_name, output_port_name, output_slice,
+                 input_slice) in drivers:
+                [output_device_id] = self.names.lookup([output_device_name])
+                if output_port_name is None:
+                    output_port_id = None
+                else:
+                    [output_port_id] = self.names.lookup([output_port_name])
+                self.network.make_bus_connection(
+                    output_device_id, output_port_id,
+                    output_slice and list(output_slice), device_id, input_id,
+                    input_slice and list(input_slice))
+
+        for signal_name in self.added_monitors:
+            [device_id, output_id] = self.devices.get_signal_ids(signal_name)
+            self.monitors.make_monitor(device_id, output_id, cycles_completed)
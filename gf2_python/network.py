@@ -4,8 +4,97 @@ Used in the Logic Simulator project to add and connect devices together.
 
 Classes
 --------
+DTypeGroup - stores the D-types that share the drivers of their CLK, SET and
+             CLEAR inputs.
+DTypeBank - stores the D-types of a group that are executed together as
+            NumPy arrays.
 Network - builds and executes the network.
 """
+import operator
+
+try:
+    import numpy as np
+except ImportError:  # the D-types are then executed one at a time
+    np = None
+
+
+class DTypeGroup:
+    """Store the D-types that share the drivers of their CLK, SET and CLEAR.
+
+    The memory of a D-type can only change when its CLK input is RISING or
+    its SET or CLEAR input is HIGH, so the inputs of a group are read once
+    per pass to decide whether its D-types need to be executed.
+
+    Parameters
+    ----------
+    clock_slot: (outputs, output_id) of the output driving the CLK inputs.
+    set_slot: (outputs, output_id) of the output driving the SET inputs.
+    clear_slot: (outputs, output_id) of the output driving the CLEAR inputs.
+
+    Public methods
+    --------------
+    No public methods.
+    """
+
+    __slots__ = ("clock_slot", "set_slot", "clear_slot", "members",
+                 "controls", "signals", "woken", "bank")
+
+    def __init__(self, clock_slot, set_slot, clear_slot):
+        """Initialise the group's slots and members."""
+        self.clock_slot = clock_slot
+        self.set_slot = set_slot
+        self.clear_slot = clear_slot
+
+        # members lists the indexes of the D-types, their positions in the
+        # order of execution
+        self.members = []
+
+        # The SET and CLEAR signals when the group was last checked, and
+        # the CLK, SET and CLEAR signals of the current pass
+        self.controls = None
+        self.signals = None
+
+        # Whether the memory of the D-types is updated in the current pass
+        self.woken = False
+
+        # The DTypeBank of the D-types executed together, or None
+        self.bank = None
+
+
+class DTypeBank:
+    """Store the D-types of a group that are executed together.
+
+    The DATA inputs, memory and outputs of the D-types are gathered into
+    NumPy arrays, so that a rising edge of the clock latches the whole bank
+    at once. The CLK inputs of a bank are driven by a clock, which is only
+    RISING in the first pass of a cycle, when the output of a D-type that
+    reads DATA from another is the same whichever is executed first.
+
+    Parameters
+    ----------
+    members: list of (device, data_slot) of the D-types, where data_slot is
+             (outputs, output_id) of the output driving the DATA input.
+
+    Public methods
+    --------------
+    No public methods.
+    """
+
+    __slots__ = ("devices", "outputs", "data_outputs", "data_output_ids",
+                 "unsettled")
+
+    def __init__(self, members):
+        """Initialise the bank's devices, outputs and DATA slots."""
+        self.devices = [device for (device, data_slot) in members]
+        self.outputs = [device.outputs for device in self.devices]
+
+        # The outputs dictionaries and output IDs driving the DATA inputs
+        self.data_outputs = [data_slot[0] for (device, data_slot) in members]
+        self.data_output_ids = [data_slot[1] for (device, data_slot) in
+                                members]
+
+        # Whether the outputs of any of the D-types may not have settled
+        self.unsettled = True
 
 
 class Network:
@@ -34,6 +123,18 @@ class Network:
                     second_port_id): Connects the first device to the second
                                      device.
 
+    make_bus_connection(self, output_device_id, output_port_id,
+                        output_slice, input_device_id, input_port_id,
+                        input_slice): Connects an output, or a slice of a bus
+                                      output, to an input or a slice of a bus
+                                      input.
+
+    get_input_word(self, device_id, input_id): Returns the word at the given
+                                               bus input.
+
+    get_output_word(self, device_id, output_id): Returns the word at the
+                                                 given output.
+
     check_network(self): Checks if all inputs in the network are connected.
 
     update_signal(self, signal, target): Updates the signal in the direction of
@@ -47,9 +148,38 @@ class Network:
     execute_gate(self, device_id, x=None, y=None): Simulates a logic gate and
                                               updates its output signal value.
 
+    get_truth_table(self, device_kind, no_of_inputs): Returns the output
+                                      signal of a gate for each input word.
+
+    compile_gates(self): Resolves the drivers of every gate's inputs.
+
+    merge_gates(self, gates, constants): Makes logic gates of the same kind
+                                         reading the same outputs share the
+                                         outputs of one of them.
+
+    get_constant_signals(self): Returns the signals that stay as they are
+                                while the fixed switches are not set.
+
+    execute_gates(self): Simulates every logic gate using its truth table.
+
     execute_d_type(self, device_id): Simulates a D-type device and updates its
                                      output signal value.
 
+    compile_d_types(self): Groups the D-types by the drivers of their CLK,
+                           SET and CLEAR inputs.
+
+    execute_d_types(self): Simulates the D-types whose memory can change or
+                           whose outputs have not settled.
+
+    execute_bank(self, group): Simulates the D-types in the bank of a group
+                               with NumPy arrays.
+
+    execute_register(self, device_id): Simulates a bus register and updates
+                                       its output word.
+
+    execute_bus_gate(self, device_id): Simulates a logic gate over buses and
+                                       updates its output word.
+
     execute_clock(self, device_id): Simulates a clock and updates its output
                                     signal value.
 
@@ -62,6 +192,16 @@ class Network:
     update_siggens(self): If it is time to do so, set signal generator signals
                           to RISING or FALLING.
 
+    set_active_devices(self, device_ids): Restricts execution to the given
+                                          devices.
+
+    get_fan_in(self, device_ids): Returns the IDs of the devices that can
+                                  affect the given devices.
+
+    get_schedule(self): Returns the IDs of the executed devices of each kind.
+
+    execute_pass(self): Executes the devices once, in order.
+
     execute_network(self): Executes all the devices in the network for one
                            simulation cycle.
     """
@@ -73,9 +213,77 @@ class Network:
 
         [self.NO_ERROR, self.INPUT_TO_INPUT, self.OUTPUT_TO_OUTPUT,
          self.INPUT_CONNECTED, self.PORT_ABSENT,
-         self.DEVICE_ABSENT] = self.names.unique_error_codes(6)
+         self.DEVICE_ABSENT, self.WIDTH_MISMATCH,
+         self.BAD_SLICE] = self.names.unique_error_codes(8)
         self.steady_state = True  # for checking if signals have settled
 
+        # Counts the connections made, so that anything compiled from the
+        # connections can tell when it is out of date
+        self.connection_changes = 0
+
+        # The compiled gates and the device and connection counts they were
+        # compiled from
+        self.compiled_gates = None
+        self.compiled_gates_key = None
+
+        # gate_signals lists (device_kind, x, y) for each kind of gate in the
+        # order they are executed, where x and y are as in execute_gate
+        self.gate_signals = [
+            (self.devices.AND, self.devices.HIGH, self.devices.HIGH),
+            (self.devices.OR, self.devices.LOW, self.devices.LOW),
+            (self.devices.NAND, self.devices.HIGH, self.devices.LOW),
+            (self.devices.NOR, self.devices.LOW, self.devices.HIGH),
+            (self.devices.XOR, None, None)]
+
+        # The devices whose outputs are those of a duplicate gate
+        self.merged_devices = []
+
+        # truth_tables stores {(device_kind, no_of_inputs): [output_signal]}
+        self.truth_tables = {}
+
+        # gate_words stores {device_id: input word of the gate's last update}
+        self.gate_words = {}
+
+        # The set of device IDs to execute, or None to execute every device
+        self.active_devices = None
+
+        # The compiled D-types, the key they were compiled from, and the
+        # set of grouped D-types whose outputs may not have settled
+        self.compiled_d_types = None
+        self.compiled_d_types_key = None
+        self.unsettled_d_types = set()
+
+        # The least number of D-types in a group that are executed together
+        # as a DTypeBank, or None to execute every D-type on its own
+        self.bank_size = None if np is None else 128
+
+        # latch_table[data, memory] is the memory of a banked D-type after
+        # its clock rises, and update_table[signal, target] is its output
+        # after update_signal, or BLANK if the update is unsuccessful
+        if np is not None:
+            self.latch_table = np.zeros((5, 2), np.uint8)
+            self.update_table = np.zeros((5, 2), np.uint8)
+            for signal in [self.devices.LOW, self.devices.HIGH,
+                           self.devices.RISING, self.devices.FALLING,
+                           self.devices.BLANK]:
+                for memory in [self.devices.LOW, self.devices.HIGH]:
+                    if signal in [self.devices.HIGH, self.devices.FALLING]:
+                        self.latch_table[signal, memory] = self.devices.HIGH
+                    elif signal in [self.devices.LOW, self.devices.RISING]:
+                        self.latch_table[signal, memory] = self.devices.LOW
+                    else:
+                        self.latch_table[signal, memory] = memory
+                    updated_signal = self.update_signal(signal, memory)
+                    if updated_signal is None:
+                        updated_signal = self.devices.BLANK
+                    self.update_table[signal, memory] = updated_signal
+            self.steady_state = True
+
+        # schedule stores {device_kind: [device_id]} for the executed
+        # devices, and the device and connection counts it was made from
+        self.schedule = None
+        self.schedule_key = None
+
     def get_connected_output(self, device_id, input_id):
         """Return the output connected to the given input.
 
@@ -111,6 +319,13 @@ class Network:
         if device is not None:
             if output_id in device.outputs:
                 return device.outputs[output_id]
+            elif self.devices.is_output(device_id, output_id):
+                # A single bit of a bus output
+                [bus_port_id, bit] = self.devices.get_bit_port(output_id)
+                if (device.bus_outputs[bus_port_id] >> bit) & 1:
+                    return self.devices.HIGH
+                else:
+                    return self.devices.LOW
         return None
 
     def make_connection(self, first_device_id, first_port_id, second_device_id,
@@ -136,6 +351,7 @@ class Network:
                 # Make connection
                 first_device.inputs[first_port_id] = (second_device_id,
                                                       second_port_id)
+                self.connection_changes += 1
                 error_type = self.NO_ERROR
             else:  # second_port_id is not a valid input or output port
                 error_type = self.PORT_ABSENT
@@ -151,6 +367,7 @@ class Network:
                 else:
                     second_device.inputs[second_port_id] = (first_device_id,
                                                             first_port_id)
+                    self.connection_changes += 1
                     error_type = self.NO_ERROR
             else:
                 error_type = self.PORT_ABSENT
@@ -160,6 +377,129 @@ class Network:
 
         return error_type
 
+    def make_bus_connection(self, output_device_id, output_port_id,
+                            output_slice, input_device_id, input_port_id,
+                            input_slice):
+        """Connect an output to an input, where either may be a bus.
+
+        A slice is a [first_bit, last_bit + 1] pair selecting part of a bus
+        port, or None for the whole port. Connections between two scalar
+        ports are made by make_connection. Return self.NO_ERROR if
+        successful, or the corresponding error if not.
+        """
+        output_device = self.devices.get_device(output_device_id)
+        input_device = self.devices.get_device(input_device_id)
+        if output_device is None or input_device is None:
+            return self.DEVICE_ABSENT
+
+        output_is_bus = (output_device.bus_outputs is not None and
+                         output_port_id in output_device.bus_outputs)
+        input_is_bus = (input_device.bus_inputs is not None and
+                        input_port_id in input_device.bus_inputs)
+
+        if not output_is_bus and not input_is_bus:
+            if output_slice is not None or input_slice is not None:
+                return self.BAD_SLICE  # only bus ports can be sliced
+            return self.make_connection(output_device_id, output_port_id,
+                                        input_device_id, input_port_id)
+
+        # Check the ports have the right directions
+        if output_is_bus:
+            output_width = output_device.bus_width
+        elif output_port_id in output_device.outputs:
+            output_width = 1
+        elif output_port_id in output_device.inputs or \
+                output_port_id in (output_device.bus_inputs or {}):
+            return self.INPUT_TO_INPUT
+        else:
+            return self.PORT_ABSENT
+        if input_is_bus:
+            input_width = input_device.bus_width
+        elif input_port_id in input_device.inputs:
+            input_width = 1
+        elif input_port_id in input_device.outputs or \
+                input_port_id in (input_device.bus_outputs or {}):
+            return self.OUTPUT_TO_OUTPUT
+        else:
+            return self.PORT_ABSENT
+
+        # Find the connected bits on each side
+        if output_slice is not None and not output_is_bus:
+            return self.BAD_SLICE
+        if input_slice is not None and not input_is_bus:
+            return self.BAD_SLICE
+        [output_first, output_last] = output_slice or [0, output_width]
+        [input_first, input_last] = input_slice or [0, input_width]
+        if not (0 <= output_first < output_last <= output_width and
+                0 <= input_first < input_last <= input_width):
+            return self.BAD_SLICE
+        width = output_last - output_first
+        if width != input_last - input_first:
+            return self.WIDTH_MISMATCH
+
+        if not input_is_bus:
+            # A single bus bit drives a scalar input through its bit port
+            if input_device.inputs[input_port_id] is not None:
+                return self.INPUT_CONNECTED
+            bit_port_id = self.devices.make_bit_port(output_port_id,
+                                                     output_first)
+            input_device.inputs[input_port_id] = (output_device_id,
+                                                  bit_port_id)
+            self.connection_changes += 1
+            return self.NO_ERROR
+
+        segments = input_device.bus_inputs[input_port_id]
+        for (first_bit, segment_width, _, _, _) in segments:
+            if (first_bit < input_last and
+                    input_first < first_bit + segment_width):
+                # Some of the input bits are already in a connection
+                return self.INPUT_CONNECTED
+        segments.append((input_first, width, output_device_id,
+                         output_port_id, output_first))
+        self.connection_changes += 1
+        return self.NO_ERROR
+
+    def get_input_word(self, device_id, input_id):
+        """Return the word at the given bus input.
+
+        Each bit is HIGH (1) if the connected output is HIGH or FALLING, as a
+        D-type reads its DATA input. Return None if the bus input is
+        unconnected or the specified IDs are invalid.
+        """
+        device = self.devices.get_device(device_id)
+        if device is None or device.bus_inputs is None:
+            return None
+        segments = device.bus_inputs.get(input_id)
+        if not segments:
+            return None
+
+        word = 0
+        for (first_bit, width, output_device_id, output_port_id,
+             output_bit) in segments:
+            output_word = self.get_output_word(output_device_id,
+                                               output_port_id)
+            word |= ((output_word >> output_bit) & ((1 << width) - 1)) \
+                << first_bit
+        return word
+
+    def get_output_word(self, device_id, output_id):
+        """Return the word at the given output.
+
+        A scalar output gives a one-bit word. Return None if either of the
+        specified IDs is invalid.
+        """
+        device = self.devices.get_device(device_id)
+        if device is not None and device.bus_outputs is not None:
+            if output_id in device.bus_outputs:
+                return device.bus_outputs[output_id]
+        signal = self.get_output_signal(device_id, output_id)
+        if signal is None:
+            return None
+        elif signal in [self.devices.HIGH, self.devices.FALLING]:
+            return 1
+        else:
+            return 0
+
     def check_network(self):
         """Return True if all inputs in the network are connected."""
         for device_id in self.devices.find_devices():
@@ -167,6 +507,12 @@ class Network:
             for input_id in device.inputs:
                 if self.get_connected_output(device_id, input_id) is None:
                     return False
+            if device.bus_inputs is not None:
+                # Connected slices of a bus input never overlap
+                for segments in device.bus_inputs.values():
+                    if sum([segment[1] for segment in segments]) != \
+                            device.bus_width:
+                        return False
         return True
 
     def update_signal(self, signal, target):
@@ -259,6 +605,256 @@ class Network:
         device.outputs[None] = updated_signal
         return True
 
+    def get_truth_table(self, device_kind, no_of_inputs):
+        """Return the output signal of a gate for each of its input words.
+
+        For an XOR gate, the input word holds the two input signals, two
+        bits each. For the other gates, bit i of the input word is set if
+        input i is at the signal x of execute_gate, as only whether every
+        input is at x matters. Tables are made once and memoized.
+        """
+        key = (device_kind, no_of_inputs)
+        if key not in self.truth_tables:
+            if device_kind == self.devices.XOR:
+                table = []
+                for word in range(16):
+                    if word & 3 == word >> 2:  # both inputs the same
+                        table.append(self.devices.LOW)
+                    else:
+                        table.append(self.devices.HIGH)
+            else:
+                if device_kind in [self.devices.AND, self.devices.NOR]:
+                    y = self.devices.HIGH
+                else:
+                    y = self.devices.LOW
+                table = [self.invert_signal(y)] * (1 << no_of_inputs)
+                table[-1] = y  # every input is at x
+            self.truth_tables[key] = table
+        return self.truth_tables[key]
+
+    def compile_gates(self):
+        """Resolve the drivers of every logic gate's inputs.
+
+        Return a list of (device_id, outputs, drivers, table, x, y) for the
+        gates, in the order they are executed, where drivers is a list of
+        (driver_outputs, driver_port_id) slots from which the input signals
+        are read directly. The drivers are None for a gate with an input
+        that is unconnected or connected to a single bit of a bus, which is
+        simulated by execute_gate instead. Gates merged by merge_gates are
+        not in the list.
+
+        Gates are folded using the signals of get_constant_signals. An
+        input that is constant at the gate's x is left out of its drivers,
+        as it never decides the output, and a gate whose output is constant
+        has no drivers and a table of the constant alone, so that its
+        output settles to the constant as if its inputs had set it. The
+        list is compiled again whenever devices, connections or the fixed
+        switches have changed.
+        """
+        key = (self.devices.device_changes, self.connection_changes,
+               self.devices.fixed_switch_changes)
+        if self.compiled_gates_key == key:
+            return self.compiled_gates
+
+        # Duplicate gates share outputs only until the gates are compiled
+        # again
+        for device in self.merged_devices:
+            device.outputs = dict(device.outputs)
+
+        schedule = self.get_schedule()
+        constants = self.get_constant_signals()
+        # gates lists (device_id, device_kind, x, y, input_keys), where
+        # input_keys are the (device_id, port_id) outputs read by the gate,
+        # or None if it is simulated by execute_gate
+        gates = []
+        for (device_kind, x, y) in self.gate_signals:
+            for device_id in schedule[device_kind]:
+                device = self.devices.get_device(device_id)
+                input_keys = []
+                for connected_output in device.inputs.values():
+                    if connected_output is None:
+                        input_keys = None
+                        break
+                    if x is not None and connected_output in constants:
+                        continue  # a constant input at x never decides
+                    (output_device_id, output_port_id) = connected_output
+                    output_device = self.devices.get_device(output_device_id)
+                    if output_port_id not in output_device.outputs:
+                        input_keys = None  # a single bit of a bus output
+                        break
+                    input_keys.append(connected_output)
+                gates.append((device_id, device_kind, x, y, input_keys))
+        merged_ids = self.merge_gates(gates, constants)
+
+        compiled_gates = []
+        for (device_id, device_kind, x, y, input_keys) in gates:
+            if device_id in merged_ids:
+                continue
+            device = self.devices.get_device(device_id)
+            if (device_id, None) in constants:
+                # Settle towards the constant, as a gate with no inputs
+                signal = constants[(device_id, None)]
+                compiled_gates.append((device_id, device.outputs, [],
+                                       [signal], signal, signal))
+            elif input_keys is None:
+                compiled_gates.append((device_id, device.outputs, None,
+                                       None, x, y))
+            else:
+                drivers = [(self.devices.get_device(output_device_id).outputs,
+                            output_port_id) for (output_device_id,
+                                                 output_port_id) in input_keys]
+                table = self.get_truth_table(device_kind, len(drivers))
+                compiled_gates.append((device_id, device.outputs, drivers,
+                                       table, x, y))
+
+        self.compiled_gates = compiled_gates
+        self.compiled_gates_key = key
+        self.gate_words = {}
+        return compiled_gates
+
+    def merge_gates(self, gates, constants):
+        """Merge logic gates of the same kind reading the same outputs.
+
+        gates is a list of (device_id, device_kind, x, y, input_keys) as in
+        compile_gates. Gates are found to be the same by hashing their kind
+        and the set of the outputs they read, in rounds until no more are
+        found, as merging gates can make the gates they drive the same. The
+        first of each set of the same gates is the representative, and the
+        others are given its outputs dictionary, so that their outputs
+        follow it without being executed. Return the set of the IDs of the
+        merged gates.
+        """
+        # representatives stores {device_id: representative_id} for the
+        # merged gates
+        representatives = {}
+
+        def get_representative(key):
+            (device_id, port_id) = key
+            while device_id in representatives:
+                device_id = representatives[device_id]
+            return (device_id, port_id)
+
+        merging = True
+        while merging:
+            merging = False
+            signatures = {}
+            for (device_id, device_kind, x, y, input_keys) in gates:
+                if input_keys is None or device_id in representatives or \
+                        (device_id, None) in constants:
+                    continue
+                signature = (device_kind, frozenset(
+                    [get_representative(key) for key in input_keys]))
+                representative_id = signatures.setdefault(signature,
+                                                          device_id)
+                if representative_id != device_id:
+                    representatives[device_id] = representative_id
+                    merging = True
+
+        self.merged_devices = []
+        for device_id in representatives:
+            (representative_id, port_id) = get_representative((device_id,
+                                                               None))
+            device = self.devices.get_device(device_id)
+            device.outputs = self.devices.get_device(
+                representative_id).outputs
+            self.merged_devices.append(device)
+        return set(representatives)
+
+    def get_constant_signals(self):
+        """Return the signals that stay as they are while switches are fixed.
+
+        The result is of the form {(device_id, output_id): signal}, for the
+        active switches in devices.fixed_switches and the logic gates whose
+        outputs they decide, directly or through other gates. A gate output
+        is constant if an input is constant at the inverse of the gate's x,
+        or if every input is constant.
+        """
+        schedule = self.get_schedule()
+        constants = {}
+        for device_id in schedule[self.devices.SWITCH]:
+            if device_id in self.devices.fixed_switches:
+                constants[(device_id, None)] = \
+                    self.devices.get_device(device_id).switch_state
+        if not constants:
+            return constants
+
+        # readers stores {(device_id, output_id): [gate_id]} for the gates
+        # reading each output
+        readers = {}
+        gate_signals = {}
+        for (device_kind, x, y) in self.gate_signals:
+            for device_id in schedule[device_kind]:
+                gate_signals[device_id] = (x, y)
+                device = self.devices.get_device(device_id)
+                for connected_output in device.inputs.values():
+                    readers.setdefault(connected_output, []).append(device_id)
+
+        unvisited = list(constants)
+        while unvisited:
+            for device_id in readers.get(unvisited.pop(), []):
+                if (device_id, None) in constants:
+                    continue
+                input_signals = [
+                    constants.get(connected_output) for connected_output in
+                    self.devices.get_device(device_id).inputs.values()]
+                (x, y) = gate_signals[device_id]
+                if x is None:  # XOR gate
+                    if None in input_signals:
+                        continue
+                    if input_signals[0] == input_signals[1]:
+                        signal = self.devices.LOW
+                    else:
+                        signal = self.devices.HIGH
+                elif [input_signal for input_signal in input_signals
+                      if input_signal not in [x, None]]:
+                    signal = self.invert_signal(y)
+                elif None not in input_signals:
+                    signal = y
+                else:
+                    continue
+                constants[(device_id, None)] = signal
+                unvisited.append((device_id, None))
+        return constants
+
+    def execute_gates(self):
+        """Simulate every logic gate using its truth table.
+
+        Each gate's input word is read from its resolved drivers and looked
+        up in its truth table. A gate is skipped if its input word is the
+        same as at its last update and its output is HIGH or LOW, as its
+        output has then reached the target and updating it would change
+        nothing. Return True if successful.
+        """
+        gate_words = self.gate_words
+        for (device_id, outputs, drivers, table, x,
+             y) in self.compile_gates():
+            if drivers is None:
+                if not self.execute_gate(device_id, x, y):
+                    return False
+                continue
+
+            if x is None:  # XOR gate
+                word = (drivers[0][0][drivers[0][1]] |
+                        drivers[1][0][drivers[1][1]] << 2)
+            else:
+                word = 0
+                bit = 1
+                for (driver_outputs, driver_port_id) in drivers:
+                    if driver_outputs[driver_port_id] == x:
+                        word |= bit
+                    bit <<= 1
+
+            signal = outputs[None]
+            if gate_words.get(device_id) == word and \
+                    signal in [self.devices.LOW, self.devices.HIGH]:
+                continue
+            gate_words[device_id] = word
+            updated_signal = self.update_signal(signal, table[word])
+            if updated_signal is None:  # if the update is unsuccessful
+                return False
+            outputs[None] = updated_signal
+        return True
+
     def execute_d_type(self, device_id):
         """Simulate a D-type device and update its output signal value.
 
@@ -307,6 +903,288 @@ class Network:
 
         return True
 
+    def compile_d_types(self):
+        """Group the D-types by the drivers of their CLK, SET and CLEAR.
+
+        Return (groups, members, d_types), where groups is a list of
+        DTypeGroup, members is a list of (device, data_slot, group) for the
+        D-types in the order they are executed, and d_types lists the
+        indexes in members of the D-types executed by execute_d_type in
+        every pass, whose data_slot and group are None. These are the
+        D-types with an input that is unconnected or connected to a bit of
+        a bus, and those whose CLK, SET or CLEAR is driven by a D-type,
+        which can change during the pass.
+
+        The D-types of a group whose CLK is driven by a clock are put in
+        the group's DTypeBank, if there are at least bank_size of them,
+        unless a D-type outside such a group reads their outputs. They are
+        then left out of the group's members. The D-types are compiled
+        again whenever the gates are, or the devices have been started up,
+        and every grouped D-type is then executed once.
+        """
+        # Merged gates must have their outputs before the slots are found
+        self.compile_gates()
+        key = (self.compiled_gates_key, self.devices.startup_changes,
+               self.bank_size)
+        if self.compiled_d_types_key == key:
+            return self.compiled_d_types
+
+        groups = {}
+        clocked_groups = set()  # the groups whose CLK is driven by a clock
+        members = []
+        d_types = []
+        self.unsettled_d_types = set()
+        for index, device_id in enumerate(
+                self.get_schedule()[self.devices.D_TYPE]):
+            device = self.devices.get_device(device_id)
+            slots = {}
+            for input_id in self.devices.dtype_input_ids:
+                connected_output = device.inputs[input_id]
+                if connected_output is None:
+                    break
+                (output_device_id, output_port_id) = connected_output
+                output_device = self.devices.get_device(output_device_id)
+                if output_port_id not in output_device.outputs:
+                    break  # a single bit of a bus output
+                if input_id != self.devices.DATA_ID and \
+                        output_device.device_kind == self.devices.D_TYPE:
+                    break  # a control that can change during the pass
+                slots[input_id] = (output_device.outputs, output_port_id)
+            if len(slots) < len(self.devices.dtype_input_ids):
+                members.append((device, None, None))
+                d_types.append(index)
+                continue
+
+            group_key = tuple([device.inputs[input_id] for input_id in
+                               [self.devices.CLK_ID, self.devices.SET_ID,
+                                self.devices.CLEAR_ID]])
+            if group_key not in groups:
+                groups[group_key] = DTypeGroup(
+                    slots[self.devices.CLK_ID], slots[self.devices.SET_ID],
+                    slots[self.devices.CLEAR_ID])
+                clock_device = self.devices.get_device(group_key[0][0])
+                if clock_device.device_kind == self.devices.CLOCK:
+                    clocked_groups.add(groups[group_key])
+            group = groups[group_key]
+            members.append((device, slots[self.devices.DATA_ID], group))
+            group.members.append(index)
+            self.unsettled_d_types.add(index)
+
+        if self.bank_size is not None:
+            # A D-type outside a clocked group can read DATA in any pass,
+            # when the outputs it reads depend on the order of execution
+            unbanked_ids = set()
+            for (device, data_slot, group) in members:
+                if group not in clocked_groups:
+                    unbanked_ids.update([connected_output[0] for
+                                         connected_output in
+                                         device.inputs.values()
+                                         if connected_output is not None])
+            for group in groups.values():
+                if group not in clocked_groups:
+                    continue
+                banked = set([index for index in group.members if
+                              members[index][0].device_id not in
+                              unbanked_ids])
+                if len(banked) < self.bank_size:
+                    continue
+                group.bank = DTypeBank([members[index][:2] for index in
+                                        group.members if index in banked])
+                group.members = [index for index in group.members if
+                                 index not in banked]
+                self.unsettled_d_types.difference_update(banked)
+
+        self.compiled_d_types = (list(groups.values()), members, d_types)
+        self.compiled_d_types_key = key
+        return self.compiled_d_types
+
+    def execute_d_types(self):
+        """Simulate the D-types whose memory or outputs can change.
+
+        The CLK, SET and CLEAR inputs of each group are read once. The
+        D-types of a group are woken if CLK is RISING, or if SET or CLEAR
+        is HIGH and either has changed since the group was last checked;
+        otherwise their memory stays as it is. The bank of a group is
+        executed by execute_bank if the group is woken or the bank has not
+        settled. The other woken D-types, those whose outputs have not yet
+        settled to their memory, and those executed by execute_d_type are
+        then executed in order. Return True if successful.
+        """
+        (groups, members, d_types) = self.compile_d_types()
+        HIGH = self.devices.HIGH
+        LOW = self.devices.LOW
+        unsettled = self.unsettled_d_types
+
+        woken_groups = []
+        for group in groups:
+            (clock_outputs, clock_port_id) = group.clock_slot
+            (set_outputs, set_port_id) = group.set_slot
+            (clear_outputs, clear_port_id) = group.clear_slot
+            controls = (set_outputs[set_port_id],
+                        clear_outputs[clear_port_id])
+            clock_signal = clock_outputs[clock_port_id]
+            if clock_signal == self.devices.RISING or \
+                    (controls != group.controls and HIGH in controls):
+                group.woken = True
+                group.signals = (clock_signal,) + controls
+                woken_groups.append(group)
+            group.controls = controls
+            if group.bank is not None and \
+                    (group.woken or group.bank.unsettled):
+                if not self.execute_bank(group):
+                    return False
+
+        if woken_groups or unsettled or d_types:
+            indexes = unsettled.union(d_types)
+            for group in woken_groups:
+                indexes.update(group.members)
+            for index in sorted(indexes):
+                (device, data_slot, group) = members[index]
+                if group is None:
+                    if not self.execute_d_type(device.device_id):
+                        return False
+                    continue
+
+                if group.woken:
+                    (clock_signal, set_signal, clear_signal) = group.signals
+                    if clock_signal == self.devices.RISING:
+                        data_signal = data_slot[0][data_slot[1]]
+                        if data_signal in [HIGH, self.devices.FALLING]:
+                            device.dtype_memory = HIGH
+                        elif data_signal in [LOW, self.devices.RISING]:
+                            device.dtype_memory = LOW
+                    if set_signal == HIGH:
+                        device.dtype_memory = HIGH
+                    if clear_signal == HIGH:
+                        device.dtype_memory = LOW
+
+                # Update the outputs towards the memory
+                memory = device.dtype_memory
+                inverse_memory = self.invert_signal(memory)
+                outputs = device.outputs
+                new_Q = self.update_signal(outputs[self.devices.Q_ID],
+                                           memory)
+                new_QBAR = self.update_signal(
+                    outputs[self.devices.QBAR_ID], inverse_memory)
+                if new_Q is None or new_QBAR is None:
+                    return False
+                outputs[self.devices.Q_ID] = new_Q
+                outputs[self.devices.QBAR_ID] = new_QBAR
+                if new_Q == memory and new_QBAR == inverse_memory:
+                    unsettled.discard(index)
+                else:
+                    unsettled.add(index)
+
+        for group in woken_groups:
+            group.woken = False
+        return True
+
+    def execute_bank(self, group):
+        """Simulate the D-types in the bank of a group with NumPy arrays.
+
+        The memory of the D-types is updated as in execute_d_types if the
+        group is woken, and their outputs are updated towards it. Only the
+        memory and outputs that change are written back to the devices.
+        Return True if successful.
+        """
+        bank = group.bank
+        count = len(bank.devices)
+        old_memory = np.fromiter(map(operator.attrgetter("dtype_memory"),
+                                     bank.devices), np.uint8, count)
+        memory = old_memory
+        if group.woken:
+            (clock_signal, set_signal, clear_signal) = group.signals
+            if clock_signal == self.devices.RISING:
+                data = np.fromiter(map(operator.getitem, bank.data_outputs,
+                                       bank.data_output_ids), np.uint8, count)
+                memory = self.latch_table[data, memory]
+            if set_signal == self.devices.HIGH:
+                memory = np.full(count, self.devices.HIGH, np.uint8)
+            if clear_signal == self.devices.HIGH:
+                memory = np.full(count, self.devices.LOW, np.uint8)
+            for index, signal in zip(
+                    np.flatnonzero(memory != old_memory).tolist(),
+                    memory[memory != old_memory].tolist()):
+                bank.devices[index].dtype_memory = signal
+
+        # Update the outputs towards the memory
+        inverse_memory = (self.devices.HIGH + self.devices.LOW) - memory
+        Q = np.fromiter(map(operator.itemgetter(self.devices.Q_ID),
+                            bank.outputs), np.uint8, count)
+        QBAR = np.fromiter(map(operator.itemgetter(self.devices.QBAR_ID),
+                               bank.outputs), np.uint8, count)
+        new_Q = self.update_table[Q, memory]
+        new_QBAR = self.update_table[QBAR, inverse_memory]
+        if (new_Q == self.devices.BLANK).any() or \
+                (new_QBAR == self.devices.BLANK).any():
+            return False  # if the update is unsuccessful
+        changed = (new_Q != Q) | (new_QBAR != QBAR)
+        if changed.any():
+            self.steady_state = False
+            Q_ID = self.devices.Q_ID
+            QBAR_ID = self.devices.QBAR_ID
+            bank_outputs = bank.outputs
+            for index, Q_signal, QBAR_signal in zip(
+                    np.flatnonzero(changed).tolist(),
+                    new_Q[changed].tolist(), new_QBAR[changed].tolist()):
+                outputs = bank_outputs[index]
+                outputs[Q_ID] = Q_signal
+                outputs[QBAR_ID] = QBAR_signal
+        bank.unsettled = not (np.array_equal(new_Q, memory) and
+                              np.array_equal(new_QBAR, inverse_memory))
+        return True
+
+    def execute_register(self, device_id):
+        """Simulate a bus register and update its output word.
+
+        Return True if successful.
+        """
+        device = self.devices.get_device(device_id)
+        clock_signal = self.get_input_signal(device_id, self.devices.CLK_ID)
+        if clock_signal is None:  # if the clock input is unconnected
+            return False
+
+        # Store the DATA bus on the rising edge of the clock. The Q bus only
+        # follows once the edge has passed, so that every register stores
+        # the words from before the edge.
+        if clock_signal == self.devices.RISING:
+            data_word = self.get_input_word(device_id, self.devices.DATA_ID)
+            if data_word is None:  # if the data bus is unconnected
+                return False
+            device.dtype_memory = data_word
+        elif device.bus_outputs[self.devices.Q_ID] != device.dtype_memory:
+            device.bus_outputs[self.devices.Q_ID] = device.dtype_memory
+            self.steady_state = False
+        return True
+
+    def execute_bus_gate(self, device_id):
+        """Simulate a logic gate over buses and update its output word.
+
+        Each bit of the output is the gate applied to the same bit of the
+        two inputs. Return True if successful.
+        """
+        device = self.devices.get_device(device_id)
+        [first_word, second_word] = [
+            self.get_input_word(device_id, input_id)
+            for input_id in self.devices.bus_gate_input_ids]
+        if first_word is None or second_word is None:  # unconnected input
+            return False
+
+        mask = (1 << device.bus_width) - 1
+        if device.device_kind in [self.devices.BAND, self.devices.BNAND]:
+            output_word = first_word & second_word
+        elif device.device_kind in [self.devices.BOR, self.devices.BNOR]:
+            output_word = first_word | second_word
+        else:
+            output_word = first_word ^ second_word
+        if device.device_kind in [self.devices.BNAND, self.devices.BNOR]:
+            output_word = ~output_word & mask
+
+        if device.bus_outputs[None] != output_word:
+            device.bus_outputs[None] = output_word
+            self.steady_state = False
+        return True
+
     def execute_clock(self, device_id):
         """Simulate a clock and update its output signal value.
 
@@ -365,7 +1243,7 @@ class Network:
 
     def update_clocks(self):
         """If it is time to do so, set clock signals to RISING or FALLING."""
-        clock_devices = self.devices.find_devices(self.devices.CLOCK)
+        clock_devices = self.get_schedule()[self.devices.CLOCK]
         for device_id in clock_devices:
             device = self.devices.get_device(device_id)
             if device.clock_counter == device.clock_half_period:
@@ -380,7 +1258,7 @@ class Network:
 
     def update_siggens(self):
         """Set signal generator signals to RISING or FALLING."""
-        siggen_devices = self.devices.find_devices(self.devices.SIGGEN)
+        siggen_devices = self.get_schedule()[self.devices.SIGGEN]
         for device_id in siggen_devices:
             device = self.devices.get_device(device_id)
             if device.clock_counter == device.clock_half_period:
@@ -404,21 +1282,104 @@ class Network:
                         device.outputs[None] = self.devices.RISING
             device.clock_counter += 1
 
+    def set_active_devices(self, device_ids):
+        """Restrict execution to the given devices.
+
+        Only the devices in device_ids are updated by execute_pass and
+        execute_network, and the signals of the others are left as they
+        are. If device_ids is None, every device is executed.
+        """
+        if device_ids is None:
+            self.active_devices = None
+        else:
+            self.active_devices = set(device_ids)
+        self.schedule_key = None
+        self.compiled_gates_key = None
+        self.compiled_d_types_key = None
+
+    def get_fan_in(self, device_ids):
+        """Return the IDs of the devices that can affect the given devices.
+
+        The result is the set of the given devices and every device that
+        drives one of their inputs, directly or through other devices,
+        following the connections back from each input and bus input.
+        """
+        fan_in = set(device_ids)
+        unvisited = list(fan_in)
+        while unvisited:
+            device = self.devices.get_device(unvisited.pop())
+            drivers = [connected_output[0] for connected_output in
+                       device.inputs.values() if connected_output is not None]
+            for segments in (device.bus_inputs or {}).values():
+                drivers.extend([segment[2] for segment in segments])
+            for driver_id in drivers:
+                if driver_id not in fan_in:
+                    fan_in.add(driver_id)
+                    unvisited.append(driver_id)
+        return fan_in
+
+    def get_schedule(self):
+        """Return the IDs of the executed devices of each kind.
+
+        The result is of the form {device_kind: [device_id]}, listing the
+        active devices in the order they were made. It is made again
+        whenever devices or connections have changed.
+        """
+        key = (self.devices.device_changes, self.connection_changes)
+        if self.schedule_key == key:
+            return self.schedule
+
+        schedule = {}
+        for device_kind in self.devices.device_types + \
+                self.devices.gate_types + self.devices.bus_types:
+            schedule[device_kind] = [
+                device_id for device_id in
+                self.devices.find_devices(device_kind)
+                if self.active_devices is None or
+                device_id in self.active_devices]
+        self.schedule = schedule
+        self.schedule_key = key
+        return schedule
+
+    def execute_pass(self):
+        """Execute the devices once, in order.
+
+        steady_state is set to False if any signal changes. Return True if
+        successful.
+        """
+        schedule = self.get_schedule()
+        self.steady_state = True
+
+        for device_id in schedule[self.devices.SWITCH]:  # execute switches
+            if not self.execute_switch(device_id):
+                return False
+        # Execute D-type devices before clocks to catch the rising edge of
+        # the clock
+        if not self.execute_d_types():  # execute DTYPEs
+            return False
+        for device_id in schedule[self.devices.REG]:  # execute REG devices
+            if not self.execute_register(device_id):
+                return False
+        for device_id in schedule[self.devices.CLOCK]:  # complete clocks
+            if not self.execute_clock(device_id):
+                return False
+        # Execute AND, OR, NAND, NOR and XOR gate devices
+        if not self.execute_gates():
+            return False
+        for device_kind in self.devices.bus_gate_types:  # execute bus gates
+            for device_id in schedule[device_kind]:
+                if not self.execute_bus_gate(device_id):
+                    return False
+        for device_id in schedule[self.devices.SIGGEN]:  # complete siggens
+            if not self.execute_siggen(device_id):
+                return False
+        return True
+
     def execute_network(self):
         """Execute all the devices in the network for one simulation cycle.
 
         Return True if successful and the network does not oscillate.
         """
-        clock_devices = self.devices.find_devices(self.devices.CLOCK)
-        switch_devices = self.devices.find_devices(self.devices.SWITCH)
-        d_type_devices = self.devices.find_devices(self.devices.D_TYPE)
-        and_devices = self.devices.find_devices(self.devices.AND)
-        or_devices = self.devices.find_devices(self.devices.OR)
-        nand_devices = self.devices.find_devices(self.devices.NAND)
-        nor_devices = self.devices.find_devices(self.devices.NOR)
-        xor_devices = self.devices.find_devices(self.devices.XOR)
-        siggen_devices = self.devices.find_devices(self.devices.SIGGEN)
-
         # This sets clock signals to RISING or FALLING, where necessary
         self.update_clocks()
 
@@ -432,42 +1393,8 @@ class Network:
         iterations = 0
         while iterations < iteration_limit:
             iterations += 1
-            self.steady_state = True
-
-            for device_id in switch_devices:  # execute switch devices
-                if not self.execute_switch(device_id):
-                    return False
-            # Execute D-type devices before clocks to catch the rising edge of
-            # the clock
-            for device_id in d_type_devices:  # execute DTYPE devices
-                if not self.execute_d_type(device_id):
-                    return False
-            for device_id in clock_devices:  # complete clock executions
-                if not self.execute_clock(device_id):
-                    return False
-            for device_id in and_devices:  # execute AND gate devices
-                if not self.execute_gate(device_id, self.devices.HIGH,
-                                         self.devices.HIGH):
-                    return False
-            for device_id in or_devices:  # execute OR gate devices
-                if not self.execute_gate(device_id, self.devices.LOW,
-                                         self.devices.LOW):
-                    return False
-            for device_id in nand_devices:  # execute NAND gate devices
-                if not self.execute_gate(device_id, self.devices.HIGH,
-                                         self.devices.LOW):
-                    return False
-            for device_id in nor_devices:  # execute NOR gate devices
-                if not self.execute_gate(device_id, self.devices.LOW,
-                                         self.devices.HIGH):
-                    return False
-            for device_id in xor_devices:  # execute XOR devices
-                if not self.execute_gate(device_id, None, None):
-                    return False
-            for device_id in siggen_devices:  # complete siggen executions
-                if not self.execute_siggen(device_id):
-                    return False
-
+            if not self.execute_pass():
+                return False
             if self.steady_state:
                 break
         return self.steady_state
@@ -9,11 +9,14 @@ Classes
 Parser - parses the definition file and builds the logic network.
 """
 
-from scanner import Symbol
+import os
+
+from scanner import Symbol, Scanner
 from names import Names
 from devices import Devices
 from network import Network
 from monitors import Monitors
+from library import Library, LibraryCache
 
 
 class Parser:
@@ -32,13 +35,27 @@ class Parser:
     network: instance of the network.Network() class.
     monitors: instance of the monitors.Monitors() class.
     scanner: instance of the scanner.Scanner() class.
+    library_cache: instance of the library.LibraryCache() class (optional).
 
     Public methods
     --------------
     parse_network(self): Parses the circuit definition file.
 
+    parse_library(self, digest): Parses an included library file and returns
+                                 its declarations.
+
     error(self, error_ID, stopping_symbols, symbol_IDs = []): Display error and
                                     and recover to a useful parsing position
+    includelist(self): Parse the include directives
+
+    include(self): Parse the include syntax
+
+    include_file(self, path): Add the contents of an included file
+
+    compile_library(self, path, digest): Parse a library file
+
+    add_library(self, library): Add the declarations of a parsed library
+
     devicelist(self): Parse the devices section
 
     connectlist(self): Parse the connections section
@@ -52,11 +69,15 @@ class Parser:
 
     connection(self): Parse the connection syntax
 
+    bus_slice(self, stopping_symbols, symbol_IDs, single_bit=False): Parse
+                            the optional bus slice syntax
+
     monitor_point(self): Parse the monitor_point syntax
 
     """
 
-    def __init__(self, names, devices, network, monitors, scanner):
+    def __init__(self, names, devices, network, monitors, scanner,
+                 library_cache=None):
         """Initialise constants."""
         self.names = names
         self.devices = devices
@@ -64,6 +85,18 @@ class Parser:
         self.monitors = monitors
         self.scanner = scanner
 
+        # Parsed library files, shared by all parsers in a session
+        if library_cache is None:
+            library_cache = LibraryCache()
+        self.library_cache = library_cache
+
+        # Declarations of the file, recorded only when it is a library
+        self.library = None
+
+        # Files currently being included, and files included so far
+        self.include_stack = [os.path.abspath(self.scanner.path)]
+        self.included_paths = set()
+
         # Initialise current symbol
         self.symbol = Symbol()
 
@@ -73,9 +106,6 @@ class Parser:
         # Initisalise error counter
         self.error_count = 0
 
-        # Initialise an input pin counter
-        self.num_input_pin = 0
-
         # Define all Syntax Errors
         [self.NO_END, self.NO_CURLY_DEVICE,
          self.NEED_DEVICE_KEYWORD, self.NO_CURLY_CONNECT,
@@ -90,7 +120,11 @@ class Parser:
          self.NAME_STRING, self.MISSING_RIGHT_CURLY,
          self.NO_MONITOR_SEMICOLON,
          self.FLOATING_INPUT_PIN,
-         self.SIGGEN_QUALIFIER] = self.names.unique_error_codes(25)
+         self.SIGGEN_QUALIFIER, self.INCLUDE_STRING,
+         self.NO_INCLUDE_SEMICOLON, self.INCLUDE_FILE,
+         self.INCLUDE_CYCLE, self.INCLUDE_ERRORS,
+         self.INCLUDE_INVALID, self.BUS_SLICE,
+         self.MONITOR_BIT] = self.names.unique_error_codes(33)
 
     def parse_network(self):
         """Parse the circuit definition file."""
@@ -98,6 +132,7 @@ class Parser:
         self.symbol = self.scanner.get_symbol()
 
         # Main structure
+        self.includelist()
         self.devicelist()
         self.connectlist()
         self.monitorlist()
@@ -118,6 +153,33 @@ class Parser:
 
             return False
 
+    def parse_library(self, digest):
+        """Parse an included library file.
+
+        Return a Library of its declarations if successful, or None. A
+        library has no MONITOR section, and may leave input pins unconnected
+        for the including file to connect.
+        """
+        self.library = Library(digest)
+
+        # Get the first symbol from Scanner
+        self.symbol = self.scanner.get_symbol()
+
+        # Library structure
+        self.includelist()
+        self.devicelist()
+        self.connectlist()
+
+        if not (self.symbol.type == self.scanner.KEYWORD and
+                self.symbol.id == self.scanner.END_ID):
+            # Error: 'END' keyword required at end of file
+            self.error(self.NO_END, [])
+
+        if self.error_count == 0:
+            return self.library
+        else:
+            return None
+
     def error(self, error_ID, stopping_symbols, symbol_IDs=[]):
         """Display Error and recover to a useful parsing position."""
         # Increment Error Counter
@@ -197,6 +259,32 @@ class Parser:
         elif error_ID == self.SIGGEN_QUALIFIER:
             msg = "SIGGEN signal values can only be '0' or '1'"
             option = False
+        elif error_ID == self.INCLUDE_STRING:
+            msg = "Expected a quoted file path after 'INCLUDE'"
+            option = False
+        elif error_ID == self.NO_INCLUDE_SEMICOLON:
+            msg = "Include directive has to be terminated by ';'"
+            option = True
+        elif error_ID == self.BUS_SLICE:
+            msg = "Bus slice has to be '[bit]' or '[first:last]'"
+            option = False
+        elif error_ID == self.MONITOR_BIT:
+            msg = "Monitor point can only select a single bus bit '[bit]'"
+            option = False
+
+        # Included files
+        elif error_ID == self.INCLUDE_FILE:
+            msg = "Included file does not exist or is not a '.txt' file"
+            option = True
+        elif error_ID == self.INCLUDE_CYCLE:
+            msg = "File includes itself"
+            option = True
+        elif error_ID == self.INCLUDE_ERRORS:
+            msg = "Included file contains errors"
+            option = True
+        elif error_ID == self.INCLUDE_INVALID:
+            msg = "Included devices or connections clash with this file"
+            option = True
 
         # Consider Semantic Errors
         # DEVICES
@@ -237,6 +325,12 @@ class Parser:
         elif error_ID == self.network.OUTPUT_TO_OUTPUT:
             msg = "Both ports are outputs"
             option = True
+        elif error_ID == self.network.WIDTH_MISMATCH:
+            msg = "Connected bus widths differ"
+            option = True
+        elif error_ID == self.network.BAD_SLICE:
+            msg = "Bus slice is out of range or not on a bus port"
+            option = True
 
         # MONITORING
         elif error_ID == self.monitors.NOT_OUTPUT:
@@ -270,7 +364,8 @@ class Parser:
         # Define error IDs where punctuation stopping to not be moved on from
         dont_move_err_IDS = [self.INTEGER, self.NEED_PARAM, self.LOGIC_GATE,
                              self.NEED_QUALIFIER, self.SIGGEN_QUALIFIER,
-                             self.devices.EXCESS_QUALIFIER]
+                             self.devices.EXCESS_QUALIFIER, self.BUS_SLICE,
+                             self.MONITOR_BIT]
 
         # Define a move_on Boolean state
         move_on = True
@@ -309,6 +404,148 @@ class Parser:
                     if error_ID not in dont_move_err_IDS:
                         self.symbol = self.scanner.get_symbol()
 
+    def includelist(self):
+        """Parse the include directives at the start of the file."""
+        while (self.symbol.type == self.scanner.KEYWORD and
+               self.symbol.id == self.scanner.INCLUDE_ID):
+            self.include()
+
+    def include(self):
+        """Parse the include syntax."""
+        self.symbol = self.scanner.get_symbol()
+        if (self.symbol.type == self.scanner.STRING):
+            include_path = self.names.get_name_string(self.symbol.id)
+            self.symbol = self.scanner.get_symbol()
+
+            if (self.symbol.type == self.scanner.SEMICOLON):
+                self.symbol = self.scanner.get_symbol()
+            else:
+                # Error: Include directive has to be terminated by ';'
+                # Stopping symbols: ';', 'INCLUDE', 'DEVICES', 'CONNECT',
+                # 'MONITOR' or 'END' KEYWORD
+                self.error(self.NO_INCLUDE_SEMICOLON,
+                           [self.scanner.KEYWORD, self.scanner.SEMICOLON],
+                           [self.scanner.INCLUDE_ID, self.scanner.DEVICES_ID,
+                            self.scanner.CONNECT_ID, self.scanner.MONITOR_ID,
+                            self.scanner.END_ID])
+        else:
+            # Error: Expected a quoted file path after 'INCLUDE'
+            # Stopping symbols: ';', 'INCLUDE', 'DEVICES', 'CONNECT',
+            # 'MONITOR' or 'END' KEYWORD
+            self.error(self.INCLUDE_STRING,
+                       [self.scanner.KEYWORD, self.scanner.SEMICOLON],
+                       [self.scanner.INCLUDE_ID, self.scanner.DEVICES_ID,
+                        self.scanner.CONNECT_ID, self.scanner.MONITOR_ID,
+                        self.scanner.END_ID])
+
+        # Add the contents of the included file
+        if self.error_count == 0:
+            # Only include the file if no errors so far
+            if self.library is not None:
+                self.library.add_include(include_path)
+            directory = os.path.dirname(self.include_stack[-1])
+            self.include_file(os.path.join(directory, include_path))
+
+    def include_file(self, path):
+        """Add the devices and connections of the file at path.
+
+        The file is parsed only if the library cache holds no file with the
+        same contents. Return True if successful.
+        """
+        # Stopping symbols: 'INCLUDE', 'DEVICES', 'CONNECT', 'MONITOR' or
+        # 'END' KEYWORD
+        stopping_symbols = [self.scanner.KEYWORD]
+        symbol_IDs = [self.scanner.INCLUDE_ID, self.scanner.DEVICES_ID,
+                      self.scanner.CONNECT_ID, self.scanner.MONITOR_ID,
+                      self.scanner.END_ID]
+
+        path = os.path.abspath(path)
+        if path in self.include_stack:
+            self.error(self.INCLUDE_CYCLE, stopping_symbols, symbol_IDs)
+            return False
+        if path in self.included_paths:
+            return True  # each file is only included once
+        if not (path.endswith(".txt") and os.path.isfile(path)):
+            self.error(self.INCLUDE_FILE, stopping_symbols, symbol_IDs)
+            return False
+
+        digest = self.library_cache.get_digest(path)
+        library = self.library_cache.get_library(digest)
+        if library is None:
+            library = self.compile_library(path, digest)
+            if library is None:
+                self.error(self.INCLUDE_ERRORS, stopping_symbols, symbol_IDs)
+                return False
+            self.library_cache.add_library(library)
+
+        self.included_paths.add(path)
+        self.include_stack.append(path)
+        if not self.add_library(library):
+            self.error(self.INCLUDE_INVALID, stopping_symbols, symbol_IDs)
+            self.include_stack.pop()
+            return False
+        self.include_stack.pop()
+        return True
+
+    def compile_library(self, path, digest):
+        """Parse the library file at path with its own network.
+
+        Return the Library if successful. If not, return None and add the
+        errors in the library file to the scanner's list of errors.
+        """
+        names = Names()
+        devices = Devices(names)
+        network = Network(names, devices)
+        monitors = Monitors(names, devices, network)
+        scanner = Scanner(path, names)
+        parser = Parser(names, devices, network, monitors, scanner,
+                        self.library_cache)
+        parser.include_stack = self.include_stack + [path]
+
+        library = parser.parse_library(digest)
+        scanner.close_file()
+
+        if library is None:
+            # Label each error with the name of the library file
+            for library_error in scanner.error_list:
+                library_error.msg = ": ".join([os.path.basename(path),
+                                               library_error.msg])
+            self.scanner.error_list.extend(scanner.error_list)
+        return library
+
+    def add_library(self, library):
+        """Add the includes, devices and connections of a parsed library.
+
+        Return True if successful.
+        """
+        directory = os.path.dirname(self.include_stack[-1])
+        for include_path in library.includes:
+            if not self.include_file(os.path.join(directory, include_path)):
+                return False
+
+        for device_name, kind_name, device_property in library.devices:
+            [device_id, device_kind] = self.names.lookup([device_name,
+                                                          kind_name])
+            err = self.devices.make_device(device_id, device_kind,
+                                           device_property)
+            if err != self.devices.NO_ERROR:
+                return False
+
+        for (first_device_name, first_port_name, first_slice,
+             second_device_name, second_port_name,
+             second_slice) in library.connections:
+            [first_device_id, first_port_id,
+             second_device_id, second_port_id] = [
+                 None if name is None else self.names.lookup([name])[0]
+                 for name in [first_device_name, first_port_name,
+                              second_device_name, second_port_name]]
+            err = self.network.make_bus_connection(
+                first_device_id, first_port_id, first_slice,
+                second_device_id, second_port_id, second_slice)
+            if err != self.network.NO_ERROR:
+                return False
+        return True
+
     def devicelist(self):
         """Parse the devices section."""
         if (self.symbol.type == self.scanner.KEYWORD and
@@ -364,8 +601,6 @@ class Parser:
 
                 while (self.symbol.type == self.scanner.NAME):
                     self.connection()
-                    # Each connection decrements pin count by one
-                    self.num_input_pin -= 1
 
                 # Check right curly bracket ends connections block
                 if (self.symbol.type == self.scanner.RIGHT_CURLY):
@@ -398,9 +633,9 @@ class Parser:
             self.error(self.NEED_CONNECT_KEYWORD, [self.scanner.KEYWORD],
                        [self.scanner.MONITOR_ID, self.scanner.END_ID])
 
-        # Check all input pins have been connected
-        if self.error_count == 0:
-            if self.num_input_pin != 0:
+        # Check all input pins have been connected, unless this is a library
+        if self.error_count == 0 and self.library is None:
+            if not self.network.check_network():
                 # Error: Floating inputs pins
                 # Stopping Symbols: MONITOR' or 'END' KEYWORD
                 self.error(self.FLOATING_INPUT_PIN, [self.scanner.KEYWORD],
@@ -461,7 +696,8 @@ class Parser:
                     if(self.symbol.type == self.scanner.KEYWORD):
                         if(self.symbol.id in [self.scanner.initial_ID,
                            self.scanner.inputs_ID,
-                           self.scanner.period_ID, self.scanner.sequence_ID]):
+                           self.scanner.period_ID, self.scanner.sequence_ID,
+                           self.scanner.width_ID]):
 
                             self.symbol = self.scanner.get_symbol()
 
@@ -645,16 +881,10 @@ class Parser:
                         self.scanner.RIGHT_CURLY], [
                         self.scanner.CONNECT_ID, self.scanner.MONITOR_ID,
                         self.scanner.END_ID])
-
-        # Increment input pin counter by number of pins on new device
-        if self.error_count == 0:
-            device_name_string = self.names.get_name_string(device_kind)
-            if device_name_string == "DTYPE":
-                self.num_input_pin += 4
-            elif device_name_string in ["AND", "OR", "NAND", "NOR"]:
-                self.num_input_pin += device_property_list[0]
-            elif device_name_string == "XOR":
-                self.num_input_pin += 2
+            elif self.library is not None:
+                self.library.add_device(
+                    device_name, self.names.get_name_string(device_kind),
+                    device_property_list)
 
     def logictype(self):
         """Parse the type syntax.
@@ -707,6 +937,13 @@ class Parser:
                 # Device with only a single output port
                 first_port_id = None
 
+            # Optional slice of a bus output
+            # Stopping symbols: ';', '}' , '=', 'MONITOR' or 'END' KEYWORD
+            first_slice = self.bus_slice(
+                [self.scanner.KEYWORD, self.scanner.SEMICOLON,
+                 self.scanner.EQUALS, self.scanner.RIGHT_CURLY],
+                [self.scanner.MONITOR_ID, self.scanner.END_ID])
+
             if (self.symbol.type == self.scanner.EQUALS):
                 self.symbol = self.scanner.get_symbol()
 
@@ -724,6 +961,14 @@ class Parser:
                             second_port_id = self.names.query(pin_name)
                             self.symbol = self.scanner.get_symbol()
 
+                            # Optional slice of a bus input
+                            # Stopping symbols: ';', '}', 'MONITOR' or 'END'
+                            # KEYWORD
+                            second_slice = self.bus_slice(
+                                [self.scanner.KEYWORD, self.scanner.SEMICOLON,
+                                 self.scanner.RIGHT_CURLY],
+                                [self.scanner.MONITOR_ID, self.scanner.END_ID])
+
                             if(self.symbol.type == self.scanner.SEMICOLON):
                                 self.symbol = self.scanner.get_symbol()
                             else:
@@ -786,9 +1031,9 @@ class Parser:
         # Check for Connection Semantic errors
         if self.error_count == 0:
             # Only check for semantic errors if no errors so far
-            err = self.network.make_connection(
-                first_device_id, first_port_id,
-                second_device_id, second_port_id)
+            err = self.network.make_bus_connection(
+                first_device_id, first_port_id, first_slice,
+                second_device_id, second_port_id, second_slice)
             if err != self.network.NO_ERROR:
                 # Stopping symbols: ';' , '}', 'MONITOR' or 'END' KEYWORD
                 self.error(
@@ -796,6 +1041,52 @@ class Parser:
                         self.scanner.KEYWORD, self.scanner.SEMICOLON,
                         self.scanner.RIGHT_CURLY], [self.scanner.MONITOR_ID,
                                                     self.scanner.END_ID])
+            elif self.library is not None:
+                [first_device_name, first_port_name,
+                 second_device_name, second_port_name] = [
+                     None if name_id is None else
+                     self.names.get_name_string(name_id)
+                     for name_id in [first_device_id, first_port_id,
+                                     second_device_id, second_port_id]]
+                self.library.add_connection(
+                    first_device_name, first_port_name, first_slice,
+                    second_device_name, second_port_name, second_slice)
+
+    def bus_slice(self, stopping_symbols, symbol_IDs, single_bit=False):
+        """Parse the optional bus slice syntax.
+
+        Return the slice as a [first_bit, last_bit + 1] pair, or None if
+        there is no slice. If single_bit is True, only '[bit]' is allowed.
+        """
+        if (self.symbol.type != self.scanner.LEFT_SQUARE):
+            return None
+        self.symbol = self.scanner.get_symbol()
+
+        bus_slice = None
+        if (self.symbol.type == self.scanner.NUMBER):
+            first_bit = int(self.names.get_name_string(self.symbol.id))
+            bus_slice = [first_bit, first_bit + 1]
+            self.symbol = self.scanner.get_symbol()
+            if (self.symbol.type == self.scanner.COLON and not single_bit):
+                self.symbol = self.scanner.get_symbol()
+                if (self.symbol.type == self.scanner.NUMBER):
+                    bus_slice[1] = int(
+                        self.names.get_name_string(self.symbol.id))
+                    self.symbol = self.scanner.get_symbol()
+                else:
+                    bus_slice = None
+
+        if (bus_slice is not None and
+                self.symbol.type == self.scanner.RIGHT_SQUARE):
+            self.symbol = self.scanner.get_symbol()
+            return bus_slice
+        elif single_bit:
+            # Error: Monitor point can only select a single bus bit
+            self.error(self.MONITOR_BIT, stopping_symbols, symbol_IDs)
+        else:
+            # Error: Bus slice has to be '[bit]' or '[first:last]'
+            self.error(self.BUS_SLICE, stopping_symbols, symbol_IDs)
+        return None
 
     def monitor_point(self):
         """Parse the monitor_point syntax."""
@@ -821,6 +1112,13 @@ class Parser:
                 # Device only has one output port
                 output_id = None
 
+            # Optional bit of a bus output
+            # Stopping symbols: 'NAME', '}', ';' or 'END' KEYWORD
+            bit_slice = self.bus_slice(
+                [self.scanner.KEYWORD, self.scanner.SEMICOLON,
+                 self.scanner.NAME, self.scanner.RIGHT_CURLY],
+                [self.scanner.END_ID], single_bit=True)
+
             if(self.symbol.type == self.scanner.SEMICOLON):
                 self.symbol = self.scanner.get_symbol()
             else:
@@ -845,6 +1143,9 @@ class Parser:
         # Check for Monitor Semantic errors
         if self.error_count == 0:
             # Only check for semantic errors if no errors so far
+            if bit_slice is not None:
+                output_id = self.devices.make_bit_port(output_id,
+                                                       bit_slice[0])
             err = self.monitors.make_monitor(device_id, output_id)
             if err != self.monitors.NO_ERROR:
                 # Stopping symbols: 'NAME', '}', ';' or 'END' KEYWORD
@@ -0,0 +1,455 @@
+"""Partition the network and simulate the partitions in parallel.
+
+Used in the Logic Simulator project to simulate large networks made of
+loosely coupled blocks on several processor cores. The devices are divided
+into partitions with few connections between them, and each partition is
+simulated by its own worker process. After every relaxation pass, the
+workers exchange the signals at the partition boundaries through a block of
+shared memory.
+
+Classes
+-------
+Partitioner - divides the devices of a network into loosely coupled
+              partitions.
+ParallelNetwork - simulates the partitions of a network in worker
+                  processes.
+"""
+import collections
+import multiprocessing
+from multiprocessing import shared_memory
+
+
+class Partitioner:
+    """Divide the devices of a network into loosely coupled partitions.
+
+    The network is treated as a graph with a vertex for each device and an
+    edge for each connection. Partitions are first grown breadth-first from
+    a seed device until they reach their share of the devices, and are then
+    refined by moving devices on the boundaries to the neighbouring
+    partition they have the most connections with, while this reduces the
+    number of connections cut and keeps the partitions balanced.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+
+    Public methods
+    --------------
+    get_drivers(self, device_id): Returns the IDs of the devices driving the
+                                  inputs of the given device.
+
+    get_graph(self): Returns the number of connections between each pair of
+                     connected devices.
+
+    partition(self, parts, imbalance=0.1): Divides the devices into the
+                                           given number of partitions.
+
+    get_cut_connections(self, partitions): Returns the number of connections
+                                           between different partitions.
+    """
+
+    def __init__(self, names, devices, network):
+        """Initialise the partitioner."""
+        self.names = names
+        self.devices = devices
+        self.network = network
+
+        # Number of passes of the refinement to make at most
+        self.refinement_passes = 10
+
+    def get_drivers(self, device_id):
+        """Return the IDs of the devices driving the given device's inputs.
+
+        The result is a list with an entry for each connection, including
+        each segment of a bus input.
+        """
+        device = self.devices.get_device(device_id)
+        drivers = [connected_output[0] for connected_output in
+                   device.inputs.values() if connected_output is not None]
+        for segments in (device.bus_inputs or {}).values():
+            drivers.extend([segment[2] for segment in segments])
+        return drivers
+
+    def get_graph(self):
+        """Return the number of connections between connected devices.
+
+        The result is of the form {device_id: {neighbour_id: connections}},
+        counting connections in either direction, with an entry for every
+        device.
+        """
+        graph = {device.device_id: {} for device in self.devices.devices_list}
+        for device_id in graph:
+            for driver_id in self.get_drivers(device_id):
+                if driver_id == device_id:
+                    continue  # a device driving itself is never cut
+                graph[device_id][driver_id] = \
+                    graph[device_id].get(driver_id, 0) + 1
+                graph[driver_id][device_id] = \
+                    graph[driver_id].get(device_id, 0) + 1
+        return graph
+
+    def partition(self, parts, imbalance=0.1):
+        """Divide the devices into the given number of partitions.
+
+        No partition has more than (1 + imbalance) times its share of the
+        devices. Return a list of the partitions, each a list of device IDs
+        in the order the devices were made.
+        """
+        graph = self.get_graph()
+        device_ids = list(graph)
+        parts = max(1, min(parts, len(device_ids)))
+        share = -(-len(device_ids) // parts)  # rounded up
+        max_size = max(share + 1, int(share * (1 + imbalance)))
+
+        # Grow each partition breadth-first from the first unassigned device
+        partition_of = {}
+        sizes = [0] * parts
+        unassigned = iter(device_ids)
+        for part in range(parts):
+            if part == parts - 1:
+                size = len(device_ids) - sum(sizes)
+            else:
+                size = share
+            queue = collections.deque()
+            while sizes[part] < size:
+                if not queue:
+                    seed = next(device_id for device_id in unassigned
+                                if device_id not in partition_of)
+                    partition_of[seed] = part
+                    sizes[part] += 1
+                    queue.append(seed)
+                    continue
+                device_id = queue.popleft()
+                for neighbour_id in graph[device_id]:
+                    if neighbour_id not in partition_of and \
+                            sizes[part] < size:
+                        partition_of[neighbour_id] = part
+                        sizes[part] += 1
+                        queue.append(neighbour_id)
+
+        # Move devices to the partition they have most connections with
+        for _ in range(self.refinement_passes):
+            moved = False
+            for device_id in device_ids:
+                part = partition_of[device_id]
+                if sizes[part] == 1:
+                    continue
+                connections = [0] * parts
+                for neighbour_id, count in graph[device_id].items():
+                    connections[partition_of[neighbour_id]] += count
+                best_part = part
+                for other_part in range(parts):
+                    if sizes[other_part] < max_size and \
+                            connections[other_part] > \
+                            connections[best_part]:
+                        best_part = other_part
+                if best_part != part:
+                    partition_of[device_id] = best_part
+                    sizes[part] -= 1
+                    sizes[best_part] += 1
+                    moved = True
+            if not moved:
+                break
+
+        partitions = [[] for part in range(parts)]
+        for device_id in device_ids:
+            partitions[partition_of[device_id]].append(device_id)
+        return partitions
+
+    def get_cut_connections(self, partitions):
+        """Return the number of connections between different partitions."""
+        partition_of = {}
+        for part, device_ids in enumerate(partitions):
+            for device_id in device_ids:
+                partition_of[device_id] = part
+        cut_connections = 0
+        for device_id in partition_of:
+            for driver_id in self.get_drivers(device_id):
+                if partition_of[driver_id] != partition_of[device_id]:
+                    cut_connections += 1
+        return cut_connections
+
+
+def read_slots(buffer, device_slots):
+    """Read the outputs of devices from shared memory.
+
+    Return True if any of the outputs changed.
+    """
+    changed = False
+    for (device, signal_slots, word_slots) in device_slots:
+        for (output_id, offset) in signal_slots:
+            signal = buffer[offset]
+            if device.outputs[output_id] != signal:
+                device.outputs[output_id] = signal
+                changed = True
+        for (output_id, offset, size) in word_slots:
+            word = int.from_bytes(buffer[offset:offset + size], "little")
+            if device.bus_outputs[output_id] != word:
+                device.bus_outputs[output_id] = word
+                changed = True
+    return changed
+
+
+def write_slots(buffer, device_slots):
+    """Write the outputs of devices to shared memory."""
+    for (device, signal_slots, word_slots) in device_slots:
+        for (output_id, offset) in signal_slots:
+            buffer[offset] = device.outputs[output_id]
+        for (output_id, offset, size) in word_slots:
+            buffer[offset:offset + size] = \
+                device.bus_outputs[output_id].to_bytes(size, "little")
+
+
+def get_result(buffer, layout, iterations):
+    """Return the result of a cycle once its passes have finished.
+
+    Return None if another pass is needed, True if every partition is
+    steady, or False if a partition failed or the network oscillates.
+    """
+    if iterations == 0:
+        return None
+    flags = buffer[layout["flags"]:layout["command"]]
+    if ParallelNetwork.FAILED in flags:
+        return False
+    if all(flag == ParallelNetwork.STEADY for flag in flags):
+        return True
+    if iterations == layout["iteration_limit"]:
+        return False
+    return None
+
+
+def run_worker(network, layout, index, memory_name, barrier):
+    """Simulate one partition of the network in a worker process.
+
+    layout is the ParallelNetwork's description of the shared memory, and
+    index the number of the worker's partition.
+    """
+    memory = shared_memory.SharedMemory(name=memory_name)
+    buffer = memory.buf
+    devices = network.devices
+
+    def get_device_slots(device_ids):
+        return [(devices.get_device(device_id),) + layout["slots"][device_id]
+                for device_id in device_ids]
+
+    device_ids = layout["partitions"][index]
+    network.set_active_devices(device_ids)
+    own_slots = get_device_slots(device_ids)
+    boundary_slots = get_device_slots(layout["boundaries"][index])
+    driver_slots = get_device_slots(layout["drivers"][index])
+    switches = [(devices.get_device(device_id), offset) for
+                (device_id, offset) in layout["switches"]
+                if device_id in network.active_devices]
+    flag = layout["flags"] + index
+
+    try:
+        while True:
+            barrier.wait()  # wait for the next cycle
+            if buffer[layout["command"]] == ParallelNetwork.STOP:
+                break
+            for (device, offset) in switches:
+                device.switch_state = buffer[offset]
+            network.update_clocks()
+            network.update_siggens()
+            write_slots(buffer, boundary_slots)
+
+            iterations = 0
+            while True:
+                barrier.wait()  # every boundary output has been written
+                if get_result(buffer, layout, iterations) is not None:
+                    break
+                changed = read_slots(buffer, driver_slots)
+                barrier.wait()  # every boundary input has been read
+                if not network.execute_pass():
+                    buffer[flag] = ParallelNetwork.FAILED
+                else:
+                    write_slots(buffer, boundary_slots)
+                    if network.steady_state and not changed:
+                        buffer[flag] = ParallelNetwork.STEADY
+                    else:
+                        buffer[flag] = ParallelNetwork.CHANGED
+                iterations += 1
+
+            write_slots(buffer, own_slots)
+            barrier.wait()  # every output has been written
+    finally:
+        del buffer
+        memory.close()
+
+
+class ParallelNetwork:
+    """Simulate the partitions of a network in worker processes.
+
+    Each worker process simulates one partition, starting from a copy of
+    the network. In every relaxation pass, each worker reads the outputs of
+    the devices in other partitions that drive its devices from shared
+    memory, executes its own devices once, and writes the outputs of its
+    devices that drive other partitions back. The passes stop once no
+    signal changes in any partition. The partitions are relaxed side by
+    side rather than one after another, so signals crossing a boundary take
+    one more pass to propagate.
+
+    The settled signals are the same as those of the network wherever they
+    do not depend on the order the devices are executed in. Where they do,
+    as for a latch of cross-coupled gates started up with both outputs
+    equal, the gates may see their inputs change in another order and
+    settle to the other stable state. The latch then differs from the
+    network's until its inputs next set or reset it.
+
+    After each cycle, the outputs of every device are copied back into the
+    network, so that the monitors can record them. The switches are read
+    from the network at the start of each cycle. The memory of D-types and
+    registers is kept by the workers only.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+    partitions: list of lists of device IDs, as returned by
+                Partitioner.partition().
+
+    Public methods
+    --------------
+    get_layout(self): Returns the positions of the signals in shared memory.
+
+    start(self): Starts a worker process for each partition.
+
+    execute_network(self): Executes all the devices in the network for one
+                           simulation cycle.
+
+    stop(self): Stops the worker processes and frees the shared memory.
+    """
+
+    # Worker flags and commands stored in shared memory
+    CHANGED, STEADY, FAILED = range(3)
+    RUN, STOP = range(2)
+
+    def __init__(self, names, devices, network, partitions):
+        """Initialise the layout of the shared memory."""
+        self.names = names
+        self.devices = devices
+        self.network = network
+        self.partitions = partitions
+
+        # Number of iterations to wait for the signals to settle before
+        # declaring the network unstable
+        self.iteration_limit = 20
+
+        self.layout = self.get_layout()
+        self.memory = None
+        self.workers = []
+        self.barrier = None
+
+    def get_layout(self):
+        """Return the positions of the signals in shared memory.
+
+        The shared memory holds a flag for each worker, a command byte, the
+        state of each switch and then the outputs of every device: one byte
+        for each signal and enough bytes for each bus word.
+        """
+        partitioner = Partitioner(self.names, self.devices, self.network)
+        layout = {"partitions": self.partitions,
+                  "flags": 0,
+                  "command": len(self.partitions),
+                  "iteration_limit": self.iteration_limit}
+        offset = len(self.partitions) + 1
+
+        layout["switches"] = []
+        for device_id in self.devices.find_devices(self.devices.SWITCH):
+            layout["switches"].append((device_id, offset))
+            offset += 1
+
+        # slots stores {device_id: ([(output_id, offset)],
+        # [(output_id, offset, size)])} for the signals and bus words
+        layout["slots"] = {}
+        for device in self.devices.devices_list:
+            signal_slots = []
+            for output_id in device.outputs:
+                signal_slots.append((output_id, offset))
+                offset += 1
+            word_slots = []
+            for output_id in (device.bus_outputs or {}):
+                size = (device.bus_width + 7) // 8
+                word_slots.append((output_id, offset, size))
+                offset += size
+            layout["slots"][device.device_id] = (signal_slots, word_slots)
+        layout["size"] = offset
+
+        # Find the devices driving each partition from outside it, and the
+        # devices driving other partitions
+        partition_of = {}
+        for part, device_ids in enumerate(self.partitions):
+            for device_id in device_ids:
+                partition_of[device_id] = part
+        drivers = [set() for part in self.partitions]
+        boundaries = [set() for part in self.partitions]
+        for device_id, part in partition_of.items():
+            for driver_id in partitioner.get_drivers(device_id):
+                driver_part = partition_of[driver_id]
+                if driver_part != part:
+                    drivers[part].add(driver_id)
+                    boundaries[driver_part].add(driver_id)
+        layout["drivers"] = [sorted(device_ids) for device_ids in drivers]
+        layout["boundaries"] = [sorted(device_ids) for device_ids in
+                                boundaries]
+        return layout
+
+    def start(self):
+        """Start a worker process for each partition."""
+        self.memory = shared_memory.SharedMemory(create=True,
+                                                 size=self.layout["size"])
+        self.barrier = multiprocessing.Barrier(len(self.partitions) + 1)
+        for index in range(len(self.partitions)):
+            worker = multiprocessing.Process(
+                target=run_worker, args=(self.network, self.layout, index,
+                                         self.memory.name, self.barrier),
+                daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def execute_network(self):
+        """Execute all the devices in the network for one simulation cycle.
+
+        Return True if successful and the network does not oscillate.
+        """
+        buffer = self.memory.buf
+        for (device_id, offset) in self.layout["switches"]:
+            buffer[offset] = self.devices.get_device(device_id).switch_state
+        buffer[self.layout["command"]] = self.RUN
+        self.barrier.wait()  # start the cycle
+
+        # Keep the clock and signal generator counters in step
+        self.network.update_clocks()
+        self.network.update_siggens()
+
+        iterations = 0
+        while True:
+            self.barrier.wait()  # every boundary output has been written
+            result = get_result(buffer, self.layout, iterations)
+            if result is not None:
+                break
+            self.barrier.wait()  # every boundary input has been read
+            iterations += 1
+
+        self.barrier.wait()  # every output has been written
+        for device in self.devices.devices_list:
+            read_slots(buffer, [(device,) +
+                                self.layout["slots"][device.device_id]])
+        del buffer
+        return result
+
+    def stop(self):
+        """Stop the worker processes and free the shared memory."""
+        if self.memory is None:
+            return
+        self.memory.buf[self.layout["command"]] = self.STOP
+        self.barrier.wait()
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+        self.memory.close()
+        self.memory.unlink()
+        self.memory = None
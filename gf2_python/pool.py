@@ -0,0 +1,158 @@
+"""Keep parsed networks ready to be cloned for new runs.
+
+Used in the Logic Simulator project by long-lived processes, such as the
+simulation server, so that a definition file that has been loaded before is
+not scanned, parsed and built again. A snapshot of each network is taken
+just after it is parsed, and new runs start from a copy of the snapshot.
+
+Classes
+-------
+SessionPool - keeps snapshots of parsed networks, keyed by file path and
+              contents.
+"""
+import collections
+import os
+import pickle
+import threading
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import Scanner
+from parse import Parser
+from library import LibraryCache
+
+
+class SessionPool:
+    """Keep snapshots of parsed networks, keyed by the file path and contents.
+
+    A snapshot is the pickled Names, Devices, Network and Monitors instances
+    just after parsing, so a copy of the network is made in time and memory
+    proportional to its state, and the size of the pickle is the memory the
+    snapshot takes. The least recently used snapshots are dropped to keep
+    the total within max_bytes. The path is part of the key, as the files a
+    definition includes are found relative to its directory, and a snapshot
+    is only used while the files it included are unchanged too. The pool can
+    be used from several threads at once.
+
+    Parameters
+    ----------
+    max_bytes: total size of the snapshots to keep at most.
+
+    Public methods
+    --------------
+    parse(self, path): Parses a definition file into new network objects.
+
+    get_dependencies(self, parser): Returns the hashes of the files included
+                                    by a parse.
+
+    is_current(self, entry): Returns True if the included files of a
+                             snapshot are unchanged.
+
+    load(self, path): Returns a copy of the network defined in a file.
+
+    get_report(self): Returns a description of the hit rate and the memory
+                      of each snapshot.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """Initialise the snapshots and their hit counters."""
+        self.max_bytes = max_bytes
+
+        # Libraries are shared between the parses of all files
+        self.library_cache = LibraryCache()
+
+        # entries stores {(path, digest): (path, snapshot, {included_path:
+        # digest})}, with the most recently used last
+        self.entries = collections.OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def parse(self, path):
+        """Parse the definition file at path into new network objects.
+
+        Return the parser and [names, devices, network, monitors], where the
+        network objects are None if the file has errors.
+        """
+        names = Names()
+        devices = Devices(names)
+        network = Network(names, devices)
+        monitors = Monitors(names, devices, network)
+        scanner = Scanner(path, names)
+        parser = Parser(names, devices, network, monitors, scanner,
+                        self.library_cache)
+        parsed = parser.parse_network()
+        scanner.close_file()
+        if not parsed:
+            return parser, None
+        return parser, [names, devices, network, monitors]
+
+    def get_dependencies(self, parser):
+        """Return {included_path: digest} for the files a parse included."""
+        return {included_path: self.library_cache.get_digest(included_path)
+                for included_path in parser.included_paths}
+
+    def is_current(self, entry):
+        """Return True if the included files of a snapshot are unchanged."""
+        (_, _, dependencies) = entry
+        for included_path, digest in dependencies.items():
+            if not os.path.isfile(included_path) or \
+                    self.library_cache.get_digest(included_path) != digest:
+                return False
+        return True
+
+    def load(self, path):
+        """Return a copy of the network defined in the file at path.
+
+        The network is copied from a snapshot if the file has been parsed
+        before with the same contents. Return [names, devices, network,
+        monitors] and the list of syntax errors, where the network objects
+        are None if the file has errors.
+        """
+        key = (os.path.abspath(path), self.library_cache.get_digest(path))
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self.is_current(entry):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(entry[1]), []
+            self.misses += 1
+
+        # Parse outside the lock, so other files can be loaded meanwhile
+        parser, network_objects = self.parse(path)
+        if network_objects is None:
+            return None, parser.scanner.error_list
+        snapshot = pickle.dumps(network_objects,
+                                protocol=pickle.HIGHEST_PROTOCOL)
+        entry = (key[0], snapshot, self.get_dependencies(parser))
+
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= len(self.entries.pop(key)[1])
+            if len(snapshot) <= self.max_bytes:
+                self.entries[key] = entry
+                self.total_bytes += len(snapshot)
+            # Drop the least recently used snapshots
+            while self.total_bytes > self.max_bytes:
+                (_, (_, old_snapshot, _)) = self.entries.popitem(last=False)
+                self.total_bytes -= len(old_snapshot)
+        return network_objects, []
+
+    def get_report(self):
+        """Return a description of the hit rate and each snapshot's memory."""
+        with self.lock:
+            loads = self.hits + self.misses
+            hit_rate = 100 * self.hits / loads if loads else 0
+            report = ["".join([
+                "Loaded ", str(loads), " times: ", str(self.hits),
+                " hits, ", str(self.misses), " misses (",
+                "{:.1f}".format(hit_rate), "% hit rate). ",
+                str(len(self.entries)), " sessions in ",
+                str(self.total_bytes), " bytes."])]
+            for (path, digest), (_, snapshot, _) in self.entries.items():
+                report.append("".join([digest[:12], " ", path, ": ",
+                                       str(len(snapshot)), " bytes"]))
+        return "\n".join(report)
@@ -10,6 +10,8 @@ Symbol - encapsulates a symbol and stores its properties.
 """
 
 from errors import Error
+import bisect
+import itertools
 import sys
 
 
@@ -25,6 +27,11 @@ class Symbol:
     No public methods.
     """
 
+    # A symbol is made for every token, so store its properties in fixed
+    # slots rather than a per-instance dictionary
+    __slots__ = ("type", "id", "line", "position", "prev_line",
+                 "prev_position")
+
     def __init__(self):
         """Initialise symbol properties."""
         self.type = None
@@ -56,6 +63,8 @@ class Scanner:
 
     get_number(self): Return the next number in the file.
 
+    get_string(self): Return the next quoted string in the file.
+
     advance(self): Read the next character of the input file and place it
                    in current_character.
 
@@ -94,6 +103,7 @@ class Scanner:
             print("Invalid file type.")
             sys.exit()
 
+        self.path = path
         self.error_list = []
 
         #  Assign names module for reference.
@@ -104,13 +114,18 @@ class Scanner:
                                  self.KEYWORD, self.LOGIC_TYPE, self.OUT_PIN,
                                  self.IN_PIN, self.NUMBER, self.NAME,
                                  self.PERIOD, self.COLON, self.EOF,
-                                 self.LEFT_CURLY, self.RIGHT_CURLY] = range(14)
+                                 self.LEFT_CURLY, self.RIGHT_CURLY,
+                                 self.STRING, self.LEFT_SQUARE,
+                                 self.RIGHT_SQUARE] = range(17)
 
         #  Create a list of keywords, logic types, input and output pins.
         self.keywords_list = ["DEVICES", "CONNECT", "MONITOR", "END",
-                              "initial", "period", "inputs", "sequence"]
+                              "initial", "period", "inputs", "sequence",
+                              "INCLUDE", "width"]
         self.logic_type_list = ["CLOCK", "SWITCH", "AND", "NAND",
-                                "OR", "NOR", "DTYPE", "XOR", "SIGGEN"]
+                                "OR", "NOR", "DTYPE", "XOR", "SIGGEN",
+                                "REG", "BAND", "BOR", "BNAND", "BNOR",
+                                "BXOR"]
         self.input_pin_list = ["I1", "I2", "I3", "I4", "I5", "I6", "I7", "I8",
                                "I9", "I10", "I11", "I12", "I13", "I14", "I15",
                                "I16", "DATA", "CLK", "SET", "CLEAR"]
@@ -119,8 +134,15 @@ class Scanner:
         #  Assign keywords an id using the "Names" module's "lookup" function.
         [self.DEVICES_ID, self.CONNECT_ID, self.MONITOR_ID,
          self.END_ID, self.initial_ID, self.period_ID,
-         self.inputs_ID, self.sequence_ID] = self.names.lookup(
+         self.inputs_ID, self.sequence_ID,
+         self.INCLUDE_ID, self.width_ID] = self.names.lookup(
             self.keywords_list)
+
+        #  Store the cumulative line lengths, so that the line of a position
+        #  is found without reading the file again.
+        self.line_ends = list(itertools.accumulate(
+            len(line) for line in self.file))
+        self.file.seek(0)
         self.current_character = self.file.read(1)
 
     def get_name(self):
@@ -153,6 +175,24 @@ class Scanner:
         num = ''.join(map(str, num))
         return num
 
+    def get_string(self):
+        """Seek the next quoted string in input_file.
+
+        Return the characters between the quotes, or None if the closing
+        quote is missing before the end of the line, and place the character
+        after the closing quote in current_character.
+        """
+        string = []
+
+        self.advance()  # skip the opening quote
+        while self.current_character not in ['"', "\n", ""]:
+            string.append(self.current_character)
+            self.advance()
+        if self.current_character != '"':
+            return None
+        self.advance()  # skip the closing quote
+        return ''.join(string)
+
     def advance(self):
         """Read the next character from input_file.
 
@@ -226,43 +266,15 @@ class Scanner:
 
     def location(self):
         """Return the current line and position within the file."""
-        #  Store the current position.
-        stored_position = self.file.tell()
-
-        #  Return to the file's beginning and create an empty list of lengths.
-        self.file.seek(0)
-        linelengths = []
-
-        i = 0
+        position = self.file.tell()
 
-        #  Occupy the list with cumulative line lengths.
-        for line in self.file:
-            i += 1
-            if len(linelengths) == 0:
-                linelengths.append(len(line))
-            else:
-                linelengths.append(len(line) + linelengths[-1])
-
-        num_line = i
-
-        current_line = ''
-        current_position = ''
-
-        #  Return to the stored (current) position within the file.
-        self.file.seek(stored_position)
-
-        #  Return line and position by comparing current position to the list.
-        for n in range(num_line):
-            if n == 0:
-                if self.file.tell() <= linelengths[n]:
-                    current_line = n + 1
-                    current_position = self.file.tell()
-            elif(self.file.tell() <= linelengths[n] and self.file.tell() >
-                 linelengths[n-1]):
-                current_line = n + 1
-                current_position = self.file.tell() - linelengths[n-1]
-
-        return [current_line, current_position]
+        #  Find the first line ending at or after the position.
+        line_index = bisect.bisect_left(self.line_ends, position)
+        if line_index == len(self.line_ends):
+            return ['', '']
+        elif line_index == 0:
+            return [1, position]
+        return [line_index + 1, position - self.line_ends[line_index - 1]]
 
     def print_location(self, symbol, option=False):
         """Print the line that the passed symbol is on.
@@ -373,6 +385,20 @@ class Scanner:
             symbol.type = self.RIGHT_CURLY
             self.advance()
 
+        elif self.current_character == "[":  # left square bracket
+            symbol.type = self.LEFT_SQUARE
+            self.advance()
+
+        elif self.current_character == "]":  # right square bracket
+            symbol.type = self.RIGHT_SQUARE
+            self.advance()
+
+        elif self.current_character == '"':  # quoted string
+            string = self.get_string()
+            if string is not None:
+                symbol.type = self.STRING
+                [symbol.id] = self.names.lookup([string])
+
         else:  # not a valid character
             self.advance()
 
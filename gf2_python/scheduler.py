@@ -0,0 +1,446 @@
+"""Run the network, skipping cycles in which nothing changes.
+
+Used in the Logic Simulator project to run networks with slow clocks
+quickly. Once the signals have settled, they can only change at a cycle in
+which a clock or signal generator changes, or a stimulus file sets a
+switch, so the cycles in between are not executed. Once the whole state of
+the network repeats, the rest of the run is periodic, so whole periods are
+copied into the monitor traces instead of being executed. Devices that
+cannot affect a monitored signal are not executed at all.
+
+Classes
+-------
+Scheduler - runs the network, skipping cycles in which nothing changes.
+"""
+
+
+class Scheduler:
+    """Run the network, skipping cycles in which nothing changes.
+
+    After a cycle has been executed the network is settled, so until the
+    next cycle in which a clock or signal generator changes, or the stimulus
+    sets a switch, every cycle would leave the signals as they are. The
+    scheduler jumps over these cycles, advancing the clock and signal
+    generator counters and repeating the current signals in the monitor
+    traces.
+
+    If detect_periods is True, the state of every device is hashed at each
+    step. When a state is seen again, and is still the same one period
+    later, the network is periodic until the stimulus next sets a switch,
+    and the remaining whole periods are fast-forwarded.
+
+    If prune is True, only the cone of influence of the monitors is
+    executed: the devices that can affect a monitored signal, found by
+    following the connections back from the monitored devices. Switches,
+    clocks and signal generators are always executed, so that they keep
+    time. The cone is found again when monitors are made or removed. If it
+    grows when a run is continued, the devices that join it were not
+    executed in the cycles already run, so the network is returned to its
+    state at the start of the first run and replayed up to the cycle the
+    run continues from, without recording the monitors.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class.
+    stimulus: instance of the stimulus.Stimulus() class, or None.
+    detect_periods: whether to fast-forward periodic networks.
+    prune: whether to execute only the devices that can affect a monitor.
+
+    Public methods
+    --------------
+    update_cone(self): Restricts execution to the devices that can affect
+                       a monitored signal, and returns whether it grew.
+
+    save_state(self): Returns a copy of the signals, memory and counters of
+                      every device.
+
+    restore_state(self, saved_state): Returns every device to a saved state.
+
+    replay(self, cycles): Executes the network again from the start of the
+                          first run, up to the given cycle.
+
+    get_cycles_to_wrap(self, device): Returns the number of cycles until the
+                                      counter of a clock or signal generator
+                                      next reaches its half period.
+
+    get_cycles_to_change(self, cycle): Returns the number of cycles from the
+                                       given cycle that can be skipped.
+
+    skip_cycles(self, cycles, record=True): Advances the clocks and signal
+                               generators and records the monitors over
+                               cycles in which nothing changes.
+
+    get_state(self): Returns the signals, memory and counters of every
+                     device.
+
+    fast_forward(self, cycle, last_cycle, period): Copies whole periods into
+                                                   the monitor traces.
+
+    execute_cycles(self, cycles, first_cycle, record=True): Executes the
+                                      network for the specified number of
+                                      simulation cycles.
+
+    run(self, cycles, first_cycle=0): Runs the network for the specified
+                                      number of simulation cycles.
+
+    reset_report(self): Clears the counts of cycles executed, skipped,
+                        fast-forwarded and replayed.
+
+    get_report(self): Returns a description of how the runs since the report
+                      was reset were simulated.
+    """
+
+    def __init__(self, names, devices, network, monitors, stimulus=None,
+                 detect_periods=True, prune=True):
+        """Initialise the scheduler errors and cycle counts."""
+        self.names = names
+        self.devices = devices
+        self.network = network
+        self.monitors = monitors
+        self.stimulus = stimulus
+        self.detect_periods = detect_periods
+        self.prune = prune
+
+        # The device, connection and monitor counts the cone of influence
+        # was found from, the set of devices in it, and their number
+        self.cone_key = None
+        self.cone = None
+        self.cone_devices = None
+
+        # The state of the devices at the start of the first run, and
+        # [(first_cycle, {switch_id: switch_state})] for the start of each
+        # run since, used to replay the network when the cone grows
+        self.start_state = None
+        self.run_starts = []
+
+        [self.NO_ERROR, self.OSCILLATING,
+         self.BAD_STIMULUS] = self.names.unique_error_codes(3)
+
+        self.reset_report()
+
+    def update_cone(self):
+        """Restrict execution to the devices that can affect a monitor.
+
+        The cone of influence is only found again when devices, connections
+        or monitors have changed since it was last found. Return True if a
+        device has joined the cone.
+        """
+        key = (self.devices.device_changes, self.network.connection_changes,
+               self.monitors.monitor_changes)
+        if self.cone_key == key:
+            return False
+        self.cone_key = key
+        device_ids = [device_id for (device_id, output_id) in
+                      self.monitors.monitors_dictionary]
+        for device_kind in [self.devices.SWITCH, self.devices.CLOCK,
+                            self.devices.SIGGEN]:
+            device_ids.extend(self.devices.find_devices(device_kind))
+        cone = self.network.get_fan_in(device_ids)
+        self.network.set_active_devices(cone)
+        self.cone_devices = len(cone)
+        grown = self.cone is not None and not cone <= self.cone
+        self.cone = cone
+        return grown
+
+    def get_cycles_to_wrap(self, device):
+        """Return the cycles until a clock or siggen counter next wraps.
+
+        The counter of a clock or signal generator wraps to zero, and its
+        output may change, at the start of the returned cycle, counting the
+        next cycle as 1.
+        """
+        return device.clock_half_period - device.clock_counter + 1
+
+    def get_cycles_to_change(self, cycle):
+        """Return the number of cycles from cycle that can be skipped.
+
+        These are the cycles before the next one in which a clock or signal
+        generator changes or the stimulus sets a switch. Return None if
+        nothing will ever change.
+        """
+        cycles_to_change = []
+        for device_id in self.devices.find_devices(self.devices.CLOCK):
+            device = self.devices.get_device(device_id)
+            cycles_to_change.append(self.get_cycles_to_wrap(device) - 1)
+
+        for device_id in self.devices.find_devices(self.devices.SIGGEN):
+            device = self.devices.get_device(device_id)
+            # Find the next step of the sequence with a different signal
+            signal_length = len(device.siggen_signal)
+            output_signal = device.outputs[None]
+            for step in range(1, signal_length + 1):
+                next_signal = device.siggen_signal[
+                    (device.siggen_counter + step) % signal_length]
+                if next_signal != output_signal:
+                    cycles_to_change.append(
+                        self.get_cycles_to_wrap(device) - 1 +
+                        (step - 1) * device.clock_half_period)
+                    break
+
+        if self.stimulus is not None:
+            next_cycle = self.stimulus.get_next_cycle()
+            if next_cycle is not None:
+                cycles_to_change.append(max(next_cycle - cycle, 0))
+
+        if cycles_to_change:
+            return min(cycles_to_change)
+        return None
+
+    def skip_cycles(self, cycles, record=True):
+        """Skip cycles in which nothing changes.
+
+        The clock and signal generator counters are advanced as if the
+        cycles had been executed, and, if record is True, the current
+        signals are recorded for every skipped cycle.
+        """
+        for device_id in (self.devices.find_devices(self.devices.CLOCK) +
+                          self.devices.find_devices(self.devices.SIGGEN)):
+            device = self.devices.get_device(device_id)
+            cycles_to_wrap = self.get_cycles_to_wrap(device)
+            if cycles < cycles_to_wrap:
+                device.clock_counter += cycles
+            else:
+                # Only a signal generator can wrap without its output
+                # changing, stepping through its sequence
+                extra_cycles = cycles - cycles_to_wrap
+                wraps = 1 + extra_cycles // device.clock_half_period
+                device.clock_counter = \
+                    1 + extra_cycles % device.clock_half_period
+                device.siggen_counter = ((device.siggen_counter + wraps) %
+                                         len(device.siggen_signal))
+        if record:
+            self.monitors.record_signals(cycles)
+            self.cycles_skipped += cycles
+
+    def get_state(self):
+        """Return the signals, memory and counters of every device."""
+        return tuple([
+            (tuple(device.outputs.values()),
+             device.bus_outputs and tuple(device.bus_outputs.values()),
+             device.dtype_memory, device.clock_counter,
+             device.siggen_counter, device.switch_state)
+            for device in self.devices.devices_list])
+
+    def save_state(self):
+        """Return a copy of the signals, memory and counters of every device.
+
+        The result is of the form {device_id: (outputs, bus_outputs, memory,
+        clock_counter, siggen_counter, switch_state)}.
+        """
+        return dict([
+            (device.device_id,
+             (dict(device.outputs),
+              device.bus_outputs and dict(device.bus_outputs),
+              device.dtype_memory, device.clock_counter,
+              device.siggen_counter, device.switch_state))
+            for device in self.devices.devices_list])
+
+    def restore_state(self, saved_state):
+        """Return every device to a state returned by save_state.
+
+        The output dictionaries are updated in place, as the compiled gates
+        read them directly. Devices made since the state was saved are left
+        as they are.
+        """
+        for device in self.devices.devices_list:
+            if device.device_id not in saved_state:
+                continue
+            (outputs, bus_outputs, device.dtype_memory,
+             device.clock_counter, device.siggen_counter,
+             device.switch_state) = saved_state[device.device_id]
+            device.outputs.update(outputs)
+            if bus_outputs:
+                device.bus_outputs.update(bus_outputs)
+        # Nothing executed since can be assumed to have settled
+        self.network.gate_words = {}
+        self.devices.startup_changes += 1
+
+    def replay(self, cycles):
+        """Execute the network again from the start of the first run.
+
+        The devices are returned to their state at the start of the first
+        run and executed for the given number of cycles, with the switches
+        set as they were at the start of each run and by the stimulus, so
+        that the devices that have joined the cone catch up with the rest.
+        The monitors are not recorded. Return self.NO_ERROR if successful,
+        or the corresponding error if not.
+        """
+        self.restore_state(self.start_state)
+        if self.stimulus is not None:
+            self.stimulus.restart()
+        run_ends = [run_start[0] for run_start in self.run_starts[1:]]
+        for (first_cycle, switch_states), last_cycle in zip(
+                self.run_starts, run_ends + [cycles]):
+            for switch_id, switch_state in switch_states.items():
+                self.devices.set_switch(switch_id, switch_state)
+            last_cycle = min(last_cycle, cycles)
+            if last_cycle <= first_cycle:
+                continue
+            error_type = self.execute_cycles(last_cycle - first_cycle,
+                                             first_cycle, record=False)
+            if error_type != self.NO_ERROR:
+                return error_type
+            self.cycles_replayed += last_cycle - first_cycle
+        return self.NO_ERROR
+
+    def fast_forward(self, cycle, last_cycle, period):
+        """Copy whole periods of the monitor traces, starting at cycle.
+
+        The network is in the same state as one period before cycle, so it
+        repeats itself until last_cycle or until the stimulus next sets a
+        switch. Return the number of cycles fast-forwarded.
+        """
+        if self.stimulus is not None and \
+                self.stimulus.get_next_cycle() is not None:
+            last_cycle = min(last_cycle, self.stimulus.get_next_cycle())
+        periods = (last_cycle - cycle) // period
+        if periods > 0:
+            self.monitors.repeat_signals(period, periods)
+            self.cycles_fast_forwarded += periods * period
+            self.fast_forwards.append((cycle, periods * period, period))
+        return periods * period
+
+    def run(self, cycles, first_cycle=0):
+        """Run the network for the specified number of simulation cycles.
+
+        first_cycle is the number of cycles already run, used to apply the
+        stimulus at the right cycles. Return self.NO_ERROR if successful, or
+        the corresponding error if not.
+        """
+        if self.prune:
+            grown = self.update_cone()
+            if first_cycle == 0:
+                self.start_state = self.save_state()
+                self.run_starts = []
+            switch_states = dict([
+                (switch_id, self.devices.get_device(switch_id).switch_state)
+                for switch_id in self.devices.find_devices(
+                    self.devices.SWITCH)])
+            if grown and first_cycle > 0 and self.start_state is not None:
+                error_type = self.replay(first_cycle)
+                if error_type != self.NO_ERROR:
+                    return error_type
+                # Switches set between the runs are set again
+                for switch_id, switch_state in switch_states.items():
+                    self.devices.set_switch(switch_id, switch_state)
+            self.run_starts.append((first_cycle, switch_states))
+        return self.execute_cycles(cycles, first_cycle)
+
+    def execute_cycles(self, cycles, first_cycle, record=True):
+        """Execute the network for the specified number of cycles.
+
+        Cycles in which nothing changes are skipped, and, if record is True
+        and detect_periods is set, whole periods are fast-forwarded. The
+        monitors are only recorded if record is True. Return self.NO_ERROR
+        if successful, or the corresponding error if not.
+        """
+        detect_periods = self.detect_periods and record
+
+        # Switches may have been set since the last run
+        settled = False
+
+        # seen_states stores {state_hash: cycle} for the cycles since the
+        # stimulus last set a switch. A repeated hash gives a candidate
+        # period, which is checked against the exact state one period later.
+        seen_states = {}
+        candidate = None  # (cycle, period, state)
+
+        cycle = first_cycle
+        last_cycle = first_cycle + cycles
+        while cycle < last_cycle:
+            if settled and detect_periods:
+                state = self.get_state()
+                if candidate is not None:
+                    (candidate_cycle, period, candidate_state) = candidate
+                    if cycle >= candidate_cycle + period:
+                        candidate = None
+                        if cycle == candidate_cycle + period and \
+                                state == candidate_state:
+                            forwarded_cycles = self.fast_forward(
+                                cycle, last_cycle, period)
+                            if forwarded_cycles > 0:
+                                cycle += forwarded_cycles
+                                seen_states = {}
+                                continue
+                else:
+                    state_hash = hash(state)
+                    if state_hash in seen_states:
+                        candidate = (cycle, cycle - seen_states[state_hash],
+                                     state)
+                    seen_states[state_hash] = cycle
+
+            if settled:
+                cycles_to_change = self.get_cycles_to_change(cycle)
+                if cycles_to_change is None:
+                    cycles_to_change = last_cycle - cycle
+                skipped_cycles = min(cycles_to_change, last_cycle - cycle)
+                if skipped_cycles > 0:
+                    self.skip_cycles(skipped_cycles, record)
+                    cycle += skipped_cycles
+                    continue
+
+            if self.stimulus is not None:
+                next_cycle = self.stimulus.get_next_cycle()
+                if next_cycle is not None and next_cycle <= cycle:
+                    # The states before a switch is set do not repeat
+                    seen_states = {}
+                    candidate = None
+                if self.stimulus.apply_changes(cycle) != \
+                        self.stimulus.NO_ERROR:
+                    return self.BAD_STIMULUS
+            if not self.network.execute_network():
+                return self.OSCILLATING
+            if record:
+                self.monitors.record_signals()
+                self.cycles_executed += 1
+            settled = True
+            cycle += 1
+        return self.NO_ERROR
+
+    def reset_report(self):
+        """Clear the counts of the cycles simulated in each way."""
+        # Number of cycles executed, skipped and fast-forwarded since the
+        # report was reset, and [(first_cycle, cycles, period)] for each
+        # fast-forward
+        self.cycles_executed = 0
+        self.cycles_skipped = 0
+        self.cycles_fast_forwarded = 0
+        self.fast_forwards = []
+        # Number of cycles replayed for devices that joined the cone
+        self.cycles_replayed = 0
+
+    def get_report(self):
+        """Return a description of how the runs were simulated.
+
+        The report covers the runs since it was last reset.
+        """
+        report = ["".join(["Executed ", str(self.cycles_executed),
+                           " cycles, skipped ", str(self.cycles_skipped),
+                           ", fast-forwarded ",
+                           str(self.cycles_fast_forwarded), "."])]
+        if self.prune and self.cone_devices is not None:
+            total_devices = len(self.devices.devices_list)
+            pruned_devices = total_devices - self.cone_devices
+            report.append("".join([
+                "Executed ", str(self.cone_devices), " of ",
+                str(total_devices), " devices, pruned ",
+                str(pruned_devices), " (",
+                "{:.1f}".format(100 * pruned_devices / max(total_devices, 1)),
+                "%) that cannot affect a monitor."]))
+        if self.cycles_replayed:
+            report.append("".join([
+                "Replayed ", str(self.cycles_replayed),
+                " cycles for the devices that joined the cone."]))
+        if self.network.merged_devices:
+            report.append("".join([
+                "Merged ", str(len(self.network.merged_devices)),
+                " duplicate gates into the gates they repeat."]))
+        for (first_cycle, cycles, period) in self.fast_forwards:
+            report.append("".join([
+                "Fast-forwarded cycles ", str(first_cycle), " to ",
+                str(first_cycle + cycles - 1), " (period ", str(period),
+                ")."]))
+        return "\n".join(report)
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""Serve simulations of loaded networks over a local socket.
+
+Used in the Logic Simulator project to let scripts and other programs load
+networks once and then run them, set switches and fetch traces without
+starting the simulator again. The server listens on a Unix socket or a
+localhost TCP port and serves many clients at once.
+
+Networks are loaded through a pool.SessionPool(), so loading a file that
+has been loaded before copies the network rather than parsing it again.
+
+Each request and response is a JSON object on its own line. A request has
+an "id", which is copied into its responses, and a "command":
+
+    {"id": 1, "command": "load", "path": "circuit.txt"}
+    {"id": 2, "command": "run", "session": 1, "cycles": 100}
+    {"id": 3, "command": "fetch-trace-range", "session": 1, "start": 0,
+     "end": 100}
+
+The response to a request has "ok" set to true, with any results, or to
+false, with an "error" message. The traces of fetch-trace-range are
+streamed as "chunk" messages before the final response. If the request has
+"buckets", the range is instead summarised as [start cycle, lowest level,
+highest level, number of changes, number of blank cycles] for each of that
+many buckets, where the levels are null if the bucket is all blank.
+
+Usage
+-----
+Show help: server.py -h
+Serve on a Unix socket: server.py -u <socket path>
+Serve on a localhost TCP port: server.py -t <port>
+
+Classes
+-------
+Session - holds a loaded network and the state of its simulation.
+SimulationServer - serves simulation commands from clients over a socket.
+"""
+import asyncio
+import concurrent.futures
+import getopt
+import itertools
+import json
+import os
+import sys
+
+from scheduler import Scheduler
+from pool import SessionPool
+
+
+class Session:
+    """Hold a loaded network and the state of its simulation.
+
+    The methods block while they run, so the server calls them from its
+    executor, one at a time for each session. Each returns an error
+    message, or None if successful, as well as any results.
+
+    Parameters
+    ----------
+    path: path of the definition file.
+    pool: instance of the pool.SessionPool() class the network is loaded
+          from.
+
+    Public methods
+    --------------
+    load(self): Loads the network from the definition file.
+
+    set_switch(self, switch_name, switch_state): Sets a switch.
+
+    run(self, cycles): Runs the simulation from scratch.
+
+    continue_run(self, cycles): Continues the simulation.
+
+    add_monitor(self, signal_name): Sets a monitor on a signal.
+
+    remove_monitor(self, signal_name): Removes the monitor on a signal.
+
+    get_monitor_names(self): Returns the names of the monitored signals.
+
+    get_trace_range(self, start, end, signal_names, buckets=None): Returns
+                    the signals of monitors from cycle start to end.
+    """
+
+    def __init__(self, path, pool):
+        """Initialise the session, before the network is loaded."""
+        self.path = path
+        self.pool = pool
+        self.names = None
+        self.devices = None
+        self.network = None
+        self.monitors = None
+        self.scheduler = None
+        self.cycles_completed = 0
+
+    def load(self):
+        """Load the network from the definition file.
+
+        The network is copied from the pool if the file has been parsed
+        before. Return an error message listing the syntax errors, or None
+        if successful.
+        """
+        # The scanner exits the program if it cannot open the file
+        if not self.path.endswith(".txt") or not os.path.isfile(self.path):
+            return "".join(["Cannot open definition file ", self.path])
+        network_objects, error_list = self.pool.load(self.path)
+        if network_objects is None:
+            errors = ["".join([str(len(error_list)), " errors in ",
+                               self.path])]
+            for error in error_list:
+                errors.extend([error.msg, error.line_num])
+            return "\n".join(errors)
+        [self.names, self.devices, self.network,
+         self.monitors] = network_objects
+        self.scheduler = Scheduler(self.names, self.devices, self.network,
+                                   self.monitors)
+        return None
+
+    def set_switch(self, switch_name, switch_state):
+        """Set a switch to the given state.
+
+        Return an error message, or None if successful.
+        """
+        switch_id = self.names.query(switch_name)
+        if switch_state not in [0, 1]:
+            return "Switch states must be 0 or 1"
+        if switch_id is None or \
+                not self.devices.set_switch(switch_id, switch_state):
+            return "".join(["Unknown switch ", switch_name])
+        return None
+
+    def run(self, cycles):
+        """Run the simulation from scratch for the given cycles.
+
+        Return an error message, or None if successful.
+        """
+        self.cycles_completed = 0
+        self.monitors.reset_monitors()
+        self.devices.cold_startup()
+        return self.continue_run(cycles)
+
+    def continue_run(self, cycles):
+        """Continue the simulation for the given cycles.
+
+        Return an error message, or None if successful.
+        """
+        self.scheduler.reset_report()
+        if self.scheduler.run(cycles, self.cycles_completed) != \
+                self.scheduler.NO_ERROR:
+            return "Network oscillating"
+        self.cycles_completed += cycles
+        return None
+
+    def add_monitor(self, signal_name):
+        """Set a monitor on a signal.
+
+        Return an error message, or None if successful.
+        """
+        [device_id, output_id] = self.devices.get_signal_ids(signal_name)
+        if self.monitors.make_monitor(device_id, output_id,
+                                      self.cycles_completed) != \
+                self.monitors.NO_ERROR:
+            return "".join(["Cannot monitor ", signal_name])
+        return None
+
+    def remove_monitor(self, signal_name):
+        """Remove the monitor on a signal.
+
+        Return an error message, or None if successful.
+        """
+        [device_id, output_id] = self.devices.get_signal_ids(signal_name)
+        if not self.monitors.remove_monitor(device_id, output_id):
+            return "".join(["No monitor on ", signal_name])
+        return None
+
+    def get_monitor_names(self):
+        """Return the names of the monitored signals."""
+        return self.monitors.get_signal_names()[0]
+
+    def get_trace_range(self, start, end, signal_names, buckets=None):
+        """Return the signals of the given monitors from cycle start to end.
+
+        If buckets is given, the signals are summarised in that many buckets
+        by Monitors.summarise_signals(). Return an error message and
+        {signal_name: [signal]}, where the error message is None if
+        successful.
+        """
+        monitors = []
+        for signal_name in signal_names:
+            monitor = tuple(self.devices.get_signal_ids(signal_name))
+            if monitor not in self.monitors.monitors_dictionary:
+                return "".join(["No monitor on ", signal_name]), {}
+            monitors.append(monitor)
+        windows, _ = self.monitors.query_signals(monitors, start, end,
+                                                 buckets)
+        if buckets is None:
+            windows = [window.tolist() for window in windows]
+        return None, dict(zip(signal_names, windows))
+
+
+class SimulationServer:
+    """Serve simulation commands from clients over a socket.
+
+    Loaded networks are kept as sessions, which any client can use by their
+    ID. Simulations run in an executor so that the event loop keeps serving
+    other clients, and the commands for each session run one at a time.
+
+    Parameters
+    ----------
+    max_workers: number of threads running simulations at once, or None
+                 for the executor's default.
+    chunk_cycles: number of cycles of each monitor in each streamed chunk.
+    pool: instance of the pool.SessionPool() class to load networks from,
+          or None for a new pool.
+
+    Public methods
+    --------------
+    call(self, session_id, function, *args): Runs a session method in the
+                                             executor.
+
+    send(self, writer, message): Sends a message to a client.
+
+    fetch_trace_range(self, request, writer): Streams a range of the traces
+                                              to a client.
+
+    handle_request(self, request, writer): Carries out a request and sends
+                                           the response.
+
+    handle_client(self, reader, writer): Reads and carries out the requests
+                                         of a client.
+
+    start_unix(self, path): Starts serving on a Unix socket.
+
+    start_tcp(self, port, host="127.0.0.1"): Starts serving on a TCP port.
+
+    close(self): Stops serving and shuts the executor down.
+    """
+
+    def __init__(self, max_workers=None, chunk_cycles=1000, pool=None):
+        """Initialise the sessions and the executor."""
+        self.chunk_cycles = chunk_cycles
+        if pool is None:
+            pool = SessionPool()
+        self.pool = pool
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+
+        # sessions stores {session_id: Session}, and locks
+        # {session_id: asyncio.Lock} for running one command at a time
+        self.sessions = {}
+        self.locks = {}
+        self.session_ids = itertools.count(1)
+        self.server = None
+
+    async def call(self, session_id, function, *args):
+        """Run a method of a session in the executor.
+
+        Return the result of the method, or raise KeyError if there is no
+        such session.
+        """
+        session = self.sessions[session_id]
+        async with self.locks[session_id]:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, getattr(session, function), *args)
+
+    async def send(self, writer, message):
+        """Send a message to a client, waiting if its buffer is full."""
+        writer.write(json.dumps(message).encode("utf-8") + b"\n")
+        await writer.drain()
+
+    async def fetch_trace_range(self, request, writer):
+        """Stream the traces from cycle start to end to a client.
+
+        Return the response to send once every chunk has been sent.
+        """
+        session_id = request["session"]
+        session = self.sessions[session_id]
+        async with self.locks[session_id]:
+            loop = asyncio.get_running_loop()
+            signal_names = request.get("monitors")
+            if signal_names is None:
+                signal_names = session.get_monitor_names()
+            start = max(0, request.get("start", 0))
+            end = min(request.get("end", session.cycles_completed),
+                      session.cycles_completed)
+            buckets = request.get("buckets")
+            # A summary of the range is sent as a single chunk
+            chunk_cycles = self.chunk_cycles if buckets is None else \
+                max(end - start, 1)
+            for chunk_start in range(start, end, chunk_cycles):
+                chunk_end = min(chunk_start + chunk_cycles, end)
+                # Each chunk is read in the executor, so that a long range
+                # does not hold up the other clients
+                error, signals = await loop.run_in_executor(
+                    self.executor, session.get_trace_range, chunk_start,
+                    chunk_end, signal_names, buckets)
+                if error is not None:
+                    return {"ok": False, "error": error}
+                await self.send(writer, {
+                    "id": request.get("id"),
+                    "chunk": {"start": chunk_start, "end": chunk_end,
+                              "signals": signals}})
+        return {"ok": True, "start": start, "end": max(start, end),
+                "monitors": signal_names}
+
+    async def handle_request(self, request, writer):
+        """Carry out a request and send the response."""
+        command = request.get("command")
+        error = None
+        response = {"ok": True}
+        try:
+            if command == "load":
+                session = Session(request["path"], self.pool)
+                loop = asyncio.get_running_loop()
+                error = await loop.run_in_executor(self.executor,
+                                                   session.load)
+                if error is None:
+                    session_id = next(self.session_ids)
+                    self.sessions[session_id] = session
+                    self.locks[session_id] = asyncio.Lock()
+                    response["session"] = session_id
+                    response["monitors"] = session.get_monitor_names()
+            elif command == "close":
+                async with self.locks[request["session"]]:
+                    del self.sessions[request["session"]]
+                    del self.locks[request["session"]]
+            elif command == "sessions":
+                response["sessions"] = {
+                    session_id: session.path for session_id, session in
+                    self.sessions.items()}
+            elif command == "pool":
+                response.update({"hits": self.pool.hits,
+                                 "misses": self.pool.misses,
+                                 "report": self.pool.get_report()})
+            elif command == "set-switch":
+                error = await self.call(request["session"], "set_switch",
+                                        request["switch"], request["value"])
+            elif command in ["run", "continue"]:
+                function = "run" if command == "run" else "continue_run"
+                if not isinstance(request["cycles"], int) or \
+                        request["cycles"] < 0:
+                    error = "The number of cycles must be a whole number"
+                else:
+                    error = await self.call(request["session"], function,
+                                            request["cycles"])
+                    response["cycles_completed"] = \
+                        self.sessions[request["session"]].cycles_completed
+            elif command in ["add-monitor", "remove-monitor"]:
+                function = "add_monitor" if command == "add-monitor" \
+                    else "remove_monitor"
+                error = await self.call(request["session"], function,
+                                        request["monitor"])
+            elif command == "fetch-trace-range":
+                response = await self.fetch_trace_range(request, writer)
+            else:
+                error = "".join(["Unknown command ", str(command)])
+        except KeyError as key:
+            if key.args and key.args[0] == request.get("session"):
+                error = "".join(["Unknown session ", str(key.args[0])])
+            else:
+                error = "".join(["Missing parameter ", str(key)])
+        except (AttributeError, TypeError, ValueError):
+            error = "Invalid parameters"
+
+        if error is not None:
+            response = {"ok": False, "error": error}
+        response["id"] = request.get("id")
+        await self.send(writer, response)
+
+    async def handle_client(self, reader, writer):
+        """Read and carry out the requests of a client.
+
+        Requests are carried out concurrently, so a long run does not hold
+        up the client's other requests.
+        """
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:  # the client has disconnected
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    request = None
+                if not isinstance(request, dict):
+                    await self.send(writer, {"id": None, "ok": False,
+                                             "error": "Invalid request"})
+                    continue
+                task = asyncio.create_task(
+                    self.handle_request(request, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError:  # the client has gone
+            pass
+        finally:
+            writer.close()
+
+    async def start_unix(self, path):
+        """Start serving on a Unix socket at path."""
+        self.server = await asyncio.start_unix_server(self.handle_client,
+                                                      path)
+
+    async def start_tcp(self, port, host="127.0.0.1"):
+        """Start serving on a TCP port of host, localhost by default."""
+        self.server = await asyncio.start_server(self.handle_client, host,
+                                                 port)
+
+    async def close(self):
+        """Stop serving and shut the executor down."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown()
+
+
+async def serve(server, socket_path, port):
+    """Serve on the Unix socket or TCP port until interrupted."""
+    if socket_path is not None:
+        await server.start_unix(socket_path)
+        print("".join(["Serving on ", socket_path]))
+    else:
+        await server.start_tcp(port)
+        print("".join(["Serving on localhost port ", str(port)]))
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(arg_list):
+    """Parse the command line options and run the server."""
+    usage_message = ("Usage:\n"
+                     "Show help: server.py -h\n"
+                     "Serve on a Unix socket: server.py -u <socket path>\n"
+                     "Serve on a localhost TCP port: server.py -t <port>")
+    try:
+        options, arguments = getopt.getopt(arg_list, "hu:t:")
+    except getopt.GetoptError:
+        print("Error: invalid command line arguments\n")
+        print(usage_message)
+        sys.exit()
+
+    option_values = dict(options)
+    if "-h" in option_values or arguments or \
+            ("-u" in option_values) == ("-t" in option_values):
+        print(usage_message)
+        sys.exit()
+    port = None
+    if "-t" in option_values:
+        if not option_values["-t"].isdigit():
+            print("Error: the port must be a number\n")
+            print(usage_message)
+            sys.exit()
+        port = int(option_values["-t"])
+
+    try:
+        asyncio.run(serve(SimulationServer(), option_values.get("-u"),
+                          port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
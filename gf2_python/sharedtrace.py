@@ -0,0 +1,311 @@
+"""Publish monitor traces in shared memory for other processes to read.
+
+Used in the Logic Simulator project to let several viewers and analysis
+scripts observe one running simulation without each running it again. The
+simulating process publishes the latest cycles of every monitor's trace
+into a named block of shared memory, and reader processes map the block and
+read the traces in place.
+
+The block starts with a header, followed by the JSON list of monitor names
+and then a ring buffer for each monitor. Each ring holds the latest
+capacity signals twice over, so that any run of up to capacity cycles is
+contiguous and can be read without copying. The header holds a sequence
+counter that is odd while the writer changes the header or the names, so
+that readers can read them without locks and retry if they changed
+meanwhile.
+
+Classes
+-------
+TracePublisher - publishes monitor traces in shared memory.
+TraceReader - reads monitor traces published in shared memory.
+"""
+import json
+import os
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+
+# Magic bytes, capacity, maximum monitors, names length, monitors, layout
+# counter, sequence counter and cycles published
+HEADER = struct.Struct("<4sIIIIIQQ")
+MAGIC = b"LSTR"
+SEQUENCE_OFFSET = struct.calcsize("<4sIIIII")
+NAME_BYTES = 256  # space for the name of each monitor
+
+# Names of the blocks published by this process and the processes it forked
+published_names = set()
+
+
+def get_data_offset(max_monitors):
+    """Return the offset of the first ring buffer in the block."""
+    return HEADER.size + NAME_BYTES * max_monitors
+
+
+class TracePublisher:
+    """Publish monitor traces in shared memory.
+
+    Only the first max_monitors monitors are published. A signal published
+    for a cycle stays in place until capacity more cycles have been
+    published.
+
+    Parameters
+    ----------
+    memory_name: name of the shared memory block to create.
+    capacity: number of cycles kept for each monitor.
+    max_monitors: number of monitors the block has room for.
+
+    Public methods
+    --------------
+    begin_update(self): Makes the sequence counter odd while the header and
+                        names are changed.
+
+    end_update(self, cycles): Writes the header and makes the sequence
+                              counter even again.
+
+    write_signals(self, monitor, first_cycle, signals): Writes signals into
+                                                        a monitor's ring.
+
+    sync(self, monitors): Publishes the names and latest signals of every
+                          monitor.
+
+    append(self, monitors): Publishes the signals recorded since the last
+                            update.
+
+    close(self): Removes the shared memory block.
+    """
+
+    def __init__(self, memory_name, capacity=1024, max_monitors=64):
+        """Create the shared memory block."""
+        self.capacity = capacity
+        self.max_monitors = max_monitors
+        self.data_offset = get_data_offset(max_monitors)
+        self.memory = shared_memory.SharedMemory(
+            name=memory_name, create=True,
+            size=self.data_offset + 2 * capacity * max_monitors)
+        self.name = self.memory.name
+        published_names.add(self.name)
+
+        self.sequence = 0
+        self.layout = 0  # counts the changes to the published monitors
+        self.cycles = 0  # number of cycles published
+        self.monitors = 0  # number of monitors published
+        self.names_length = 0
+        self.begin_update()
+        self.end_update(0)
+
+    def begin_update(self):
+        """Make the sequence counter odd while the header and names change."""
+        self.sequence += 1
+        struct.pack_into("<Q", self.memory.buf, SEQUENCE_OFFSET,
+                         self.sequence)
+
+    def end_update(self, cycles):
+        """Write the header and make the sequence counter even again."""
+        buffer = self.memory.buf
+        HEADER.pack_into(buffer, 0, MAGIC, self.capacity, self.max_monitors,
+                         self.names_length, self.monitors, self.layout,
+                         self.sequence, cycles)
+        self.sequence += 1
+        struct.pack_into("<Q", buffer, SEQUENCE_OFFSET, self.sequence)
+        self.cycles = cycles
+
+    def write_signals(self, monitor, first_cycle, signals):
+        """Write signals into a monitor's ring, starting at first_cycle.
+
+        At most capacity signals can be written at once. Each signal is
+        written twice, capacity bytes apart.
+        """
+        buffer = self.memory.buf
+        base = self.data_offset + 2 * self.capacity * monitor
+        position = first_cycle % self.capacity
+        part = min(len(signals), self.capacity - position)
+        for start in [base + position, base + position + self.capacity]:
+            buffer[start:start + part] = signals[:part]
+        rest = signals[part:]
+        for start in [base, base + self.capacity]:
+            buffer[start:start + len(rest)] = rest
+
+    def sync(self, monitors):
+        """Publish the names and latest signals of every monitor.
+
+        This is called whenever monitors are added or removed or their
+        traces are cleared.
+        """
+        signal_lists, names = monitors.get_signals()
+        signal_lists = signal_lists[:self.max_monitors]
+        names = names[:self.max_monitors]
+        names_bytes = json.dumps(names).encode("utf-8")
+        while len(names_bytes) > NAME_BYTES * self.max_monitors:
+            names.pop()
+            names_bytes = json.dumps(names).encode("utf-8")
+        signal_lists = signal_lists[:len(names)]
+
+        # Readers wait while the names and traces are replaced
+        self.begin_update()
+        self.memory.buf[HEADER.size:HEADER.size + len(names_bytes)] = \
+            names_bytes
+        cycles = 0
+        if signal_lists:
+            cycles = len(signal_lists[0])
+            first_cycle = max(0, cycles - self.capacity)
+            for monitor, signal_list in enumerate(signal_lists):
+                self.write_signals(monitor, first_cycle,
+                                   bytes(signal_list[first_cycle:]))
+        self.names_length = len(names_bytes)
+        self.monitors = len(names)
+        self.layout += 1
+        self.end_update(cycles)
+
+    def append(self, monitors):
+        """Publish the signals recorded since the last update."""
+        if self.monitors == 0:
+            return
+        signal_lists = list(monitors.monitors_dictionary.values())
+        cycles = len(signal_lists[0])
+        first_cycle = max(self.cycles, cycles - self.capacity)
+        if first_cycle >= cycles:
+            return
+        for monitor, signal_list in enumerate(
+                signal_lists[:self.monitors]):
+            self.write_signals(monitor, first_cycle,
+                               bytes(signal_list[first_cycle:]))
+        # The signals are in place before readers are told of them
+        self.begin_update()
+        self.end_update(cycles)
+
+    def close(self):
+        """Remove the shared memory block."""
+        self.memory.close()
+        self.memory.unlink()
+        published_names.discard(self.name)
+
+
+class TraceReader:
+    """Read monitor traces published in shared memory.
+
+    The traces are returned as memoryviews of the shared memory, without
+    copying. Signals remain valid until the publisher writes capacity
+    cycles past them, which check() reports. A TraceReader can be passed to
+    the GUI canvases in place of a monitors.Monitors() instance.
+
+    Parameters
+    ----------
+    memory_name: name of the shared memory block to read.
+    timeout: seconds to wait for the publisher to finish changing the header
+             before giving up.
+
+    Public methods
+    --------------
+    read_header(self): Returns the monitor count and the number of cycles
+                       published.
+
+    get_names(self): Returns the names of the published monitors.
+
+    get_signals(self, cycles=None): Returns views of the latest signals and
+                                    names of the monitors.
+
+    check(self, first_cycle): Returns True if the signals from first_cycle
+                              have not been overwritten.
+
+    close(self): Unmaps the shared memory block.
+    """
+
+    def __init__(self, memory_name, timeout=1):
+        """Map the shared memory block."""
+        try:
+            self.memory = shared_memory.SharedMemory(name=memory_name,
+                                                     track=False)
+        except TypeError:  # Python before 3.13 always tracks the block
+            self.memory = shared_memory.SharedMemory(name=memory_name)
+            # Otherwise the block is removed when this process exits. The
+            # publisher's own process shares its tracker, which must keep
+            # the block. Blocks are only tracked on POSIX, under their name
+            # with a leading slash.
+            if os.name == "posix" and \
+                    self.memory.name not in published_names:
+                resource_tracker.unregister("/" + self.memory.name,
+                                            "shared_memory")
+        (magic, self.capacity, self.max_monitors, _, _, _, _,
+         _) = HEADER.unpack_from(self.memory.buf, 0)
+        if magic != MAGIC:
+            self.memory.close()
+            raise ValueError("not a published trace block")
+        self.data_offset = get_data_offset(self.max_monitors)
+        self.timeout = timeout
+
+        # Number of cycles shown by get_signals() by default
+        self.view_cycles = self.capacity
+
+        # The names are only decoded again when the layout changes
+        self.names = []
+        self.layout = None
+        self.first_cycle = 0  # the first cycle of the latest signals
+
+    def read_header(self):
+        """Return the monitor count and the number of cycles published.
+
+        The header and names are read again if the sequence counter shows
+        the publisher was changing them. Raise TimeoutError if it is still
+        changing them after timeout seconds, as when the publisher stopped
+        in the middle of an update.
+        """
+        buffer = self.memory.buf
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if time.monotonic() > deadline:
+                raise TimeoutError("the published header is not consistent")
+            (_, _, _, names_length, monitors, layout, sequence,
+             cycles) = HEADER.unpack_from(buffer, 0)
+            if sequence % 2 == 1:
+                continue
+            names = self.names
+            if layout != self.layout:
+                try:
+                    names = json.loads(bytes(
+                        buffer[HEADER.size:HEADER.size + names_length]) or
+                        b"[]")
+                except ValueError:  # the names were being written
+                    continue
+            if struct.unpack_from("<Q", buffer,
+                                  SEQUENCE_OFFSET)[0] == sequence:
+                break
+        self.names = names
+        self.layout = layout
+        return monitors, cycles
+
+    def get_names(self):
+        """Return the names of the published monitors."""
+        self.read_header()
+        return list(self.names)
+
+    def get_signals(self, cycles=None):
+        """Return views of the latest signals and the monitor names.
+
+        At most cycles cycles are returned for each monitor, or view_cycles
+        if cycles is None. The first cycle returned is stored in
+        first_cycle.
+        """
+        if cycles is None:
+            cycles = self.view_cycles
+        monitors, cycles_published = self.read_header()
+        cycles = min(cycles, cycles_published, self.capacity)
+        self.first_cycle = cycles_published - cycles
+        position = self.first_cycle % self.capacity
+        signal_lists = []
+        for monitor in range(monitors):
+            start = self.data_offset + 2 * self.capacity * monitor + position
+            signal_lists.append(self.memory.buf[start:start + cycles])
+        return signal_lists, list(self.names[:monitors])
+
+    def check(self, first_cycle):
+        """Return True if the signals from first_cycle are still in place.
+
+        Signals read before this returns True are consistent.
+        """
+        cycles_published = self.read_header()[1]
+        return cycles_published - self.capacity <= first_cycle
+
+    def close(self):
+        """Unmap the shared memory block."""
+        self.memory.close()
@@ -0,0 +1,202 @@
+"""Read switch changes from a stimulus file and apply them.
+
+Used in the Logic Simulator project to drive the switches of a network from
+a file of time-indexed switch changes while the simulation runs.
+
+A stimulus file lists the cycles at which switches change, in order. In a
+text stimulus file each line is a cycle number followed by name=value
+pairs, and # starts a comment:
+
+    0 sw1=1 sw2=0
+    25 sw1=0
+
+In a CSV stimulus file (ending in .csv) the header row is "cycle" followed
+by switch names, and each row gives the new values at a cycle. An empty
+cell leaves the switch unchanged:
+
+    cycle,sw1,sw2
+    0,1,0
+    25,0,
+
+Classes
+-------
+Stimulus - reads switch changes from a stimulus file and applies them.
+"""
+import csv
+
+
+class Stimulus:
+    """Read switch changes from a stimulus file and apply them.
+
+    The file is read lazily, one line ahead of the simulation, so memory use
+    does not depend on the length of the file and a run can start as soon
+    as the first line is read. Cycle 0 is the first cycle of a run, and the
+    changes for a cycle are applied before it is executed.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+    path: path of the stimulus file.
+
+    Public methods
+    --------------
+    read_changes(self): Returns a generator of the switch changes in the
+                        file.
+
+    read_text_rows(self, stimulus_file): Returns a generator of the rows of a
+                                         text stimulus file.
+
+    read_csv_rows(self, stimulus_file): Returns a generator of the rows of a
+                                        CSV stimulus file.
+
+    restart(self): Starts reading the file again from the beginning.
+
+    get_next_cycle(self): Returns the next cycle at which a switch changes.
+
+    apply_changes(self, cycle): Sets the switches that change up to and
+                                including the given cycle.
+
+    get_error_message(self): Returns a message describing the error found in
+                             the file.
+    """
+
+    def __init__(self, names, devices, path):
+        """Initialise the stimulus errors and start reading the file."""
+        self.names = names
+        self.devices = devices
+        self.path = path
+
+        [self.NO_ERROR, self.BAD_LINE, self.BAD_CYCLE, self.BAD_SWITCH,
+         self.BAD_VALUE] = self.names.unique_error_codes(5)
+
+        self.restart()
+
+    def read_changes(self):
+        """Return a generator of the switch changes in the file.
+
+        Each item is (cycle, [(switch_id, switch_state)]). Reading stops at
+        the first invalid line, setting error_type and error_line.
+        """
+        with open(self.path, newline="") as stimulus_file:
+            if self.path.lower().endswith(".csv"):
+                rows = self.read_csv_rows(stimulus_file)
+            else:
+                rows = self.read_text_rows(stimulus_file)
+
+            last_cycle = 0
+            for line_number, cycle_string, settings in rows:
+                self.error_line = line_number
+                if not cycle_string.isdigit():
+                    self.error_type = self.BAD_CYCLE
+                    return
+                cycle = int(cycle_string)
+                if cycle < last_cycle:  # cycles must be in order
+                    self.error_type = self.BAD_CYCLE
+                    return
+                last_cycle = cycle
+
+                changes = []
+                for switch_name, value_string in settings:
+                    if value_string == "":  # unchanged
+                        continue
+                    switch_id = self.names.query(switch_name)
+                    switch = self.devices.get_device(switch_id)
+                    if switch is None or \
+                            switch.device_kind != self.devices.SWITCH:
+                        self.error_type = self.BAD_SWITCH
+                        return
+                    if value_string not in ["0", "1"]:
+                        self.error_type = self.BAD_VALUE
+                        return
+                    changes.append((switch_id, int(value_string)))
+                yield (cycle, changes)
+
+    def read_text_rows(self, stimulus_file):
+        """Return a generator of the rows of a text stimulus file.
+
+        Each row is (line_number, cycle_string, [(switch_name, value)]).
+        """
+        for line_number, line in enumerate(stimulus_file, 1):
+            words = line.split("#")[0].split()
+            if not words:  # blank line or comment
+                continue
+            settings = []
+            for word in words[1:]:
+                if word.count("=") != 1:
+                    self.error_line = line_number
+                    self.error_type = self.BAD_LINE
+                    return
+                settings.append(tuple(word.split("=")))
+            yield (line_number, words[0], settings)
+
+    def read_csv_rows(self, stimulus_file):
+        """Return a generator of the rows of a CSV stimulus file.
+
+        Each row is (line_number, cycle_string, [(switch_name, value)]).
+        """
+        reader = csv.reader(stimulus_file)
+        header = next(reader, None)
+        if header is None:  # empty file
+            return
+        header = [cell.strip() for cell in header]
+        if header[0] != "cycle":
+            self.error_line = 1
+            self.error_type = self.BAD_LINE
+            return
+        switch_names = header[1:]
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != len(header):
+                self.error_line = reader.line_num
+                self.error_type = self.BAD_LINE
+                return
+            values = [cell.strip() for cell in row]
+            yield (reader.line_num, values[0],
+                   list(zip(switch_names, values[1:])))
+
+    def restart(self):
+        """Start reading the file again from the beginning."""
+        self.error_type = self.NO_ERROR
+        self.error_line = None
+        self.changes = self.read_changes()
+        # The next change to be applied is read one step ahead
+        self.next_change = next(self.changes, None)
+
+    def get_next_cycle(self):
+        """Return the next cycle at which a switch changes.
+
+        Return None if there are no more changes.
+        """
+        if self.next_change is None:
+            return None
+        return self.next_change[0]
+
+    def apply_changes(self, cycle):
+        """Set the switches that change up to and including the cycle.
+
+        Return self.NO_ERROR if successful, or the error found in the file.
+        """
+        while self.next_change is not None and self.next_change[0] <= cycle:
+            for switch_id, switch_state in self.next_change[1]:
+                self.devices.set_switch(switch_id, switch_state)
+            self.next_change = next(self.changes, None)
+        if self.next_change is None:
+            return self.error_type
+        return self.NO_ERROR
+
+    def get_error_message(self):
+        """Return a message describing the error found in the file."""
+        if self.error_type == self.BAD_LINE:
+            message = "Expected cycle followed by switch=value settings"
+        elif self.error_type == self.BAD_CYCLE:
+            message = "Expected a cycle no earlier than the one before"
+        elif self.error_type == self.BAD_SWITCH:
+            message = "Unknown switch"
+        elif self.error_type == self.BAD_VALUE:
+            message = "Switch values must be 0 or 1"
+        else:
+            return None
+        return "".join(["Stimulus line ", str(self.error_line), ": ",
+                        message])
@@ -101,13 +101,18 @@ def test_make_device(new_devices):
 
     # Non-SIGGEN device defined with multiple qualifiers
     ("(SW2_ID, new_devices.SWITCH, [0 , 1])", "new_devices.EXCESS_QUALIFIER"),
+
+    # Bus widths are between 1 and 64
+    ("(R1_ID, new_devices.REG, None)", "new_devices.NO_QUALIFIER"),
+    ("(R1_ID, new_devices.REG, [65])", "new_devices.INVALID_QUALIFIER"),
+    ("(R1_ID, new_devices.BAND, [64])", "new_devices.NO_ERROR"),
 ])
 def test_make_device_gives_errors(new_devices, function_args, error):
     """Test if make_device returns the appropriate errors."""
     names = new_devices.names
     [AND1_ID, SW1_ID, CL_ID, D_ID, X1_ID,
-     X2_ID, SW2_ID] = names.lookup(
-        ["And1", "Sw1", "Clock1", "D1", "Xor1", "Xor2", "SW2"])
+     X2_ID, SW2_ID, R1_ID] = names.lookup(
+        ["And1", "Sw1", "Clock1", "D1", "Xor1", "Xor2", "SW2", "Reg1"])
 
     # Add a XOR device: X2_ID
     new_devices.make_device(X2_ID, new_devices.XOR)
@@ -138,6 +143,27 @@ def test_get_signal_ids(devices_with_items):
     assert devices.get_signal_ids("And1") == [AND1, None]
 
 
+def test_bus_signal_names(new_devices):
+    """Test if single bits of bus outputs are named and looked up."""
+    names = new_devices.names
+    [REG1, BOR1] = names.lookup(["Reg1", "Bor1"])
+    new_devices.make_device(REG1, new_devices.REG, [8])
+    new_devices.make_device(BOR1, new_devices.BOR, [8])
+
+    [device_id, bit_port_id] = new_devices.get_signal_ids("Reg1.Q[7]")
+    assert device_id == REG1
+    assert new_devices.get_bit_port(bit_port_id) == [new_devices.Q_ID, 7]
+    assert new_devices.get_signal_name(REG1, bit_port_id) == "Reg1.Q[7]"
+    assert new_devices.get_signal_name(REG1, new_devices.Q_ID) == "Reg1.Q"
+
+    [device_id, bit_port_id] = new_devices.get_signal_ids("Bor1[0]")
+    assert new_devices.get_signal_name(BOR1, bit_port_id) == "Bor1[0]"
+
+    # Bits beyond the bus width are not outputs
+    assert not new_devices.is_output(REG1, new_devices.make_bit_port(
+        new_devices.Q_ID, 8))
+
+
 def test_set_switch(new_devices):
     """Test if set_switch changes the switch state correctly."""
     names = new_devices.names
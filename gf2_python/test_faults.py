@@ -0,0 +1,238 @@
+"""Test the faults module."""
+import random
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import Scanner
+from parse import Parser
+from stimulus import Stimulus
+from scheduler import Scheduler
+from generator import CircuitGenerator
+from faults import FaultSimulator
+
+
+LATCH = """DEVICES {
+clk: CLOCK, period 2;
+s: SWITCH, initial 0;
+r: SWITCH, initial 1;
+d: SWITCH, initial 0;
+zero: SWITCH, initial 0;
+q: NAND, inputs 2;
+qbar: NAND, inputs 2;
+set: AND, inputs 2;
+f0: DTYPE;
+f1: DTYPE;
+x: XOR;
+}
+CONNECT {
+s = q.I1;
+qbar = q.I2;
+r = qbar.I1;
+q = qbar.I2;
+clk = f0.CLK;
+clk = f1.CLK;
+d = f0.DATA;
+f0.QBAR = f1.DATA;
+q = set.I1;
+d = set.I2;
+set = f1.SET;
+zero = f0.SET;
+zero = f0.CLEAR;
+r = f1.CLEAR;
+f1.Q = x.I1;
+q = x.I2;
+}
+MONITOR { x; f0.Q; }
+END
+"""
+
+LATCH_STIMULUS = """3 s=1
+5 r=0 d=1
+7 r=1
+10 d=0
+13 s=0
+15 s=1 d=1
+"""
+
+
+def load(tmp_path, text, stimulus_text=None, seed=0):
+    """Return the network objects of a definition file and stimulus."""
+    path = tmp_path / "definition.txt"
+    path.write_text(text)
+    random.seed(seed)
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    assert Parser(names, devices, network, monitors,
+                  Scanner(str(path), names)).parse_network()
+    stimulus = None
+    if stimulus_text is not None:
+        stimulus_path = tmp_path / "stimulus.txt"
+        stimulus_path.write_text(stimulus_text)
+        stimulus = Stimulus(names, devices, str(stimulus_path))
+    return [names, devices, network, monitors, stimulus]
+
+
+def get_random_stimulus(text, cycles, seed):
+    """Return a stimulus setting the switches of a definition at random."""
+    switch_names = [line.split(":")[0] for line in text.splitlines()
+                    if ": SWITCH" in line]
+    generator = random.Random(seed)
+    lines = []
+    for cycle in range(0, cycles, 3):
+        settings = ["".join([name, "=", str(generator.randrange(2))])
+                    for name in switch_names if generator.random() < 0.5]
+        if settings:
+            lines.append(" ".join([str(cycle)] + settings))
+    return "\n".join(lines) + "\n"
+
+
+def get_traces(tmp_path, text, stimulus_text, cycles, seed, fault=None):
+    """Return the traces of the scheduler with a fault wired in.
+
+    The faulty output or input is connected to a new switch held at the
+    stuck signal instead. Return None if the network oscillates.
+    """
+    [names, devices, network, monitors, stimulus] = load(
+        tmp_path, text, stimulus_text, seed)
+    if fault is not None:
+        (device_id, port_id, signal) = fault
+        [stuck_id] = names.lookup(["stuck"])
+        devices.make_device(stuck_id, devices.SWITCH, [signal])
+        if port_id in devices.get_device(device_id).outputs:
+            for device in devices.devices_list:
+                for input_id, connected_output in device.inputs.items():
+                    if connected_output == (device_id, port_id):
+                        device.inputs[input_id] = (stuck_id, None)
+            monitors.monitors_dictionary = type(
+                monitors.monitors_dictionary)([
+                    ((stuck_id, None) if key == (device_id, port_id) else
+                     key, signal_list) for key, signal_list in
+                    monitors.monitors_dictionary.items()])
+        else:
+            devices.get_device(device_id).inputs[port_id] = (stuck_id, None)
+        network.connection_changes += 1
+    scheduler = Scheduler(names, devices, network, monitors, stimulus,
+                          detect_periods=False, prune=False)
+    if scheduler.run(cycles) != scheduler.NO_ERROR:
+        return None
+    return monitors.get_signals()[0]
+
+
+@pytest.mark.parametrize("make, seed", [
+    (lambda: CircuitGenerator(0, 5).make_random_dag(40, depth=5), 0),
+    (lambda: CircuitGenerator(1, 6).make_shift_register(4), 1),
+    (lambda: CircuitGenerator(0).make_ring_counter(4), 2),
+    (lambda: CircuitGenerator(0).make_ripple_adder(2), 3),
+    (lambda: LATCH, 4),
+])
+def test_simulate_word_matches_scheduler(tmp_path, make, seed):
+    """Test that the fault-free network gives the scheduler's traces."""
+    text = make()
+    stimulus_text = get_random_stimulus(text, 40, seed)
+    scalar = get_traces(tmp_path, text, stimulus_text, 40, seed)
+    [names, devices, network, monitors, stimulus] = load(
+        tmp_path, text, stimulus_text, seed)
+    fault_simulator = FaultSimulator(names, devices, network, monitors,
+                                     stimulus)
+    signals = {}
+    assert fault_simulator.simulate_word([], 40, signals) == \
+        fault_simulator.NO_ERROR
+    assert [signals[key] for key in monitors.monitors_dictionary] == \
+        [list(trace) for trace in scalar]
+
+
+@pytest.mark.parametrize("make, stimulus_text, seed", [
+    (lambda: CircuitGenerator(0, 5).make_random_dag(12, depth=3), None, 0),
+    (lambda: CircuitGenerator(1, 6).make_shift_register(3), None, 1),
+    (lambda: LATCH, LATCH_STIMULUS, 2),
+])
+def test_run_matches_wired_faults(tmp_path, make, stimulus_text, seed):
+    """Test that the faults detected change the scheduler's traces."""
+    text = make()
+    if stimulus_text is None:
+        stimulus_text = get_random_stimulus(text, 20, seed)
+    [names, devices, network, monitors, stimulus] = load(
+        tmp_path, text, stimulus_text, seed)
+    # Small words, so that the stimulus is read again for each
+    fault_simulator = FaultSimulator(names, devices, network, monitors,
+                                     stimulus, word_width=7)
+    assert fault_simulator.run(20) == fault_simulator.NO_ERROR
+    assert fault_simulator.words > 1
+    assert fault_simulator.oscillating == set()
+
+    good_traces = get_traces(tmp_path, text, stimulus_text, 20, seed)
+    detected = set()
+    for fault in fault_simulator.faults:
+        traces = get_traces(tmp_path, text, stimulus_text, 20, seed, fault)
+        assert traces is not None
+        if traces != good_traces:
+            detected.add(fault)
+    assert set(fault_simulator.detected) == detected
+    assert 0 < len(detected) < len(fault_simulator.faults)
+
+
+def test_detection_cycles(tmp_path):
+    """Test the cycles at which the faults of an AND gate are detected."""
+    text = """DEVICES { a: SWITCH, initial 0; b: SWITCH, initial 0;
+                        g: AND, inputs 2; }
+              CONNECT { a = g.I1; b = g.I2; }
+              MONITOR { g; }
+              END"""
+    [names, devices, network, monitors, stimulus] = load(
+        tmp_path, text, "1 b=1\n2 a=1 b=0\n3 b=1\n")
+    fault_simulator = FaultSimulator(names, devices, network, monitors,
+                                     stimulus)
+    assert fault_simulator.run() == fault_simulator.NO_ERROR
+    assert fault_simulator.cycles == 4
+    [a, b, g, I1, I2] = names.lookup(["a", "b", "g", "I1", "I2"])
+    LOW = devices.LOW
+    HIGH = devices.HIGH
+    assert fault_simulator.detected == {
+        (a, None, LOW): 3, (a, None, HIGH): 1,
+        (b, None, LOW): 3, (b, None, HIGH): 2,
+        (g, None, LOW): 3, (g, None, HIGH): 0,
+        (g, I1, LOW): 3, (g, I1, HIGH): 1,
+        (g, I2, LOW): 3, (g, I2, HIGH): 2}
+    assert fault_simulator.get_coverage() == 1
+    assert fault_simulator.get_fault_name((g, I1, LOW)) == "g.I1 stuck-at-0"
+
+    # Without the last cycle, no stuck-at-0 fault is detected
+    assert fault_simulator.run(3) == fault_simulator.NO_ERROR
+    assert len(fault_simulator.detected) == 5
+    report = fault_simulator.get_report()
+    assert "Simulated 10 stuck-at faults over 3 cycles in 1 word." in report
+    assert "Detected 5, undetected 5, oscillating 0. Fault coverage " \
+        "50.0%." in report
+    assert "a stuck-at-0" in report.splitlines()
+
+
+def test_errors(tmp_path):
+    """Test that oscillation, bad stimulus and bus devices are reported."""
+    [names, devices, network, monitors, stimulus] = load(
+        tmp_path, LATCH, "3 s=1\n5 s=2\n")
+    fault_simulator = FaultSimulator(names, devices, network, monitors,
+                                     stimulus)
+    assert fault_simulator.run(10) == fault_simulator.BAD_STIMULUS
+
+    # A NAND gate driving its own input oscillates when enabled
+    [names, devices, network, monitors, stimulus] = load(
+        tmp_path, """DEVICES { e: SWITCH, initial 0; g: NAND, inputs 2; }
+                     CONNECT { e = g.I1; g = g.I2; }
+                     MONITOR { g; }
+                     END""", "2 e=1\n")
+    fault_simulator = FaultSimulator(names, devices, network, monitors,
+                                     stimulus)
+    assert fault_simulator.run(2) == fault_simulator.NO_ERROR
+    assert fault_simulator.run(3) == fault_simulator.OSCILLATING
+
+    with open("parse_test_files/Bus.txt") as bus_file:
+        [names, devices, network, monitors, stimulus] = load(
+            tmp_path, bus_file.read())
+    fault_simulator = FaultSimulator(names, devices, network, monitors)
+    assert fault_simulator.run(5) == fault_simulator.NOT_SUPPORTED
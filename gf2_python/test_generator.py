@@ -0,0 +1,139 @@
+"""Test the generator module."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import Scanner
+from parse import Parser
+from generator import CircuitGenerator
+
+
+def load(tmp_path, text):
+    """Parse the text of a definition file and return the network objects."""
+    path = tmp_path / "circuit.txt"
+    path.write_text(text)
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    scanner = Scanner(str(path), names)
+    parser = Parser(names, devices, network, monitors, scanner)
+    assert parser.parse_network()
+    scanner.close_file()
+    return names, devices, network, monitors
+
+
+def get_number(names, network, prefix, bits):
+    """Return the number made by the outputs prefix0, prefix1, ..."""
+    device_ids = names.lookup(["".join([prefix, str(bit)])
+                               for bit in range(bits)])
+    return sum(network.get_output_signal(device_id, None) << bit
+               for bit, device_id in enumerate(device_ids))
+
+
+def test_same_seed_same_circuit():
+    """Test that circuits depend only on the seed."""
+    assert CircuitGenerator(5).make_random_dag(100) == \
+        CircuitGenerator(5).make_random_dag(100)
+    assert CircuitGenerator(5).make_random_dag(100) != \
+        CircuitGenerator(6).make_random_dag(100)
+
+
+@pytest.mark.parametrize("make, width, seed", [
+    ("make_ripple_adder", 3, 0),
+    ("make_ripple_adder", 3, 1),
+    ("make_lookahead_adder", 3, 2),
+])
+def test_adders(tmp_path, make, width, seed):
+    """Test that the adders add their switches."""
+    generator = CircuitGenerator(seed)
+    names, devices, network, monitors = load(
+        tmp_path, getattr(generator, make)(width))
+    assert network.execute_network()
+    a = get_number(names, network, "a", width)
+    b = get_number(names, network, "b", width)
+    assert get_number(names, network, "s", width + 1) == a + b
+
+
+def test_lookahead_blocks(tmp_path):
+    """Test that the carries pass between the blocks of bits."""
+    generator = CircuitGenerator(0, sequence_length=6)
+    names, devices, network, monitors = load(
+        tmp_path, generator.make_lookahead_adder(4, block=2))
+    # The signal generators give new operands every cycle
+    for _ in range(6):
+        assert network.execute_network()
+        a = get_number(names, network, "a", 4)
+        b = get_number(names, network, "b", 4)
+        assert get_number(names, network, "s", 5) == a + b
+
+
+@pytest.mark.parametrize("width", [1, 2, 3, 8, 16])
+def test_multiplier(tmp_path, width):
+    """Test that the multiplier multiplies its signal generators."""
+    generator = CircuitGenerator(3, sequence_length=4)
+    names, devices, network, monitors = load(
+        tmp_path, generator.make_multiplier(width))
+    # Every product settles within the network's limit of passes
+    for _ in range(4):
+        assert network.execute_network()
+        a = get_number(names, network, "a", width)
+        b = get_number(names, network, "b", width)
+        assert get_number(names, network, "s", 2 * width) == a * b
+
+
+def test_shift_register(tmp_path):
+    """Test that the data is shifted along the register."""
+    names, devices, network, monitors = load(
+        tmp_path, CircuitGenerator(0, 5).make_shift_register(3))
+    [D0, D2, Q] = names.lookup(["d0", "d2", "Q"])
+    monitors.make_monitor(D0, Q)
+    for _ in range(20):
+        assert network.execute_network()
+        monitors.record_signals()
+    first = monitors.monitors_dictionary[(D0, Q)]
+    last = monitors.monitors_dictionary[(D2, Q)]
+    # The clock rises every other cycle
+    assert last[4:] == first[:-4]
+
+
+def test_ring_counter(tmp_path):
+    """Test that exactly one D-type of the ring is HIGH."""
+    names, devices, network, monitors = load(
+        tmp_path, CircuitGenerator(0).make_ring_counter(3))
+    device_ids = names.lookup(["d0", "d1", "d2"])
+    highs = []
+    for _ in range(30):
+        assert network.execute_network()
+        outputs = [network.get_output_signal(device_id, devices.Q_ID)
+                   for device_id in device_ids]
+        assert outputs.count(devices.HIGH) == 1
+        highs.append(outputs.index(devices.HIGH))
+    assert set(highs) == {0, 1, 2}
+
+
+def test_random_dag(tmp_path):
+    """Test that random networks parse and settle."""
+    text = CircuitGenerator(1).make_random_dag(40, depth=4, fanout=3,
+                                               inputs=8)
+    names, devices, network, monitors = load(tmp_path, text)
+    assert network.execute_network()
+    assert len(devices.find_devices(devices.SWITCH)) == 8
+    assert len(monitors.monitors_dictionary) == 10
+    gate_ids = [device_id for kind in devices.gate_types
+                for device_id in devices.find_devices(kind)]
+    assert len(gate_ids) == 40
+
+
+@pytest.mark.parametrize("gates", [1, 3, 6])
+def test_random_dag_fewer_gates_than_levels(tmp_path, gates):
+    """Test that a network with fewer gates than levels has a gate in each."""
+    text = CircuitGenerator(0).make_random_dag(gates, depth=8)
+    names, devices, network, monitors = load(tmp_path, text)
+    assert network.execute_network()
+    gate_ids = [device_id for kind in devices.gate_types
+                for device_id in devices.find_devices(kind)]
+    assert len(gate_ids) == gates
+    assert len(monitors.monitors_dictionary) == 1
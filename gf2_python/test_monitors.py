@@ -197,3 +197,74 @@ def test_display_signals(capsys, new_monitors):
             "Clock1: -__--__--__--__--__-" in traces)
 
     assert "" in traces  # additional empty line at the end
+
+
+def test_query_signals(new_monitors):
+    """Test if query_signals returns views of a window of cycles."""
+    names = new_monitors.names
+    devices = new_monitors.devices
+    [SW1_ID, SW2_ID, OR1_ID] = names.lookup(["Sw1", "Sw2", "Or1"])
+    signal_list = [0, 0, 1, 1, 1, 0, 1, 0, 0, 0]
+    new_monitors.monitors_dictionary[(SW1_ID, None)] = signal_list
+
+    windows, names = new_monitors.query_signals([(SW1_ID, None)], 2, 8)
+    assert names == ["Sw1"]
+    [window] = windows
+    assert window.signal_list is signal_list
+    assert (len(window), list(window), window[0], window[-1]) == \
+        (6, [1, 1, 1, 0, 1, 0], 1, 0)
+    assert window[3:].tolist() == [0, 1, 0]
+    assert window[::2] == [1, 1, 1]
+    with pytest.raises(IndexError):
+        window[6]
+
+    # Windows are clamped to the cycles recorded
+    windows, names = new_monitors.query_signals(start=8, end=20)
+    assert names == ["Sw1", "Sw2", "Or1"]
+    assert [window.tolist() for window in windows] == [[0, 0], [], []]
+    assert new_monitors.query_signals([(OR1_ID, devices.Q_ID)]) is None
+
+
+@pytest.mark.parametrize("start, end, buckets, expected", [
+    (0, 10, 2, [(0, 0, 1, 1, 0), (5, 0, 1, 3, 0)]),
+    (0, 10, 3, [(0, 0, 1, 1, 0), (3, 0, 1, 1, 0), (6, 0, 1, 2, 0)]),
+    (2, 8, 1, [(2, 0, 1, 3, 0)]),
+    (2, 5, 10, [(2, 1, 1, 0, 0), (3, 1, 1, 0, 0), (4, 1, 1, 0, 0)]),
+    (4, 4, 5, []),
+    # The blank cycles before the monitor was made are counted apart
+    (10, 16, 2, [(10, None, None, 0, 3), (13, 0, 1, 2, 1)]),
+    # Rising and falling signals are read as the levels they change to
+    (16, 20, 1, [(16, 0, 1, 3, 0)]),
+])
+def test_query_signals_in_buckets(new_monitors, start, end, buckets,
+                                  expected):
+    """Test if query_signals summarises windows in buckets."""
+    [SW1_ID] = new_monitors.names.lookup(["Sw1"])
+    new_monitors.monitors_dictionary[(SW1_ID, None)] = \
+        [0, 0, 1, 1, 1, 0, 1, 0, 0, 0] + [4, 4, 4, 4, 0, 1] + [1, 3, 0, 2]
+    [summary], _ = new_monitors.query_signals([(SW1_ID, None)], start, end,
+                                              buckets)
+    assert summary == expected
+
+
+@pytest.mark.parametrize("options, expected", [
+    ({}, ["Sw1: __/--\\-- _", "Sw2: __________"]),
+    ({"start": 2, "end": 7}, ["Sw1: /--\\-", "Sw2: _____"]),
+    ({"width": 4}, ["Sw1: __/-", "Sw2: ____", "", "Sw1: -\\--",
+                    "Sw2: ____", "", "Sw1:  _", "Sw2: __"]),
+    ({"min_run": 3}, ["Sw1: __/--\\-- _", "Sw2: _x10"]),
+    ({"min_run": 2, "width": 6}, ["Sw1: _x2/-x2\\", "Sw2: _x6", "",
+                                  "Sw1: -x2 _", "Sw2: _x4"]),
+])
+def test_display_signals_options(capsys, new_monitors, options, expected):
+    """Test if display_signals windows, wraps and shortens the traces."""
+    names = new_monitors.names
+    [SW1_ID, SW2_ID, OR1_ID] = names.lookup(["Sw1", "Sw2", "Or1"])
+    new_monitors.remove_monitor(OR1_ID, None)
+    new_monitors.monitors_dictionary[(SW1_ID, None)] = \
+        [0, 0, 2, 1, 1, 3, 1, 1, 4, 0]
+    new_monitors.monitors_dictionary[(SW2_ID, None)] = [0] * 10
+
+    new_monitors.display_signals(**options)
+    out, _ = capsys.readouterr()
+    assert out.split("\n") == expected + [""]
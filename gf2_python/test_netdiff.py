@@ -0,0 +1,150 @@
+"""Test the netdiff module."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import Scanner
+from parse import Parser
+from netdiff import NetworkDiff
+
+
+ORIGINAL = """DEVICES {
+clock: CLOCK, period 1;
+s0: SWITCH, initial 1;
+s1: SWITCH, initial 0;
+acc: REG, width 2;
+mix: BXOR, width 2;
+low: AND, inputs 2;
+dtype: DTYPE;
+}
+CONNECT{
+clock = acc.CLK;
+s0 = mix.I1[0];
+s1 = mix.I1[1];
+acc.Q = mix.I2;
+mix = acc.DATA;
+acc.Q[0] = low.I1;
+acc.Q[1] = low.I2;
+clock = dtype.CLK;
+s0 = dtype.SET;
+s1 = dtype.CLEAR;
+low = dtype.DATA;
+}
+MONITOR{
+acc.Q[0];
+low;
+dtype.Q;
+}
+END
+"""
+
+CHANGED = """DEVICES {
+clock: CLOCK, period 1;
+s0: SWITCH, initial 1;
+s2: SWITCH, initial 1;
+acc: REG, width 2;
+mix: BXOR, width 2;
+low: OR, inputs 2;
+dtype: DTYPE;
+}
+CONNECT{
+clock = acc.CLK;
+s0 = mix.I1[0];
+s2 = mix.I1[1];
+acc.Q = mix.I2;
+mix = acc.DATA;
+acc.Q[0] = low.I1;
+acc.Q[1] = low.I2;
+clock = dtype.CLK;
+s0 = dtype.SET;
+s2 = dtype.CLEAR;
+acc.Q[1] = dtype.DATA;
+}
+MONITOR{
+acc.Q[0];
+low;
+s2;
+}
+END
+"""
+
+
+def load_network(path):
+    """Parse the definition file at path and return the network objects."""
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    scanner = Scanner(str(path), names)
+    parser = Parser(names, devices, network, monitors, scanner)
+    assert parser.parse_network()
+    return [names, devices, network, monitors]
+
+
+@pytest.fixture
+def networks(tmp_path):
+    """Return the loaded and changed networks."""
+    original_path = tmp_path / "original.txt"
+    original_path.write_text(ORIGINAL)
+    changed_path = tmp_path / "changed.txt"
+    changed_path.write_text(CHANGED)
+    return [load_network(original_path), load_network(changed_path)]
+
+
+def test_same_network_is_empty(tmp_path):
+    """Test that a file diffed against itself has no differences."""
+    path = tmp_path / "original.txt"
+    path.write_text(ORIGINAL)
+    diff = NetworkDiff(*load_network(path), *load_network(path))
+    assert diff.is_empty()
+
+
+def test_find_differences(networks):
+    """Test that added, removed and changed parts are found."""
+    [loaded, new] = networks
+    diff = NetworkDiff(*loaded, *new)
+
+    assert diff.added_devices == ["s2"]
+    assert diff.removed_devices == ["s1"]
+    assert diff.changed_devices == ["low"]
+    changed_inputs = [(device_name, input_name) for
+                      (device_name, input_name, drivers) in
+                      diff.changed_inputs]
+    assert sorted(changed_inputs) == [("dtype", "CLEAR"), ("dtype", "DATA"),
+                                      ("low", "I1"), ("low", "I2"),
+                                      ("mix", "I1")]
+    assert diff.removed_monitors == ["low", "dtype.Q"]
+    assert diff.added_monitors == ["low", "s2"]
+
+
+def test_apply(networks):
+    """Test that applying the differences keeps the unchanged state."""
+    [loaded, new] = networks
+    [names, devices, network, monitors] = loaded
+    for cycle in range(3):
+        assert network.execute_network()
+        monitors.record_signals()
+
+    [acc_id, s0_id] = names.lookup(["acc", "s0"])
+    acc_memory = devices.get_device(acc_id).dtype_memory
+    devices.set_switch(s0_id, 0)  # the user's switch setting is kept
+    [q_id] = names.lookup(["Q"])
+    q_trace = list(monitors.monitors_dictionary[
+        (acc_id, devices.make_bit_port(q_id, 0))])
+
+    NetworkDiff(*loaded, *new).apply(cycles_completed=3)
+
+    assert devices.get_device(acc_id).dtype_memory == acc_memory
+    assert devices.get_device(s0_id).switch_state == 0
+    assert names.query("s1") not in devices.find_devices()
+    assert network.check_network()
+
+    signals, signal_names = monitors.get_signals()
+    assert signal_names == ["acc.Q[0]", "low", "s2"]
+    assert signals == [q_trace, [4, 4, 4], [4, 4, 4]]
+
+    # The reloaded network now matches the new file
+    assert NetworkDiff(*loaded, *new).is_empty()
+    assert network.execute_network()
@@ -1,9 +1,15 @@
 """Test the network module."""
+import random
+
 import pytest
 
 from names import Names
 from devices import Devices
 from network import Network
+from monitors import Monitors
+from scanner import Scanner
+from parse import Parser
+from generator import CircuitGenerator
 
 
 @pytest.fixture
@@ -256,6 +262,79 @@ def test_execute_non_xor_gates(new_network, gate_id, switch_outputs,
     assert network.get_output_signal(gate_id, None) == eval(gate_output)
 
 
+@pytest.mark.parametrize("gate_kind, no_of_inputs", [
+    ("AND", 16), ("OR", 16), ("NAND", 16), ("NOR", 16), ("XOR", 2),
+    ("AND", 1), ("NOR", 3),
+])
+def test_execute_gates_matches_execute_gate(new_network, gate_kind,
+                                            no_of_inputs):
+    """Test that truth-table gates give the same outputs as execute_gate."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    random.seed(no_of_inputs)
+
+    [G1] = names.lookup(["G1"])
+    device_kind = getattr(devices, gate_kind)
+    if device_kind == devices.XOR:
+        devices.make_device(G1, device_kind)
+    else:
+        devices.make_device(G1, device_kind, [no_of_inputs])
+    switch_ids = names.lookup(["Sw" + str(i) for i in range(no_of_inputs)])
+    for i, switch_id in enumerate(switch_ids):
+        devices.make_device(switch_id, devices.SWITCH, [0])
+        [input_id] = names.lookup(["I" + str(i + 1)])
+        network.make_connection(switch_id, None, G1, input_id)
+    [(_, _, drivers, table, x, y)] = network.compile_gates()
+    assert drivers is not None
+    assert network.get_truth_table(device_kind, no_of_inputs) is table
+
+    gate = devices.get_device(G1)
+    signals = [devices.LOW, devices.HIGH, devices.RISING, devices.FALLING]
+    for trial in range(200):
+        # Mostly inputs at the same signal, so that every output is seen
+        common_signal = random.choice(signals)
+        for switch_id in switch_ids:
+            if random.random() < 0.9:
+                signal = common_signal
+            else:
+                signal = random.choice(signals)
+            devices.get_device(switch_id).outputs[None] = signal
+        output_signal = random.choice(signals)
+
+        gate.outputs[None] = output_signal
+        assert network.execute_gate(G1, x, y)
+        expected_signal = gate.outputs[None]
+
+        # Only the gate itself sets its output, which its input word
+        # memo relies on
+        gate.outputs[None] = output_signal
+        network.gate_words.clear()
+        assert network.execute_gates()
+        assert gate.outputs[None] == expected_signal
+
+
+def test_execute_gates_skips_unchanged_words(new_network):
+    """Test that a settled gate whose inputs are unchanged is skipped."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+
+    [SW1, G1, I1] = names.lookup(["Sw1", "G1", "I1"])
+    devices.make_device(SW1, devices.SWITCH, [1])
+    devices.make_device(G1, devices.NAND, [1])
+    network.make_connection(SW1, None, G1, I1)
+    assert network.execute_network()
+    assert network.get_output_signal(G1, None) == devices.LOW
+    assert network.gate_words == {G1: 1}
+
+    # A changed input word updates the gate again
+    devices.set_switch(SW1, 0)
+    assert network.execute_network()
+    assert network.get_output_signal(G1, None) == devices.HIGH
+    assert network.gate_words == {G1: 0}
+
+
 def test_execute_non_gates(new_network):
     """Test if execute_network returns the correct output for non-gate devices.
 
@@ -377,3 +456,323 @@ def test_oscillating_network(new_network):
     network.make_connection(NOR1, None, NOR1, I1)
 
     assert not network.execute_network()
+
+
+@pytest.mark.parametrize("gate_kind, output_word", [
+    ("devices.BAND", 0b1000),
+    ("devices.BOR", 0b1110),
+    ("devices.BNAND", 0b0111),
+    ("devices.BNOR", 0b0001),
+    ("devices.BXOR", 0b0110),
+])
+def test_execute_bus_gates(new_network, gate_kind, output_word):
+    """Test if execute_network evaluates bus gates as whole words."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+
+    [G1_ID, SW1_ID, SW2_ID, SW3_ID, SW4_ID, I1,
+     I2] = names.lookup(["G1", "Sw1", "Sw2", "Sw3", "Sw4", "I1", "I2"])
+
+    # Make devices: Sw1 and Sw2 drive I1 = 1100, Sw3 and Sw4 drive I2 = 1010
+    devices.make_device(G1_ID, eval(gate_kind), [4])
+    for switch_id, state in [(SW1_ID, 0), (SW2_ID, 1), (SW3_ID, 0),
+                             (SW4_ID, 1)]:
+        devices.make_device(switch_id, devices.SWITCH, [state])
+
+    # Make connections
+    network.make_bus_connection(SW1_ID, None, [0, 1], G1_ID, I1, [0, 2])
+    assert network.make_bus_connection(SW1_ID, None, None, G1_ID, I1,
+                                       [0, 2]) == network.WIDTH_MISMATCH
+    assert network.make_bus_connection(SW1_ID, None, None, G1_ID, I1,
+                                       [0, 5]) == network.BAD_SLICE
+    network.make_bus_connection(SW1_ID, None, None, G1_ID, I1, [0, 1])
+    network.make_bus_connection(SW1_ID, None, None, G1_ID, I1, [1, 2])
+    assert not network.check_network()
+    network.make_bus_connection(SW2_ID, None, None, G1_ID, I1, [2, 3])
+    network.make_bus_connection(SW2_ID, None, None, G1_ID, I1, [3, 4])
+    assert network.make_bus_connection(
+        SW2_ID, None, None, G1_ID, I1, [3, 4]) == network.INPUT_CONNECTED
+    network.make_bus_connection(SW3_ID, None, None, G1_ID, I2, [0, 1])
+    network.make_bus_connection(SW4_ID, None, None, G1_ID, I2, [1, 2])
+    network.make_bus_connection(SW3_ID, None, None, G1_ID, I2, [2, 3])
+    network.make_bus_connection(SW4_ID, None, None, G1_ID, I2, [3, 4])
+    assert network.check_network()
+
+    assert network.execute_network()
+    assert network.get_output_word(G1_ID, None) == output_word
+
+    # A single bit of the bus output reads as a signal
+    bit_port_id = devices.make_bit_port(None, 3)
+    assert network.get_output_signal(G1_ID, bit_port_id) == \
+        [devices.LOW, devices.HIGH][output_word >> 3]
+
+
+def test_execute_register(new_network):
+    """Test if execute_network stores a bus word on a rising clock edge."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+
+    [REG1_ID, REG2_ID, SW1_ID, CLK_ID, DATA_ID, Q_ID,
+     I1] = names.lookup(["Reg1", "Reg2", "Sw1", "CLK", "DATA", "Q", "I1"])
+
+    # Reg2 shifts the low two bits of Reg1 up by one bit
+    devices.make_device(REG1_ID, devices.REG, [2])
+    devices.make_device(REG2_ID, devices.REG, [3])
+    devices.make_device(SW1_ID, devices.SWITCH, [0])
+    network.make_connection(SW1_ID, None, REG1_ID, CLK_ID)
+    network.make_connection(SW1_ID, None, REG2_ID, CLK_ID)
+    network.make_bus_connection(SW1_ID, None, None, REG1_ID, DATA_ID, [0, 1])
+    network.make_bus_connection(REG1_ID, Q_ID, [0, 1], REG1_ID, DATA_ID,
+                                [1, 2])
+    network.make_bus_connection(SW1_ID, None, None, REG2_ID, DATA_ID, [0, 1])
+    network.make_bus_connection(REG1_ID, Q_ID, None, REG2_ID, DATA_ID,
+                                [1, 3])
+    assert network.check_network()
+
+    devices.get_device(REG1_ID).dtype_memory = 0b01
+    devices.get_device(REG2_ID).dtype_memory = 0b000
+    assert network.execute_network()
+    assert network.get_output_word(REG1_ID, Q_ID) == 0b01
+
+    # Rising edge of the clock stores DATA
+    devices.set_switch(SW1_ID, devices.HIGH)
+    assert network.execute_network()
+    assert network.get_output_word(REG1_ID, Q_ID) == 0b10
+    assert network.get_output_word(REG2_ID, Q_ID) == 0b010
+
+
+def test_get_fan_in(new_network):
+    """Test if get_fan_in follows connections back through buses."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+
+    [SW1_ID, SW2_ID, SW3_ID, G1_ID, G2_ID, REG1_ID, CLK_ID, DATA_ID,
+     I1, I2] = names.lookup(["Sw1", "Sw2", "Sw3", "G1", "G2", "Reg1", "CLK",
+                             "DATA", "I1", "I2"])
+    devices.make_device(SW1_ID, devices.SWITCH, [0])
+    devices.make_device(SW2_ID, devices.SWITCH, [0])
+    devices.make_device(SW3_ID, devices.SWITCH, [0])
+    devices.make_device(G1_ID, devices.AND, [2])
+    devices.make_device(G2_ID, devices.NOR, [1])
+    devices.make_device(REG1_ID, devices.REG, [1])
+    network.make_connection(SW1_ID, None, G1_ID, I1)
+    network.make_connection(SW2_ID, None, G1_ID, I2)
+    network.make_connection(G1_ID, None, REG1_ID, CLK_ID)
+    network.make_bus_connection(SW3_ID, None, None, REG1_ID, DATA_ID, None)
+    network.make_connection(SW1_ID, None, G2_ID, I1)
+
+    assert network.get_fan_in([G1_ID]) == {G1_ID, SW1_ID, SW2_ID}
+    assert network.get_fan_in([REG1_ID]) == {REG1_ID, G1_ID, SW1_ID, SW2_ID,
+                                             SW3_ID}
+    assert network.get_fan_in([G2_ID, SW3_ID]) == {G2_ID, SW1_ID, SW3_ID}
+
+
+def test_fold_fixed_switches(new_network):
+    """Test if gates decided by fixed switches are folded."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+
+    [SW1_ID, SW2_ID, SW3_ID, G1_ID, G2_ID, G3_ID, G4_ID, I1,
+     I2] = names.lookup(["Sw1", "Sw2", "Sw3", "G1", "G2", "G3", "G4", "I1",
+                         "I2"])
+    devices.make_device(SW1_ID, devices.SWITCH, [0])
+    devices.make_device(SW2_ID, devices.SWITCH, [0])
+    devices.make_device(SW3_ID, devices.SWITCH, [1])
+    devices.make_device(G1_ID, devices.AND, [2])
+    devices.make_device(G2_ID, devices.NAND, [2])
+    devices.make_device(G3_ID, devices.OR, [2])
+    devices.make_device(G4_ID, devices.XOR)
+    network.make_connection(SW1_ID, None, G1_ID, I1)
+    network.make_connection(SW2_ID, None, G1_ID, I2)
+    network.make_connection(SW3_ID, None, G2_ID, I1)
+    network.make_connection(SW2_ID, None, G2_ID, I2)
+    network.make_connection(G1_ID, None, G3_ID, I1)
+    network.make_connection(SW2_ID, None, G3_ID, I2)
+    network.make_connection(SW3_ID, None, G4_ID, I1)
+    network.make_connection(G1_ID, None, G4_ID, I2)
+
+    devices.fix_switches([SW1_ID, SW3_ID])
+    assert network.get_constant_signals() == {
+        (SW1_ID, None): devices.LOW, (SW3_ID, None): devices.HIGH,
+        (G1_ID, None): devices.LOW, (G4_ID, None): devices.HIGH}
+    drivers = {device_id: gate_drivers for (device_id, outputs, gate_drivers,
+                                            table, x, y)
+               in network.compile_gates()}
+    assert drivers[G1_ID] == drivers[G4_ID] == []
+    assert len(drivers[G2_ID]) == len(drivers[G3_ID]) == 1
+
+    gate_ids = [G1_ID, G2_ID, G3_ID, G4_ID]
+    for sw2, outputs in [(0, [0, 1, 0, 1]), (1, [0, 0, 1, 1])]:
+        devices.set_switch(SW2_ID, sw2)
+        assert network.execute_network()
+        assert [network.get_output_signal(device_id, None)
+                for device_id in gate_ids] == outputs
+
+    # Changing a fixed switch unfolds the gates it decides
+    devices.set_switch(SW1_ID, devices.HIGH)
+    assert devices.fixed_switches == {SW3_ID}
+    assert network.execute_network()
+    assert [network.get_output_signal(device_id, None)
+            for device_id in gate_ids] == [1, 0, 1, 0]
+
+
+def test_merge_duplicate_gates(new_network):
+    """Test if gates of the same kind reading the same outputs are merged."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+
+    [SW1_ID, SW2_ID, A1_ID, A2_ID, A3_ID, O1_ID, O2_ID, N1_ID, I1, I2,
+     I3] = names.lookup(["Sw1", "Sw2", "A1", "A2", "A3", "O1", "O2", "N1",
+                         "I1", "I2", "I3"])
+    devices.make_device(SW1_ID, devices.SWITCH, [0])
+    devices.make_device(SW2_ID, devices.SWITCH, [1])
+    for device_id in [A1_ID, A2_ID]:
+        devices.make_device(device_id, devices.AND, [2])
+    devices.make_device(A3_ID, devices.AND, [3])
+    for device_id in [O1_ID, O2_ID]:
+        devices.make_device(device_id, devices.OR, [2])
+    devices.make_device(N1_ID, devices.NAND, [2])
+    # A2 reads its inputs the other way round, and A3 reads Sw1 twice
+    for (first_id, second_id, third_id, device_id) in [
+            (SW1_ID, SW2_ID, None, A1_ID), (SW2_ID, SW1_ID, None, A2_ID),
+            (SW1_ID, SW2_ID, SW1_ID, A3_ID), (A1_ID, SW2_ID, None, O1_ID),
+            (SW2_ID, A2_ID, None, O2_ID), (SW1_ID, SW2_ID, None, N1_ID)]:
+        network.make_connection(first_id, None, device_id, I1)
+        network.make_connection(second_id, None, device_id, I2)
+        if third_id is not None:
+            network.make_connection(third_id, None, device_id, I3)
+
+    compiled_ids = [gate[0] for gate in network.compile_gates()]
+    assert compiled_ids == [A1_ID, O1_ID, N1_ID]
+    assert [device.device_id for device in network.merged_devices] == \
+        [A2_ID, A3_ID, O2_ID]
+
+    for sw1, outputs in [(1, [1, 1, 1, 1, 1, 0]), (0, [0, 0, 0, 1, 1, 1])]:
+        devices.set_switch(SW1_ID, sw1)
+        assert network.execute_network()
+        assert [network.get_output_signal(device_id, None) for device_id in
+                [A1_ID, A2_ID, A3_ID, O1_ID, O2_ID, N1_ID]] == outputs
+    assert devices.get_signal_name(A2_ID, None) == "A2"
+
+    # Merged gates have outputs of their own again once recompiled
+    network.set_active_devices([SW1_ID, SW2_ID, A2_ID, A3_ID])
+    network.compile_gates()
+    assert devices.get_device(A2_ID).outputs is not \
+        devices.get_device(A1_ID).outputs
+    assert devices.get_device(A3_ID).outputs is \
+        devices.get_device(A2_ID).outputs
+
+
+RIPPLE_COUNTER = """DEVICES {
+clk: CLOCK, period 2;
+sw: SWITCH, initial 0;
+zero: SWITCH, initial 0;
+d0: DTYPE;
+d1: DTYPE;
+d2: DTYPE;
+d3: DTYPE;
+d4: DTYPE;
+g: NAND, inputs 2;
+}
+CONNECT {
+clk = d0.CLK;
+d0.QBAR = d0.DATA;
+d0.QBAR = d1.CLK;
+d1.QBAR = d1.DATA;
+g = d2.CLK;
+d1.Q = d2.DATA;
+sw = d0.SET;
+zero = d0.CLEAR;
+zero = d1.SET;
+sw = d1.CLEAR;
+sw = d2.SET;
+zero = d2.CLEAR;
+clk = g.I1;
+d1.Q = g.I2;
+clk = d3.CLK;
+d2.Q = d3.DATA;
+sw = d3.SET;
+zero = d3.CLEAR;
+clk = d4.CLK;
+d3.QBAR = d4.DATA;
+sw = d4.SET;
+zero = d4.CLEAR;
+}
+MONITOR { d2.Q; d4.Q; }
+END
+"""
+
+
+@pytest.mark.parametrize("make, seed", [
+    (lambda: CircuitGenerator(0, 6).make_shift_register(8), 0),
+    (lambda: CircuitGenerator(0).make_ring_counter(5), 1),
+    (lambda: RIPPLE_COUNTER, 2),
+    (lambda: RIPPLE_COUNTER, 3),
+])
+def test_execute_d_types_matches_execute_d_type(tmp_path, make, seed):
+    """Test that grouped D-types give the same signals as execute_d_type."""
+    path = tmp_path / "definition.txt"
+    path.write_text(make())
+    states = []
+    for (grouped, bank_size) in [(True, 1), (True, None), (False, None)]:
+        if bank_size is not None:
+            pytest.importorskip("numpy")
+        random.seed(seed)
+        names = Names()
+        devices = Devices(names)
+        network = Network(names, devices)
+        monitors = Monitors(names, devices, network)
+        assert Parser(names, devices, network, monitors,
+                      Scanner(str(path), names)).parse_network()
+        network.bank_size = bank_size
+        if not grouped:
+            network.execute_d_types = lambda: all([
+                network.execute_d_type(device_id) for device_id in
+                network.get_schedule()[devices.D_TYPE]])
+
+        switch_ids = devices.find_devices(devices.SWITCH)
+        cycle_states = []
+        for cycle in range(80):
+            if switch_ids and random.random() < 0.2:
+                devices.set_switch(random.choice(switch_ids),
+                                   random.choice([0, 1]))
+            if cycle == 40:
+                devices.cold_startup()
+            cycle_states.append((network.execute_network(), [
+                (dict(device.outputs), device.dtype_memory)
+                for device in devices.devices_list]))
+        states.append(cycle_states)
+    assert states[0] == states[1] == states[2]
+
+
+def test_compile_d_types_banks(tmp_path):
+    """Test which D-types are executed together in banks."""
+    pytest.importorskip("numpy")
+    path = tmp_path / "definition.txt"
+    path.write_text(RIPPLE_COUNTER)
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    assert Parser(names, devices, network, monitors,
+                  Scanner(str(path), names)).parse_network()
+    [d0, d1, d2, d3, d4] = names.lookup(["d0", "d1", "d2", "d3", "d4"])
+
+    network.bank_size = 1
+    (groups, members, d_types) = network.compile_d_types()
+    # d0 drives the CLK of d1, and d2 is clocked by a gate
+    [banked_group] = [group for group in groups if group.bank is not None]
+    assert [device.device_id for device in banked_group.bank.devices] == \
+        [d3, d4]
+    assert [members[index][0].device_id for index in
+            banked_group.members] == [d0]
+    assert [members[index][0].device_id for index in d_types] == [d1]
+
+    network.bank_size = 3
+    (groups, members, d_types) = network.compile_d_types()
+    assert all(group.bank is None for group in groups)
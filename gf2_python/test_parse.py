@@ -7,6 +7,7 @@ from scanner import Scanner
 from monitors import Monitors
 from devices import Devices
 from network import Network
+from library import LibraryCache
 
 
 @pytest.fixture
@@ -234,3 +235,76 @@ def test_monitors(names, devices, network, monitors, file_list, monitor_num,
     else:
         assert(list(monitors.monitors_dictionary.items())[monitor_num][0][0] ==
                names.query(monitor_name))
+
+
+def test_include(names, devices, network, monitors):
+    """Tests whether devices from included files are added to the network."""
+    scanner = Scanner("parse_test_files/Include.txt", names)
+    parse = Parser(names, devices, network, monitors, scanner)
+    assert parse.parse_network() is True
+
+    # Devices from the library and the library it includes are present
+    [SUM_ID, CARRY_ID, A_ID, I1] = names.lookup(["sum", "carry", "a", "I1"])
+    assert devices.get_device(SUM_ID).device_kind == devices.XOR
+    assert devices.get_device(CARRY_ID).device_kind == devices.AND
+    assert network.get_connected_output(CARRY_ID, I1) == (A_ID, None)
+    assert network.check_network()
+
+
+def test_include_cache(file_list):
+    """Tests whether unchanged included files are only parsed once."""
+    library_cache = LibraryCache()
+    for _ in range(3):
+        names = Names()
+        devices = Devices(names)
+        network = Network(names, devices)
+        monitors = Monitors(names, devices, network)
+        scanner = Scanner("parse_test_files/Include.txt", names)
+        parse = Parser(names, devices, network, monitors, scanner,
+                       library_cache)
+        assert parse.parse_network() is True
+
+    # Both library files are parsed on the first load only
+    assert library_cache.misses == 2
+    assert library_cache.hits == 5
+    assert len(library_cache.libraries) == 2
+
+
+@pytest.mark.parametrize("path,expected_msg", [
+    ("parse_test_files/IncludeError.txt",
+     "Included file does not exist or is not a '.txt' file"),
+    ("parse_test_files/include/Cycle.txt", "File includes itself"),
+])
+def test_include_errors(names, devices, network, monitors, path,
+                        expected_msg):
+    """Tests whether bad include directives are reported."""
+    scanner = Scanner(path, names)
+    parse = Parser(names, devices, network, monitors, scanner)
+    assert parse.parse_network() is False
+    assert scanner.error_list[0].msg == expected_msg
+    assert scanner.error_list[0].line_num == "Line 1:"
+
+
+def test_bus_connections(names, devices, network, monitors):
+    """Tests whether bus connections and bit monitors are parsed."""
+    scanner = Scanner("parse_test_files/Bus.txt", names)
+    parse = Parser(names, devices, network, monitors, scanner)
+    assert parse.parse_network() is True
+
+    [ACC_ID, MIX_ID, S2_ID, DATA_ID, I1] = names.lookup(["acc", "mix", "s2",
+                                                         "DATA", "I1"])
+    mix = devices.get_device(MIX_ID)
+    assert (2, 1, S2_ID, None, 0) in mix.bus_inputs[I1]
+    assert devices.get_device(ACC_ID).bus_inputs[DATA_ID] == [
+        (0, 4, MIX_ID, None, 0)]
+    assert monitors.get_signal_names()[0] == ["acc.Q[0]", "acc.Q[3]",
+                                              "mix[2]", "low"]
+
+
+def test_bus_errors(names, devices, network, monitors):
+    """Tests whether mismatched bus widths are reported."""
+    scanner = Scanner("parse_test_files/BusError.txt", names)
+    parse = Parser(names, devices, network, monitors, scanner)
+    assert parse.parse_network() is False
+    assert scanner.error_list[0].msg == "Connected bus widths differ"
+    assert scanner.error_list[0].line_num == "Line 9:"
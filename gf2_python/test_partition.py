@@ -0,0 +1,179 @@
+"""Test the partition module."""
+import random
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import Scanner
+from parse import Parser
+from partition import Partitioner, ParallelNetwork
+
+
+def make_blocks(blocks, gates):
+    """Return a network of blocks of gates, with one link between blocks.
+
+    Each block is a chain of NAND gates fed back by a D-type clocked by the
+    block's own clock, and the first gate of each block also reads a
+    switch and the last gate of the block before.
+    """
+    random.seed(0)
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    [I1, I2] = names.lookup(["I1", "I2"])
+    [SW] = names.lookup(["sw"])
+    devices.make_device(SW, devices.SWITCH, [0])
+
+    last_gates = []
+    for block in range(blocks):
+        prefix = "".join(["b", str(block), "_"])
+        [CLK, D] = names.lookup([prefix + "clk", prefix + "d"])
+        devices.make_device(CLK, devices.CLOCK, [block + 1])
+        devices.make_device(D, devices.D_TYPE)
+        gate_ids = names.lookup([prefix + "g" + str(gate) for gate in
+                                 range(gates)])
+        for gate_id in gate_ids:
+            devices.make_device(gate_id, devices.NAND, [2])
+        network.make_connection(D, devices.Q_ID, gate_ids[0], I1)
+        for previous_id, gate_id in zip(gate_ids, gate_ids[1:]):
+            network.make_connection(previous_id, None, gate_id, I1)
+            network.make_connection(D, devices.QBAR_ID, gate_id, I2)
+        network.make_connection(CLK, None, D, devices.CLK_ID)
+        network.make_connection(gate_ids[-1], None, D, devices.DATA_ID)
+        network.make_connection(SW, None, D, devices.SET_ID)
+        network.make_connection(SW, None, D, devices.CLEAR_ID)
+        last_gates.append(gate_ids[-1])
+
+    # Link each block to the one before
+    for block in range(blocks):
+        [first_gate] = names.lookup(["b" + str(block) + "_g0"])
+        network.make_connection(last_gates[block - 1], None, first_gate, I2)
+    return names, devices, network
+
+
+def test_partition_cuts_links():
+    """Test that the partitions follow the loosely coupled blocks."""
+    names, devices, network = make_blocks(4, 30)
+    partitioner = Partitioner(names, devices, network)
+    partitions = partitioner.partition(4)
+
+    assert sorted(device_id for partition in partitions
+                  for device_id in partition) == \
+        sorted(device.device_id for device in devices.devices_list)
+    assert max(len(partition) for partition in partitions) <= 36
+    # The four links between blocks and the switch's connections to the
+    # D-types in other partitions
+    assert partitioner.get_cut_connections(partitions) <= 4 + 3 * 2
+    assert partitioner.get_cut_connections([[
+        device_id for partition in partitions
+        for device_id in partition]]) == 0
+
+
+@pytest.mark.parametrize("parts", [1, 3])
+def test_parallel_network_matches_network(parts):
+    """Test that simulating in parallel gives the same signals."""
+    outputs = []
+    for parallel in [False, True]:
+        names, devices, network = make_blocks(3, 20)
+        monitors = Monitors(names, devices, network)
+        for device in devices.devices_list:
+            for output_id in device.outputs:
+                monitors.make_monitor(device.device_id, output_id)
+        [SW] = names.lookup(["sw"])
+        if parallel:
+            partitions = Partitioner(names, devices,
+                                     network).partition(parts)
+            simulator = ParallelNetwork(names, devices, network, partitions)
+            simulator.start()
+        else:
+            simulator = network
+        try:
+            for cycle in range(30):
+                devices.set_switch(SW, int(cycle in [10, 11]))
+                assert simulator.execute_network()
+                monitors.record_signals()
+        finally:
+            if parallel:
+                simulator.stop()
+        outputs.append(monitors.get_signals())
+    assert outputs[0] == outputs[1]
+
+
+def test_parallel_network_example_circuit():
+    """Test simulating an example circuit in parallel."""
+    traces = []
+    for parts in [None, 2]:
+        random.seed(1)
+        names = Names()
+        devices = Devices(names)
+        network = Network(names, devices)
+        monitors = Monitors(names, devices, network)
+        parser = Parser(names, devices, network, monitors, Scanner(
+            "FINAL_example_circuits/FINAL_test_file2_shift_register.txt",
+            names))
+        assert parser.parse_network()
+        simulator = network
+        if parts is not None:
+            partitions = Partitioner(names, devices,
+                                     network).partition(parts)
+            simulator = ParallelNetwork(names, devices, network, partitions)
+            simulator.start()
+        try:
+            for cycle in range(40):
+                assert simulator.execute_network()
+                monitors.record_signals()
+        finally:
+            if parts is not None:
+                simulator.stop()
+        traces.append(monitors.get_signals())
+    assert traces[0] == traces[1]
+
+
+@pytest.mark.parametrize("parts", [2, 4])
+def test_parallel_network_latch_race(parts):
+    """Test that a latch started in a race settles to a stable state.
+
+    The cross-coupled NAND gates of the example start with equal outputs,
+    so the state they settle to depends on the order they see their inputs
+    change in, and may differ from the network's until the clock is first
+    HIGH and resets the latch.
+    """
+    for seed in range(4):
+        traces = []
+        for parallel in [False, True]:
+            random.seed(seed)
+            names = Names()
+            devices = Devices(names)
+            network = Network(names, devices)
+            monitors = Monitors(names, devices, network)
+            parser = Parser(names, devices, network, monitors, Scanner(
+                "FINAL_example_circuits/FINAL_test_file4_dtype.txt", names))
+            assert parser.parse_network()
+            [CLOCK] = names.lookup(["clock"])
+            assert monitors.make_monitor(CLOCK, None) == monitors.NO_ERROR
+            simulator = network
+            if parallel:
+                partitions = Partitioner(names, devices,
+                                         network).partition(parts)
+                simulator = ParallelNetwork(names, devices, network,
+                                            partitions)
+                simulator.start()
+            try:
+                for cycle in range(20):
+                    assert simulator.execute_network()
+                    monitors.record_signals()
+            finally:
+                if parallel:
+                    simulator.stop()
+            [[nand3, nand4, clock], signal_names] = monitors.get_signals()
+            assert signal_names == ["nand3", "nand4", "clock"]
+            # The outputs of the latch are always opposite
+            assert all(signal != other for signal, other in
+                       zip(nand3, nand4))
+            traces.append((nand3, nand4, clock))
+        reset = traces[0][2].index(devices.HIGH)
+        assert [trace[reset:] for trace in traces[0]] == \
+            [trace[reset:] for trace in traces[1]]
@@ -0,0 +1,121 @@
+"""Test the pool module."""
+import shutil
+
+from pool import SessionPool
+
+
+PATH = "FINAL_example_circuits/FINAL_test_file2_shift_register.txt"
+
+
+def run(network_objects, cycles):
+    """Run the network from its current state and return the traces."""
+    [names, devices, network, monitors] = network_objects
+    for _ in range(cycles):
+        assert network.execute_network()
+        monitors.record_signals()
+    return monitors.get_signals()
+
+
+def test_load_copies_snapshot():
+    """Test that a file loaded again is copied rather than parsed."""
+    pool = SessionPool()
+    first, errors = pool.load(PATH)
+    assert errors == []
+    second, errors = pool.load(PATH)
+    assert errors == []
+    assert (pool.hits, pool.misses) == (1, 1)
+
+    # The copies start from the same state but are independent
+    assert second[1] is not first[1]
+    [SWITCH2] = second[0].lookup(["switch2"])
+    second[1].set_switch(SWITCH2, 1)
+    third, errors = pool.load(PATH)
+    assert run(first, 20) == run(third, 20)
+    assert run(second, 20) != run(third, 20)
+
+    report = pool.get_report()
+    assert report.startswith("Loaded 3 times: 2 hits, 1 misses (66.7% hit "
+                             "rate). 1 sessions in ")
+    assert "FINAL_test_file2_shift_register.txt: " in report
+
+
+def test_least_recently_used_dropped(tmp_path):
+    """Test that the pool keeps within its memory limit."""
+    paths = []
+    for index in range(3):
+        path = tmp_path / "circuit{}.txt".format(index)
+        # Give each copy different contents
+        path.write_text(open(PATH).read() + "\n" * index)
+        paths.append(str(path))
+    pool = SessionPool()
+    pool.load(paths[0])
+    snapshot_bytes = pool.total_bytes
+    pool.max_bytes = 2 * snapshot_bytes + snapshot_bytes // 2
+
+    pool.load(paths[1])
+    pool.load(paths[0])  # now the most recently used
+    pool.load(paths[2])
+    assert len(pool.entries) == 2
+    assert pool.total_bytes <= pool.max_bytes
+    assert [entry[0] for entry in pool.entries.values()] == \
+        [paths[0], paths[2]]
+    pool.load(paths[1])
+    assert (pool.hits, pool.misses) == (1, 4)
+
+
+def test_changed_files_parsed_again(tmp_path):
+    """Test that changes to the file or its included files are noticed."""
+    shutil.copytree("parse_test_files/include", tmp_path / "include")
+    path = tmp_path / "Include.txt"
+    shutil.copy("parse_test_files/Include.txt", path)
+    pool = SessionPool()
+    assert pool.load(str(path))[0] is not None
+    assert pool.load(str(path))[0] is not None
+    assert (pool.hits, pool.misses) == (1, 1)
+
+    gates_path = tmp_path / "include" / "Gates.txt"
+    gates_path.write_text(gates_path.read_text().replace("AND", "NAND"))
+    network_objects, errors = pool.load(str(path))
+    [names, devices, network, monitors] = network_objects
+    [CARRY] = names.lookup(["carry"])
+    assert devices.get_device(CARRY).device_kind == devices.NAND
+    assert (pool.hits, pool.misses) == (1, 2)
+
+    path.write_text(path.read_text().replace("initial 1", "initial 0"))
+    pool.load(str(path))
+    assert (pool.hits, pool.misses) == (1, 3)
+    assert len(pool.entries) == 2
+
+
+def test_same_contents_in_other_directory(tmp_path):
+    """Test that a copy of a file includes the files beside the copy."""
+    paths = []
+    for directory in ["a", "b"]:
+        shutil.copytree("parse_test_files/include",
+                        tmp_path / directory / "include")
+        path = tmp_path / directory / "Include.txt"
+        shutil.copy("parse_test_files/Include.txt", path)
+        paths.append(str(path))
+    gates_path = tmp_path / "b" / "include" / "Gates.txt"
+    gates_path.write_text(gates_path.read_text().replace("AND", "NAND"))
+
+    pool = SessionPool()
+    device_kinds = []
+    for path in paths:
+        [names, devices, network, monitors] = pool.load(path)[0]
+        [CARRY] = names.lookup(["carry"])
+        device_kinds.append(devices.get_device(CARRY).device_kind)
+    assert device_kinds == [devices.AND, devices.NAND]
+    assert (pool.hits, pool.misses) == (0, 2)
+    assert len(pool.entries) == 2
+
+
+def test_errors_not_kept(tmp_path):
+    """Test that files with errors return their errors and are not kept."""
+    path = tmp_path / "bad.txt"
+    path.write_text("DEVICES { a: SWITCH; } END")
+    pool = SessionPool()
+    network_objects, errors = pool.load(str(path))
+    assert network_objects is None
+    assert errors
+    assert pool.entries == {}
@@ -0,0 +1,263 @@
+"""Test the scheduler module."""
+import random
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import Scanner
+from parse import Parser
+from stimulus import Stimulus
+from scheduler import Scheduler
+
+
+DEFINITION = """DEVICES {
+slow: CLOCK, period 1000;
+fast: CLOCK, period 7;
+sig: SIGGEN, sequence 0, 0, 0, 1, 1, 0, 1;
+sw: SWITCH, initial 0;
+zero: SWITCH, initial 0;
+d1: DTYPE;
+d2: DTYPE;
+g: NAND, inputs 2;
+x: XOR;
+}
+CONNECT{
+slow = d1.CLK;
+g = d1.DATA;
+zero = d1.SET;
+zero = d1.CLEAR;
+fast = d2.CLK;
+x = d2.DATA;
+zero = d2.SET;
+zero = d2.CLEAR;
+d1.Q = g.I1;
+sw = g.I2;
+sig = x.I1;
+d2.Q = x.I2;
+}
+MONITOR{
+d1.Q;
+d2.Q;
+x;
+sig;
+}
+END
+"""
+
+STIMULUS = """1500 sw=1
+1502 sw=0
+2600 sw=1
+"""
+
+
+def load_network(tmp_path, seed):
+    """Return the network objects and stimulus, started up with seed."""
+    path = tmp_path / "definition.txt"
+    path.write_text(DEFINITION)
+    stimulus_path = tmp_path / "stimulus.txt"
+    stimulus_path.write_text(STIMULUS)
+
+    random.seed(seed)
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    scanner = Scanner(str(path), names)
+    parser = Parser(names, devices, network, monitors, scanner)
+    assert parser.parse_network()
+    stimulus = Stimulus(names, devices, str(stimulus_path))
+    return [names, devices, network, monitors, stimulus]
+
+
+def get_state(devices):
+    """Return the signals, memory and counters of every device."""
+    return [(device.device_id, device.outputs, device.dtype_memory,
+             device.clock_counter, device.siggen_counter)
+            for device in devices.devices_list]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_run_matches_every_cycle(tmp_path, seed):
+    """Test that skipping cycles gives the same traces and state."""
+    cycles = 4000
+    [names, devices, network, monitors, stimulus] = load_network(tmp_path,
+                                                                 seed)
+    for cycle in range(cycles):
+        assert stimulus.apply_changes(cycle) == stimulus.NO_ERROR
+        assert network.execute_network()
+        monitors.record_signals()
+
+    [new_names, new_devices, new_network, new_monitors,
+     new_stimulus] = load_network(tmp_path, seed)
+    scheduler = Scheduler(new_names, new_devices, new_network, new_monitors,
+                          new_stimulus)
+    # Run in two parts, as when continuing a run
+    assert scheduler.run(1234) == scheduler.NO_ERROR
+    assert scheduler.run(cycles - 1234, 1234) == scheduler.NO_ERROR
+
+    assert new_monitors.get_signals() == monitors.get_signals()
+    assert get_state(new_devices) == get_state(devices)
+
+
+def test_slow_clock_skips_cycles(tmp_path):
+    """Test that a network driven by a slow clock skips most cycles."""
+    path = tmp_path / "definition.txt"
+    path.write_text("DEVICES { clk: CLOCK, period 1000; d: DTYPE;"
+                    "zero: SWITCH, initial 0; n: NOR, inputs 1; }"
+                    "CONNECT { clk = d.CLK; n = d.DATA; zero = d.SET;"
+                    "zero = d.CLEAR; d.Q = n.I1; }"
+                    "MONITOR { d.Q; } END")
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    parser = Parser(names, devices, network, monitors,
+                    Scanner(str(path), names))
+    assert parser.parse_network()
+
+    scheduler = Scheduler(names, devices, network, monitors)
+    assert scheduler.run(100000) == scheduler.NO_ERROR
+    assert scheduler.cycles_executed <= 2 * (100000 // 1000 + 1)
+    assert scheduler.cycles_executed + scheduler.cycles_skipped + \
+        scheduler.cycles_fast_forwarded == 100000
+
+    [trace], [name] = monitors.get_signals()
+    assert len(trace) == 100000
+    # The D-type toggles at every rising edge, every 2000 cycles
+    edges = [cycle for cycle in range(1, 100000)
+             if trace[cycle] != trace[cycle - 1]]
+    assert len(edges) >= 48
+    assert all(later - earlier == 2000 for earlier, later in
+               zip(edges, edges[1:]))
+
+
+@pytest.mark.parametrize("path", [
+    "FINAL_example_circuits/FINAL_test_file2_shift_register.txt",
+    "FINAL_example_circuits/FINAL_test_file4_dtype.txt",
+])
+def test_fast_forward_periodic_network(path):
+    """Test that a periodic network is fast-forwarded with the same traces."""
+    cycles = 5000
+    traces = []
+    for detect_periods in [False, True]:
+        random.seed(3)
+        names = Names()
+        devices = Devices(names)
+        network = Network(names, devices)
+        monitors = Monitors(names, devices, network)
+        parser = Parser(names, devices, network, monitors,
+                        Scanner(path, names))
+        assert parser.parse_network()
+
+        scheduler = Scheduler(names, devices, network, monitors,
+                              detect_periods=detect_periods)
+        assert scheduler.run(cycles) == scheduler.NO_ERROR
+        traces.append((monitors.get_signals(), get_state(devices)))
+
+    assert traces[0] == traces[1]
+    assert scheduler.cycles_fast_forwarded > cycles // 2
+    [(first_cycle, forwarded_cycles, period)] = scheduler.fast_forwards
+    assert forwarded_cycles % period == 0
+    assert first_cycle + forwarded_cycles > cycles - period
+    assert "Fast-forwarded cycles {} to".format(first_cycle) in \
+        scheduler.get_report()
+
+
+def test_prune_to_monitored_cone(tmp_path):
+    """Test that only devices that can affect a monitor are executed."""
+    path = tmp_path / "definition.txt"
+    path.write_text("DEVICES { clk: CLOCK, period 3; sw: SWITCH, initial 1;"
+                    "a: NAND, inputs 2; b: NOR, inputs 1; c: AND, inputs 2;"
+                    "d: OR, inputs 2; }"
+                    "CONNECT { clk = a.I1; sw = a.I2; a = b.I1;"
+                    "clk = c.I1; sw = c.I2; c = d.I1; sw = d.I2; }"
+                    "MONITOR { b; } END")
+    traces = []
+    for prune in [False, True]:
+        random.seed(0)
+        names = Names()
+        devices = Devices(names)
+        network = Network(names, devices)
+        monitors = Monitors(names, devices, network)
+        parser = Parser(names, devices, network, monitors,
+                        Scanner(str(path), names))
+        assert parser.parse_network()
+        scheduler = Scheduler(names, devices, network, monitors,
+                              prune=prune)
+        assert scheduler.run(20) == scheduler.NO_ERROR
+        traces.append(monitors.get_signals())
+    assert traces[0] == traces[1]
+
+    [C, D] = names.lookup(["c", "d"])
+    assert network.active_devices == set(names.lookup(["clk", "sw", "a",
+                                                       "b"]))
+    assert "Executed 4 of 6 devices, pruned 2 (33.3%)" in \
+        scheduler.get_report()
+
+    # The cone grows when a monitor is made
+    assert monitors.make_monitor(D, None, 20) == monitors.NO_ERROR
+    assert scheduler.run(20, 20) == scheduler.NO_ERROR
+    assert C in network.active_devices and D in network.active_devices
+    [d_trace] = [trace for trace, name in zip(*monitors.get_signals())
+                 if name == "d"]
+    assert d_trace[20:] == [devices.HIGH] * 20
+
+
+def test_prune_replays_devices_joining_cone(tmp_path):
+    """Test that a monitor made mid-run gives the traces of a full run."""
+    path = tmp_path / "definition.txt"
+    path.write_text("DEVICES { clk: CLOCK, period 1; sw: SWITCH, initial 0;"
+                    "en: SWITCH, initial 0; d1: DTYPE; inv: NAND, inputs 2; }"
+                    "CONNECT { clk = d1.CLK; d1.QBAR = d1.DATA; sw = d1.SET;"
+                    "sw = d1.CLEAR; d1.Q = inv.I1; en = inv.I2; }"
+                    "MONITOR { sw; } END")
+    stimulus_path = tmp_path / "stimulus.txt"
+    stimulus_path.write_text("3 en=1\n9 en=0\n")
+    traces = []
+    for prune in [False, True]:
+        random.seed(0)
+        names = Names()
+        devices = Devices(names)
+        network = Network(names, devices)
+        monitors = Monitors(names, devices, network)
+        parser = Parser(names, devices, network, monitors,
+                        Scanner(str(path), names))
+        assert parser.parse_network()
+        stimulus = Stimulus(names, devices, str(stimulus_path))
+        scheduler = Scheduler(names, devices, network, monitors, stimulus,
+                              prune=prune)
+        assert scheduler.run(7) == scheduler.NO_ERROR
+        [D1, INV, Q] = names.lookup(["d1", "inv", "Q"])
+        assert monitors.make_monitor(D1, Q, 7) == monitors.NO_ERROR
+        assert monitors.make_monitor(INV, None, 7) == monitors.NO_ERROR
+        assert scheduler.run(8, 7) == scheduler.NO_ERROR
+        traces.append(monitors.get_signals())
+    assert traces[0] == traces[1]
+    assert "Replayed 7 cycles" in scheduler.get_report()
+
+
+def test_report_merged_gates(tmp_path):
+    """Test that the report counts the duplicate gates merged."""
+    path = tmp_path / "definition.txt"
+    path.write_text("DEVICES { clk: CLOCK, period 2; sw: SWITCH, initial 1;"
+                    "a: NAND, inputs 2; b: NAND, inputs 2; }"
+                    "CONNECT { clk = a.I1; sw = a.I2; sw = b.I1;"
+                    "clk = b.I2; }"
+                    "MONITOR { a; b; } END")
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    parser = Parser(names, devices, network, monitors,
+                    Scanner(str(path), names))
+    assert parser.parse_network()
+
+    scheduler = Scheduler(names, devices, network, monitors)
+    assert scheduler.run(12) == scheduler.NO_ERROR
+    [[a_trace, b_trace], signal_names] = monitors.get_signals()
+    assert signal_names == ["a", "b"]
+    assert a_trace == b_trace and set(a_trace) == {0, 1}
+    assert "Merged 1 duplicate gates" in scheduler.get_report()
@@ -0,0 +1,203 @@
+"""Test the server module."""
+import asyncio
+import json
+import threading
+
+import pytest
+
+from server import SimulationServer
+
+
+PATH = "FINAL_example_circuits/FINAL_test_file2_shift_register.txt"
+
+
+class Client:
+    """Send requests to the server and collect the responses by their ID."""
+
+    def __init__(self, reader, writer):
+        """Initialise the connection and the request IDs."""
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+
+    async def request(self, command, **parameters):
+        """Send a request and return its chunks and final response."""
+        self.next_id += 1
+        request_id = self.next_id
+        parameters.update({"id": request_id, "command": command})
+        self.writer.write(json.dumps(parameters).encode("utf-8") + b"\n")
+        await self.writer.drain()
+        chunks = []
+        while True:
+            message = json.loads(await self.reader.readline())
+            assert message["id"] == request_id
+            if "chunk" in message:
+                chunks.append(message["chunk"])
+            else:
+                return chunks, message
+
+
+async def connect(path):
+    """Return a client connected to the server's Unix socket."""
+    reader, writer = await asyncio.open_unix_connection(path)
+    return Client(reader, writer)
+
+
+def run_server(tmp_path, test):
+    """Run the test coroutine against a server on a Unix socket."""
+    async def main():
+        server = SimulationServer(max_workers=4, chunk_cycles=7)
+        socket_path = str(tmp_path / "logsim.sock")
+        await server.start_unix(socket_path)
+        try:
+            await asyncio.wait_for(test(server, socket_path), 60)
+        finally:
+            await server.close()
+    asyncio.run(main())
+
+
+def test_load_run_and_fetch(tmp_path):
+    """Test loading, running and streaming the traces of a network."""
+    async def test(server, socket_path):
+        client = await connect(socket_path)
+        _, response = await client.request("load", path=PATH)
+        assert response["ok"]
+        assert response["monitors"] == ["D1.Q", "D2.Q", "D3.Q", "D4.Q"]
+        session_id = response["session"]
+
+        _, response = await client.request("run", session=session_id,
+                                           cycles=20)
+        assert response == {"id": 2, "ok": True, "cycles_completed": 20}
+        _, response = await client.request("add-monitor", session=session_id,
+                                           monitor="clock")
+        assert response["ok"]
+        _, response = await client.request("continue", session=session_id,
+                                           cycles=30)
+        assert response["cycles_completed"] == 50
+
+        chunks, response = await client.request(
+            "fetch-trace-range", session=session_id, start=3, end=40,
+            monitors=["D2.Q", "clock"])
+        assert response["ok"]
+        assert [(chunk["start"], chunk["end"]) for chunk in chunks] == \
+            [(3, 10), (10, 17), (17, 24), (24, 31), (31, 38), (38, 40)]
+        monitors = server.sessions[session_id].monitors
+        [D2, Q, CLOCK] = monitors.names.lookup(["D2", "Q", "clock"])
+        for name, monitor in [("D2.Q", (D2, Q)), ("clock", (CLOCK, None))]:
+            trace = [signal for chunk in chunks
+                     for signal in chunk["signals"][name]]
+            assert trace == monitors.monitors_dictionary[monitor][3:40]
+        # The clock was only monitored from cycle 20
+        assert chunks[0]["signals"]["clock"] == [4] * 7
+
+        chunks, response = await client.request(
+            "fetch-trace-range", session=session_id, start=20, end=50,
+            monitors=["clock"], buckets=3)
+        [chunk] = chunks
+        window, _ = monitors.query_signals([(CLOCK, None)], 20, 50)
+        assert [bucket[0] for bucket in chunk["signals"]["clock"]] == \
+            [20, 30, 40]
+        assert sum(bucket[3] for bucket in chunk["signals"]["clock"]) == \
+            sum(map(int.__ne__, window[0][1:], window[0][:-1]))
+
+        _, response = await client.request("remove-monitor",
+                                           session=session_id,
+                                           monitor="clock")
+        assert response["ok"]
+        chunks, response = await client.request("fetch-trace-range",
+                                                session=session_id)
+        assert response["monitors"] == ["D1.Q", "D2.Q", "D3.Q", "D4.Q"]
+        assert sum(chunk["end"] - chunk["start"] for chunk in chunks) == 50
+
+    run_server(tmp_path, test)
+
+
+def test_concurrent_clients(tmp_path):
+    """Test that several clients are served at once."""
+    async def run_client(socket_path, cycles):
+        client = await connect(socket_path)
+        _, response = await client.request("load", path=PATH)
+        session_id = response["session"]
+        _, response = await client.request("set-switch", session=session_id,
+                                           switch="switch2", value=1)
+        assert response["ok"]
+        _, response = await client.request("run", session=session_id,
+                                           cycles=cycles)
+        assert response["ok"]
+        chunks, response = await client.request(
+            "fetch-trace-range", session=session_id, monitors=["D4.Q"])
+        trace = [signal for chunk in chunks
+                 for signal in chunk["signals"]["D4.Q"]]
+        # Every D-type is held clear
+        assert trace == [0] * cycles
+        return session_id
+
+    async def test(server, socket_path):
+        session_ids = await asyncio.gather(*[
+            run_client(socket_path, cycles) for cycles in range(10, 60, 5)])
+        assert sorted(session_ids) == list(range(1, 11))
+        client = await connect(socket_path)
+        _, response = await client.request("sessions")
+        assert len(response["sessions"]) == 10
+        # Networks loaded while another load of the file was being parsed
+        # miss the pool
+        _, response = await client.request("pool")
+        assert response["hits"] + response["misses"] == 10
+        assert 1 <= response["misses"] <= 4
+
+    run_server(tmp_path, test)
+
+
+def test_fetch_off_event_loop(tmp_path):
+    """Test that the traces are read in the executor, chunk by chunk."""
+    async def test(server, socket_path):
+        client = await connect(socket_path)
+        _, response = await client.request("load", path=PATH)
+        session_id = response["session"]
+        _, response = await client.request("run", session=session_id,
+                                           cycles=20)
+        session = server.sessions[session_id]
+        get_trace_range = session.get_trace_range
+        threads = []
+
+        def record_thread(*args):
+            threads.append(threading.current_thread())
+            return get_trace_range(*args)
+
+        session.get_trace_range = record_thread
+        chunks, response = await client.request("fetch-trace-range",
+                                                session=session_id)
+        assert response["ok"]
+        assert len(threads) == len(chunks) == 3
+        assert threading.current_thread() not in threads
+
+    run_server(tmp_path, test)
+
+
+@pytest.mark.parametrize("command, parameters, error", [
+    ("explode", {}, "Unknown command explode"),
+    ("load", {"path": "missing.txt"},
+     "Cannot open definition file missing.txt"),
+    ("load", {}, "Missing parameter 'path'"),
+    ("run", {"session": 99, "cycles": 5}, "Unknown session 99"),
+    ("run", {"session": 1, "cycles": -5},
+     "The number of cycles must be a whole number"),
+    ("set-switch", {"session": 1, "switch": "D1", "value": 1},
+     "Unknown switch D1"),
+    ("add-monitor", {"session": 1, "monitor": "switch9"},
+     "Cannot monitor switch9"),
+    ("remove-monitor", {"session": 1, "monitor": "clock"},
+     "No monitor on clock"),
+    ("fetch-trace-range", {"session": 1, "monitors": ["clock"], "end": 5},
+     "No monitor on clock"),
+])
+def test_errors(tmp_path, command, parameters, error):
+    """Test that invalid requests give errors."""
+    async def test(server, socket_path):
+        client = await connect(socket_path)
+        _, response = await client.request("load", path=PATH)
+        _, response = await client.request("run", session=1, cycles=5)
+        _, response = await client.request(command, **parameters)
+        assert response == {"id": 3, "ok": False, "error": error}
+
+    run_server(tmp_path, test)
@@ -0,0 +1,135 @@
+"""Test the sharedtrace module."""
+import multiprocessing
+import os
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from sharedtrace import TraceReader
+
+
+@pytest.fixture
+def new_monitors():
+    """Return a Monitors instance publishing two switches and an XOR gate."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+    new_monitors = Monitors(new_names, new_devices, new_network)
+
+    [SW1, SW2, X1, I1, I2] = new_names.lookup(["Sw1", "Sw2", "X1", "I1",
+                                               "I2"])
+    new_devices.make_device(SW1, new_devices.SWITCH, [0])
+    new_devices.make_device(SW2, new_devices.SWITCH, [0])
+    new_devices.make_device(X1, new_devices.XOR)
+    new_network.make_connection(SW1, None, X1, I1)
+    new_network.make_connection(SW2, None, X1, I2)
+    new_monitors.make_monitor(SW1, None)
+    new_monitors.make_monitor(X1, None)
+
+    memory_name = "".join(["logsim_test_", str(os.getpid())])
+    assert new_monitors.publish_signals(memory_name, capacity=8)
+    yield new_monitors
+    new_monitors.stop_publishing()
+
+
+def run_cycles(monitors, cycles):
+    """Run the network, toggling Sw1 every cycle and Sw2 every third."""
+    devices = monitors.devices
+    [SW1, SW2] = monitors.names.lookup(["Sw1", "Sw2"])
+    for cycle in range(cycles):
+        devices.set_switch(SW1, cycle % 2)
+        devices.set_switch(SW2, int(cycle % 3 == 0))
+        assert monitors.network.execute_network()
+        monitors.record_signals()
+
+
+def read_latest(memory_name, cycles, queue):
+    """Put the latest signals read in another process on the queue."""
+    reader = TraceReader(memory_name)
+    signal_lists, names = reader.get_signals(cycles)
+    queue.put(([list(signals) for signals in signal_lists], names))
+    del signal_lists
+    reader.close()
+
+
+def test_read_latest_cycles(new_monitors):
+    """Test that the latest cycles are read in place from shared memory."""
+    reader = TraceReader(new_monitors.publisher.name)
+    assert [bytes(signals) for signals in reader.get_signals()[0]] == \
+        [b"", b""]
+    assert reader.get_names() == ["Sw1", "X1"]
+
+    run_cycles(new_monitors, 20)
+    signal_lists, names = reader.get_signals(5)
+    traces = new_monitors.get_signals()[0]
+    assert names == ["Sw1", "X1"]
+    assert reader.first_cycle == 15
+    assert all(isinstance(signals, memoryview) for signals in signal_lists)
+    assert [list(signals) for signals in signal_lists] == \
+        [trace[-5:] for trace in traces]
+    # The whole ring can be read, however it has wrapped around
+    assert [list(signals) for signals in reader.get_signals(100)[0]] == \
+        [trace[-8:] for trace in traces]
+    assert reader.check(15)
+
+    # Skipped and repeated cycles are published too
+    new_monitors.record_signals(3)
+    assert reader.check(15)
+    new_monitors.record_signals(1)
+    assert not reader.check(15)
+    new_monitors.repeat_signals(2, 3)
+    assert [list(signals) for signals in reader.get_signals(8)[0]] == \
+        [trace[-8:] for trace in new_monitors.get_signals()[0]]
+    del signal_lists
+    reader.close()
+
+
+def test_monitor_changes_are_published(new_monitors):
+    """Test that adding and removing monitors updates the readers."""
+    reader = TraceReader(new_monitors.publisher.name)
+    run_cycles(new_monitors, 4)
+    [SW1, SW2] = new_monitors.names.lookup(["Sw1", "Sw2"])
+    new_monitors.remove_monitor(SW1, None)
+    new_monitors.make_monitor(SW2, None, 4)
+
+    signal_lists, names = reader.get_signals()
+    assert names == ["X1", "Sw2"]
+    assert [list(signals) for signals in signal_lists] == \
+        new_monitors.get_signals()[0]
+    assert list(signal_lists[1]) == [new_monitors.devices.BLANK] * 4
+
+    new_monitors.reset_monitors()
+    assert [bytes(signals) for signals in reader.get_signals()[0]] == \
+        [b"", b""]
+    del signal_lists
+    reader.close()
+
+
+def test_read_header_times_out(new_monitors):
+    """Test that a header left in the middle of an update is reported."""
+    reader = TraceReader(new_monitors.publisher.name, timeout=0.05)
+    run_cycles(new_monitors, 3)
+    assert reader.read_header() == (2, 3)
+    new_monitors.publisher.begin_update()
+    with pytest.raises(TimeoutError):
+        reader.read_header()
+    new_monitors.publisher.end_update(3)
+    assert reader.read_header() == (2, 3)
+    reader.close()
+
+
+def test_read_in_other_process(new_monitors):
+    """Test that another process reads the published signals."""
+    run_cycles(new_monitors, 12)
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=read_latest, args=(new_monitors.publisher.name, 6, queue))
+    process.start()
+    signal_lists, names = queue.get(timeout=30)
+    process.join()
+    assert names == ["Sw1", "X1"]
+    assert signal_lists == [trace[-6:] for trace in
+                            new_monitors.get_signals()[0]]
@@ -0,0 +1,84 @@
+"""Test the stimulus module."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from stimulus import Stimulus
+
+
+@pytest.fixture
+def new_network():
+    """Return a network with two switches driving an AND gate."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    new_network = Network(new_names, new_devices)
+    new_monitors = Monitors(new_names, new_devices, new_network)
+
+    [SW1, SW2, G1, I1, I2] = new_names.lookup(["Sw1", "Sw2", "G1", "I1",
+                                               "I2"])
+    new_devices.make_device(SW1, new_devices.SWITCH, [0])
+    new_devices.make_device(SW2, new_devices.SWITCH, [1])
+    new_devices.make_device(G1, new_devices.AND, [2])
+    new_network.make_connection(SW1, None, G1, I1)
+    new_network.make_connection(SW2, None, G1, I2)
+    new_monitors.make_monitor(G1, None)
+    return [new_names, new_devices, new_network, new_monitors]
+
+
+@pytest.mark.parametrize("file_name, contents", [
+    ("stimulus.txt", "# switch the gate on and off\n"
+                     "2 Sw1=1\n"
+                     "\n"
+                     "4 Sw2=0 # comment\n"
+                     "5 Sw1=0 Sw2=1\n"),
+    ("stimulus.csv", "cycle,Sw1,Sw2\n"
+                     "2,1,\n"
+                     "4,,0\n"
+                     "5,0,1\n"),
+])
+def test_apply_changes(tmp_path, new_network, file_name, contents):
+    """Test that switch changes are applied at their cycles."""
+    [names, devices, network, monitors] = new_network
+    path = tmp_path / file_name
+    path.write_text(contents)
+    stimulus = Stimulus(names, devices, str(path))
+
+    assert stimulus.get_next_cycle() == 2
+    for cycle in range(7):
+        assert stimulus.apply_changes(cycle) == stimulus.NO_ERROR
+        assert network.execute_network()
+        monitors.record_signals()
+    assert stimulus.get_next_cycle() is None
+
+    [G1] = names.lookup(["G1"])
+    assert monitors.monitors_dictionary[(G1, None)] == [0, 0, 1, 1, 0, 0, 0]
+
+    # Restarting reads the file again
+    stimulus.restart()
+    assert stimulus.get_next_cycle() == 2
+
+
+@pytest.mark.parametrize("file_name, contents, error, line", [
+    ("stimulus.txt", "1 Sw1=1\n2 Sw1 1\n", "BAD_LINE", 2),
+    ("stimulus.txt", "3 Sw1=1\n2 Sw1=0\n", "BAD_CYCLE", 2),
+    ("stimulus.txt", "1 Sw1=1\nx Sw1=0\n", "BAD_CYCLE", 2),
+    ("stimulus.txt", "1 Sw1=1\n2 G1=0\n", "BAD_SWITCH", 2),
+    ("stimulus.txt", "1 Sw1=1\n2 Sw3=0\n", "BAD_SWITCH", 2),
+    ("stimulus.csv", "cycle,Sw1\n1,1\n2,2\n", "BAD_VALUE", 3),
+    ("stimulus.csv", "cycle,Sw1\n1,1\n2,1,0\n", "BAD_LINE", 3),
+    ("stimulus.csv", "time,Sw1\n1,1\n", "BAD_LINE", 1),
+])
+def test_stimulus_errors(tmp_path, new_network, file_name, contents, error,
+                         line):
+    """Test that invalid lines in the stimulus file are reported."""
+    [names, devices, network, monitors] = new_network
+    path = tmp_path / file_name
+    path.write_text(contents)
+    stimulus = Stimulus(names, devices, str(path))
+
+    error_type = stimulus.apply_changes(5)
+    assert error_type == getattr(stimulus, error)
+    assert stimulus.get_error_message().startswith(
+        "Stimulus line {}: ".format(line))
@@ -0,0 +1,209 @@
+"""Test the vector module."""
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from names import Names  # noqa: E402
+from devices import Devices  # noqa: E402
+from network import Network  # noqa: E402
+from monitors import Monitors  # noqa: E402
+from scanner import Scanner  # noqa: E402
+from parse import Parser  # noqa: E402
+from stimulus import Stimulus  # noqa: E402
+from scheduler import Scheduler  # noqa: E402
+from generator import CircuitGenerator  # noqa: E402
+from vector import VectorEngine  # noqa: E402
+from userint import UserInterface  # noqa: E402
+
+
+DEFINITION = """DEVICES {
+clk: CLOCK, period 3;
+sig: SIGGEN, sequence 0, 1, 1, 0, 1;
+sw1: SWITCH, initial 0;
+sw2: SWITCH, initial 1;
+a: AND, inputs 3;
+b: NOR, inputs 2;
+x: XOR;
+n: NAND, inputs 1;
+o: OR, inputs 2;
+}
+CONNECT{
+clk = a.I1;
+sig = a.I2;
+sw1 = a.I3;
+a = x.I1;
+sw2 = x.I2;
+x = n.I1;
+n = o.I1;
+b = o.I2;
+sig = b.I1;
+sw2 = b.I2;
+}
+MONITOR{
+o;
+x;
+clk;
+sw1;
+}
+END
+"""
+
+STIMULUS = """3 sw1=1
+40 sw2=0 sw1=1
+41 sw2=1
+95 sw1=0
+"""
+
+
+def load(tmp_path, text, stimulus_text=None, seed=0):
+    """Return the network objects of a definition file and stimulus."""
+    path = tmp_path / "definition.txt"
+    path.write_text(text)
+    random.seed(seed)
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    parser = Parser(names, devices, network, monitors,
+                    Scanner(str(path), names))
+    assert parser.parse_network()
+    stimulus = None
+    if stimulus_text is not None:
+        stimulus_path = tmp_path / "stimulus.txt"
+        stimulus_path.write_text(stimulus_text)
+        stimulus = Stimulus(names, devices, str(stimulus_path))
+    return [names, devices, network, monitors, stimulus]
+
+
+def get_state(devices):
+    """Return the signals and counters of every device."""
+    return [(device.device_id, device.outputs, device.clock_counter,
+             device.siggen_counter, device.switch_state)
+            for device in devices.devices_list]
+
+
+def run_both(tmp_path, text, stimulus_text, runs, seed=0, block_cycles=7):
+    """Run with the scheduler and the engine, and return both results."""
+    results = []
+    for engine_class in [Scheduler, VectorEngine]:
+        [names, devices, network, monitors, stimulus] = load(
+            tmp_path, text, stimulus_text, seed)
+        if engine_class is Scheduler:
+            engine = Scheduler(names, devices, network, monitors, stimulus,
+                               detect_periods=False, prune=False)
+        else:
+            engine = VectorEngine(names, devices, network, monitors,
+                                  stimulus, block_cycles)
+        first_cycle = 0
+        errors = []
+        for cycles in runs:
+            errors.append(engine.run(cycles, first_cycle) == engine.NO_ERROR)
+            first_cycle += cycles
+        results.append((errors, monitors.get_signals(), get_state(devices)))
+    return results
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_run_matches_scheduler(tmp_path, seed):
+    """Test that the engine gives the same traces and state."""
+    scalar, vector = run_both(tmp_path, DEFINITION, STIMULUS, [50, 0, 73],
+                              seed)
+    assert vector == scalar
+    # The switch changes show in the traces
+    [traces, names] = vector[1]
+    assert traces[names.index("sw1")][:5] == [0, 0, 0, 1, 1]
+
+
+@pytest.mark.parametrize("seed", [3, 4])
+def test_random_network_matches_scheduler(tmp_path, seed):
+    """Test that generated networks give the same traces and state."""
+    text = CircuitGenerator(seed, sequence_length=5).make_random_dag(
+        80, depth=5)
+    scalar, vector = run_both(tmp_path, text, None, [30, 45], seed,
+                              block_cycles=16)
+    assert vector == scalar
+    # The scalar engine carries on from the state left by the engine
+    [names, devices, network, monitors, stimulus] = load(tmp_path, text,
+                                                         seed=seed)
+    engine = VectorEngine(names, devices, network, monitors)
+    assert engine.run(30) == engine.NO_ERROR
+    scheduler = Scheduler(names, devices, network, monitors,
+                          detect_periods=False)
+    assert scheduler.run(45, 30) == scheduler.NO_ERROR
+    assert monitors.get_signals() == vector[1]
+
+
+@pytest.mark.parametrize("block_cycles", [7, 1000])
+def test_run_to_last_change(tmp_path, block_cycles):
+    """Test that a run without cycles stops after the last change."""
+    [names, devices, network, monitors, stimulus] = load(
+        tmp_path, DEFINITION, STIMULUS)
+    engine = VectorEngine(names, devices, network, monitors, stimulus,
+                          block_cycles)
+    assert engine.run(None) == engine.NO_ERROR
+    assert engine.cycles_run == 96
+    vector = (monitors.get_signals(), get_state(devices))
+
+    [names, devices, network, monitors, stimulus] = load(
+        tmp_path, DEFINITION, STIMULUS)
+    scheduler = Scheduler(names, devices, network, monitors, stimulus,
+                          detect_periods=False, prune=False)
+    assert scheduler.run(96) == scheduler.NO_ERROR
+    assert vector == (monitors.get_signals(), get_state(devices))
+
+
+def test_batch_run_uses_engine(tmp_path, capsys):
+    """Test that batch runs use the engine unless the network has memory."""
+    for text, report in [(DEFINITION, "Evaluated 96 cycles of 5 gates"),
+                         (CircuitGenerator(0).make_ring_counter(3),
+                          "Executed ")]:
+        [names, devices, network, monitors, stimulus] = load(
+            tmp_path, text, STIMULUS if text == DEFINITION else None)
+        user_interface = UserInterface(names, devices, network, monitors,
+                                       None, stimulus)
+        assert user_interface.batch_run(None if stimulus else 20)
+        assert report in capsys.readouterr().out
+    assert user_interface.cycles_completed == 20
+
+
+def test_bad_stimulus(tmp_path):
+    """Test that a bad stimulus stops the run where the scheduler does."""
+    scalar, vector = run_both(tmp_path, DEFINITION,
+                              "3 sw1=1\n40 sw2=0\n41 sw2=2\n", [100])
+    assert vector == scalar
+    assert vector[0] == [False]
+
+
+def test_not_combinational(tmp_path):
+    """Test that networks with D-types are not run."""
+    [names, devices, network, monitors, stimulus] = load(
+        tmp_path, CircuitGenerator(0).make_ring_counter(3))
+    engine = VectorEngine(names, devices, network, monitors)
+    assert engine.run(10) == engine.NOT_COMBINATIONAL
+    assert all(signal_list == [] for signal_list in
+               monitors.monitors_dictionary.values())
+
+
+def test_evaluate(tmp_path):
+    """Test that the waveforms of the sources give those of the gates."""
+    [names, devices, network, monitors, stimulus] = load(
+        tmp_path, CircuitGenerator(0).make_ripple_adder(3))
+    engine = VectorEngine(names, devices, network, monitors)
+    (gates, sources) = engine.compile_network()
+    # Every pair of 3 bit operands, one in each cycle
+    words = np.arange(64)
+    switch_signals = {}
+    for operand, shift in [("a", 0), ("b", 3)]:
+        for bit in range(3):
+            [device_id] = names.lookup(["".join([operand, str(bit)])])
+            switch_signals[(device_id, None)] = (words >> (shift + bit)) & 1
+    assert set(sources) == set(switch_signals)
+
+    output_ids = names.lookup(["".join(["s", str(bit)]) for bit in range(4)])
+    signals = engine.evaluate(switch_signals, [(device_id, None) for
+                                               device_id in output_ids])
+    total = sum(signals[(device_id, None)].astype(int) << bit
+                for bit, device_id in enumerate(output_ids))
+    assert total.tolist() == ((words & 7) + (words >> 3)).tolist()
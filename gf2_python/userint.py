@@ -7,6 +7,9 @@ Classes:
 --------
 UserInterface - reads and parses user commands.
 """
+from scheduler import Scheduler
+from vector import VectorEngine
+from faults import FaultSimulator
 
 
 class UserInterface:
@@ -23,6 +26,11 @@ class UserInterface:
     devices: instance of the devices.Devices() class.
     network: instance of the network.Network() class.
     monitors: instance of the monitors.Monitors() class.
+    stimulus: instance of the stimulus.Stimulus() class, or None. Its switch
+              changes are applied while the network runs.
+    display_options: dictionary of keyword arguments of
+                     Monitors.display_signals(), such as the width and
+                     min_run of the displayed traces, or None.
 
     Public methods:
     ---------------
@@ -57,20 +65,39 @@ class UserInterface:
 
     zap_command(self): Removes the specified monitor.
 
+    run_cycles(self, cycles): Runs the network for the specified number of
+                              simulation cycles.
+
     run_network(self, cycles): Runs the network for the specified number of
-                               simulation cycles.
+                               simulation cycles and displays the signals.
 
     run_command(self): Runs the simulation from scratch.
 
     continue_command(self): Continues a previously run simulation.
+
+    vector_run(self, cycles=None): Runs a combinational network over all
+                                   the cycles of a batch run at once.
+
+    batch_run(self, cycles=None): Runs the simulation from scratch without
+                                  reading commands.
+
+    fault_run(self, cycles=None): Grades the stimulus by the stuck-at faults
+                                  of the network it detects.
     """
 
-    def __init__(self, names, devices, network, monitors, scanner):
+    def __init__(self, names, devices, network, monitors, scanner,
+                 stimulus=None, display_options=None):
         """Initialise variables."""
         self.names = names
         self.devices = devices
         self.monitors = monitors
         self.network = network
+        self.stimulus = stimulus
+        self.display_options = display_options or {}
+        self.scheduler = Scheduler(names, devices, network, monitors,
+                                   stimulus)
+        self.vector_engine = VectorEngine(names, devices, network, monitors,
+                                          stimulus)
 
         self.cycles_completed = 0  # number of simulation cycles completed
 
@@ -168,6 +195,11 @@ class UserInterface:
                 return None
         else:
             port_id = None
+        if self.character == "[":  # a single bit of a bus output
+            bit = self.read_number(0, None)
+            if bit is None:
+                return None
+            port_id = self.devices.make_bit_port(port_id, bit)
         return [device_id, port_id]
 
     def read_number(self, lower_bound, upper_bound):
@@ -204,7 +236,7 @@ class UserInterface:
         print("r N       - run the simulation for N cycles")
         print("c N       - continue the simulation for N cycles")
         print("s X N     - set switch X to N (0 or 1)")
-        print("m X       - set a monitor on signal X")
+        print("m X       - set a monitor on signal X (X[n] for bus bit n)")
         print("z X       - zap the monitor on signal X")
         print("h         - help (this command)")
         print("q         - quit the program")
@@ -242,18 +274,31 @@ class UserInterface:
             else:
                 print("Error! Could not zap monitor.")
 
+    def run_cycles(self, cycles):
+        """Run the network for the specified number of simulation cycles.
+
+        Switch changes in the stimulus are applied at their cycles, counting
+        from the start of the run. Return True if successful.
+        """
+        error_type = self.scheduler.run(cycles, self.cycles_completed)
+        if error_type == self.scheduler.OSCILLATING:
+            print("Error! Network oscillating.")
+            return False
+        elif error_type == self.scheduler.BAD_STIMULUS:
+            print("".join(["Error! ", self.stimulus.get_error_message()]))
+            return False
+        return True
+
     def run_network(self, cycles):
         """Run the network for the specified number of simulation cycles.
 
         Return True if successful.
         """
-        for _ in range(cycles):
-            if self.network.execute_network():
-                self.monitors.record_signals()
-            else:
-                print("Error! Network oscillating.")
-                return False
-        self.monitors.display_signals()
+        self.scheduler.reset_report()
+        if not self.run_cycles(cycles):
+            return False
+        self.monitors.display_signals(**self.display_options)
+        print(self.scheduler.get_report())
         return True
 
     def run_command(self):
@@ -263,6 +308,8 @@ class UserInterface:
 
         if cycles is not None:  # if the number of cycles provided is valid
             self.monitors.reset_monitors()
+            if self.stimulus is not None:
+                self.stimulus.restart()
             print("".join(["Running for ", str(cycles), " cycles"]))
             self.devices.cold_startup()
             if self.run_network(cycles):
@@ -278,3 +325,95 @@ class UserInterface:
                 self.cycles_completed += cycles
                 print(" ".join(["Continuing for", str(cycles), "cycles.",
                                 "Total:", str(self.cycles_completed)]))
+
+    def vector_run(self, cycles=None):
+        """Run a combinational network over all the cycles at once.
+
+        The network is run by the vector engine, from the cycles already
+        completed. If cycles is None, run until the last change in the
+        stimulus has been applied. Return None if the network has memory or
+        loops, so that the engine cannot run it, True if the run is
+        successful, and False if not.
+        """
+        if self.scheduler.prune:
+            # Devices that cannot affect a monitor are left out of the run
+            self.scheduler.update_cone()
+        error_type = self.vector_engine.run(cycles, self.cycles_completed)
+        if error_type == self.vector_engine.NOT_COMBINATIONAL:
+            return None
+        self.cycles_completed += self.vector_engine.cycles_run
+        if error_type == self.vector_engine.BAD_STIMULUS:
+            print("".join(["Error! ", self.stimulus.get_error_message()]))
+            return False
+        return True
+
+    def batch_run(self, cycles=None):
+        """Run the simulation from scratch without reading commands.
+
+        If cycles is None, run until the last change in the stimulus has
+        been applied. Every switch is fixed, so that the logic it decides
+        is folded until the stimulus first changes it. Combinational
+        networks are run by the vector engine, and others by the scheduler.
+        Return True if successful.
+        """
+        self.cycles_completed = 0
+        self.monitors.reset_monitors()
+        # The stimulus is not read ahead, so a switch is only unfolded when
+        # it is first set to a new state
+        self.devices.fix_switches(
+            self.devices.find_devices(self.devices.SWITCH))
+        self.devices.cold_startup()
+        self.scheduler.reset_report()
+        vectorised = self.vector_run(cycles)
+        if vectorised is False:
+            return False
+        elif vectorised is None and cycles is None:
+            # Run one stimulus segment at a time, as the file is only read
+            # as far as the simulation has reached
+            while self.stimulus is not None and \
+                    self.stimulus.get_next_cycle() is not None:
+                segment = self.stimulus.get_next_cycle() + 1 - \
+                    self.cycles_completed
+                if not self.run_cycles(segment):
+                    return False
+                self.cycles_completed += segment
+        elif vectorised is None:
+            if not self.run_cycles(cycles):
+                return False
+            self.cycles_completed += cycles
+        if cycles is None and self.stimulus is not None and \
+                self.stimulus.error_type != self.stimulus.NO_ERROR:
+            print("".join(["Error! ", self.stimulus.get_error_message()]))
+            return False
+        self.monitors.display_signals(**self.display_options)
+        if vectorised:
+            print(self.vector_engine.get_report())
+        else:
+            print(self.scheduler.get_report())
+        return True
+
+    def fault_run(self, cycles=None):
+        """Grade the stimulus by the stuck-at faults it detects.
+
+        Every stuck-at fault of the network is simulated from a cold
+        start-up, and the fault coverage is printed. If cycles is None, run
+        until the last change in the stimulus has been applied. Return True
+        if successful.
+        """
+        self.devices.cold_startup()
+        fault_simulator = FaultSimulator(self.names, self.devices,
+                                         self.network, self.monitors,
+                                         self.stimulus)
+        error_type = fault_simulator.run(cycles)
+        if error_type == fault_simulator.NOT_SUPPORTED:
+            print("Error! Fault simulation needs a network without buses "
+                  "or unconnected inputs.")
+            return False
+        elif error_type == fault_simulator.OSCILLATING:
+            print("Error! Network oscillating.")
+            return False
+        elif error_type == fault_simulator.BAD_STIMULUS:
+            print("".join(["Error! ", self.stimulus.get_error_message()]))
+            return False
+        print(fault_simulator.get_report())
+        return True
@@ -0,0 +1,423 @@
+"""Run combinational networks over all the cycles of a run at once.
+
+Used in the Logic Simulator project to run long simulations of networks
+without memory quickly. When the only devices are switches, clocks and
+signal generators driving logic gates without loops, the settled signals
+of a cycle depend only on the sources in that cycle. The waveforms of the
+sources are known before the run, from the clock and signal generator
+counters and the stimulus file, so each gate is evaluated once over every
+cycle as a NumPy array, after the gates that drive it. Without NumPy, no
+network can be run by the engine.
+
+Classes
+-------
+VectorEngine - runs combinational networks over many cycles at once.
+"""
+import collections
+
+try:
+    import numpy as np
+except ImportError:  # every network is then run by the scalar engine
+    np = None
+
+
+class VectorEngine:
+    """Run combinational networks over many cycles at once.
+
+    The monitor traces and the state of the devices after a run are the
+    same as if Scheduler.run had executed every cycle. The traces hold the
+    levels the network settles to in each cycle, as recorded by
+    Monitors.record_signals, so they only contain LOW and HIGH; a RISING or
+    FALLING signal is never settled. Networks that the scalar engine would
+    find oscillating because they take more than its limit of passes to
+    settle are run to their settled signals.
+
+    The cycles are evaluated in blocks of block_cycles, and the signal of a
+    gate is dropped once every gate that reads it has been evaluated, so
+    memory does not grow with the length of the run. The stimulus is read
+    one block at a time, as the run reaches it.
+
+    Parameters
+    ----------
+    names: instance of the names.Names() class.
+    devices: instance of the devices.Devices() class.
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class.
+    stimulus: instance of the stimulus.Stimulus() class, or None.
+    block_cycles: number of cycles evaluated together.
+
+    Public methods
+    --------------
+    compile_network(self): Returns the gates in the order they are
+                           evaluated and the signals they read from other
+                           devices.
+
+    is_source(self, key): Returns True if the engine can find the signals
+                          of an output that is not driven by a gate.
+
+    evaluate(self, sources, keys=None, last_signals=None): Returns the
+                           signals of the gates over every cycle, given the
+                           signals of their sources.
+
+    get_switch_changes(self, start, end, first_cycle,
+                       to_last_change=False): Applies the stimulus for a
+                           block of cycles and returns the changes of every
+                           switch.
+
+    get_source_signals(self, key, start, end, switch_changes): Returns the
+                           signal of a source over a block of cycles.
+
+    run(self, cycles, first_cycle=0): Runs the network for the specified
+                                      number of simulation cycles.
+
+    set_final_state(self, cycles, switch_changes, last_signals): Leaves the
+                           devices as they are after the last cycle of a
+                           run.
+
+    get_report(self): Returns a description of the last run.
+    """
+
+    def __init__(self, names, devices, network, monitors, stimulus=None,
+                 block_cycles=1 << 16):
+        """Initialise the engine errors and the compiled network."""
+        self.names = names
+        self.devices = devices
+        self.network = network
+        self.monitors = monitors
+        self.stimulus = stimulus
+        self.block_cycles = block_cycles
+
+        [self.NO_ERROR, self.NOT_COMBINATIONAL,
+         self.BAD_STIMULUS] = self.names.unique_error_codes(3)
+
+        # The compiled network and the schedule it was compiled from
+        self.compiled = None
+        self.compiled_schedule = None
+        self.gate_ids = set()
+
+        # Number of cycles run by the last run
+        self.cycles_run = 0
+
+    def compile_network(self):
+        """Return the gates in the order they are evaluated.
+
+        Return (gates, sources), where gates is a list of (device_id,
+        device_kind, input_keys, released_keys) in which every gate follows
+        the gates that drive it, and sources lists the (device_id, port_id)
+        keys read by the gates that are not the outputs of gates.
+        released_keys are the keys read for the last time by the gate.
+
+        Return None if NumPy is not installed, or if the network has active
+        D-types or bus devices, a gate with an input that is unconnected or
+        connected to a single bit of a bus, a source that is not settled, or
+        a loop. The result is compiled again whenever the schedule of the
+        network is made again.
+        """
+        if np is None:
+            return None
+        schedule = self.network.get_schedule()
+        if self.compiled_schedule is schedule:
+            return self.compiled
+        self.compiled_schedule = schedule
+        self.compiled = None
+
+        for device_kind in [self.devices.D_TYPE] + self.devices.bus_types:
+            if schedule[device_kind]:
+                return None
+        gate_ids = [device_id for device_kind in self.devices.gate_types
+                    for device_id in schedule[device_kind]]
+        self.gate_ids = set(gate_ids)
+
+        # waiting stores {device_id: inputs driven by gates not yet ordered}
+        inputs = {}
+        waiting = {}
+        readers = collections.defaultdict(list)
+        for device_id in gate_ids:
+            device = self.devices.get_device(device_id)
+            input_keys = list(device.inputs.values())
+            for key in input_keys:
+                if key is None or key[1] not in \
+                        self.devices.get_device(key[0]).outputs:
+                    return None  # unconnected, or a single bit of a bus
+            inputs[device_id] = input_keys
+            waiting[device_id] = 0
+            for (output_device_id, output_port_id) in input_keys:
+                if output_device_id in self.gate_ids:
+                    waiting[device_id] += 1
+                    readers[output_device_id].append(device_id)
+
+        # The gates are ordered depth first, so that signals are dropped
+        # soon after they are made
+        ready = [device_id for device_id in reversed(gate_ids)
+                 if waiting[device_id] == 0]
+        order = []
+        while ready:
+            device_id = ready.pop()
+            order.append(device_id)
+            for reader in readers[device_id]:
+                waiting[reader] -= 1
+                if waiting[reader] == 0:
+                    ready.append(reader)
+        if len(order) < len(gate_ids):  # the network has a loop
+            return None
+
+        sources = []
+        last_reads = {}
+        for index, device_id in enumerate(order):
+            for key in inputs[device_id]:
+                if key[0] not in self.gate_ids and key not in last_reads:
+                    if not self.is_source(key):
+                        return None
+                    sources.append(key)
+                last_reads[key] = index
+        released = collections.defaultdict(list)
+        for key, index in last_reads.items():
+            released[index].append(key)
+        gates = [(device_id, self.devices.get_device(device_id).device_kind,
+                  inputs[device_id], released[index])
+                 for index, device_id in enumerate(order)]
+
+        self.compiled = (gates, sources)
+        return self.compiled
+
+    def is_source(self, key):
+        """Return True if the engine can find the signals of the output.
+
+        The output must be of an active switch, clock or signal generator,
+        or of an inactive device whose signal is settled and stays as it is.
+        """
+        (device_id, port_id) = key
+        device = self.devices.get_device(device_id)
+        if self.network.active_devices is None or \
+                device_id in self.network.active_devices:
+            return device.device_kind in [self.devices.SWITCH,
+                                          self.devices.CLOCK,
+                                          self.devices.SIGGEN]
+        return device.outputs.get(port_id) in [self.devices.LOW,
+                                               self.devices.HIGH]
+
+    def evaluate(self, sources, keys=None, last_signals=None):
+        """Return the signals of the gates over every cycle.
+
+        sources is a dictionary of {(device_id, port_id): signals} for the
+        sources of compile_network, where signals is an array of the LOW
+        or HIGH signal in each cycle. Return a dictionary of the same form
+        for the given keys, or for every gate if keys is None, with arrays
+        of uint8. If last_signals is a dictionary, the signal of every gate
+        in the last cycle is stored in it. Return None if the network cannot
+        be run by the engine.
+        """
+        compiled = self.compile_network()
+        if compiled is None:
+            return None
+        (gates, source_keys) = compiled
+        if keys is None:
+            keys = [(device_id, None) for (device_id, device_kind,
+                                           input_keys, released_keys) in gates]
+        kept_keys = set(keys)
+
+        signals = {key: np.asarray(sources[key], dtype=bool)
+                   for key in source_keys}
+        for (device_id, device_kind, input_keys, released_keys) in gates:
+            if device_kind == self.devices.XOR:
+                output = np.not_equal(signals[input_keys[0]],
+                                      signals[input_keys[1]])
+            else:
+                if device_kind in [self.devices.AND, self.devices.NAND]:
+                    combine = np.logical_and
+                else:
+                    combine = np.logical_or
+                output = signals[input_keys[0]].copy()
+                for key in input_keys[1:]:
+                    combine(output, signals[key], out=output)
+                if device_kind in [self.devices.NAND, self.devices.NOR]:
+                    np.logical_not(output, out=output)
+            signals[(device_id, None)] = output
+            if last_signals is not None and len(output):
+                last_signals[(device_id, None)] = int(output[-1])
+            for key in released_keys:
+                if key not in kept_keys:
+                    del signals[key]
+
+        return {key: signals[key].view(np.uint8) if key in signals
+                else np.asarray(sources[key], dtype=np.uint8)
+                for key in keys}
+
+    def get_switch_changes(self, start, end, first_cycle,
+                           to_last_change=False):
+        """Apply the stimulus for a block of the run and return the changes.
+
+        start and end count from the start of the run, and first_cycle is
+        the number of cycles run before it. Return (switch_changes, end,
+        error_type), where switch_changes is a dictionary of {switch_id:
+        (offsets, signals)} giving the signal of the switch from each
+        offset, counted from the start of the run. If the stimulus has an
+        error, end is shortened to the cycle before the one at which the
+        scalar engine would report it. If to_last_change is True and the
+        last change in the stimulus is in the block, end is shortened to
+        the cycle after it.
+        """
+        switch_ids = self.network.get_schedule()[self.devices.SWITCH]
+        changes = {}
+        error_type = self.NO_ERROR
+        last_change = start - 1  # the last cycle the stimulus set switches
+        if self.stimulus is not None:
+            next_cycle = self.stimulus.get_next_cycle()
+            if next_cycle is not None and next_cycle <= first_cycle + start:
+                last_change = start
+            error_type = self.stimulus.apply_changes(first_cycle + start)
+            if error_type != self.stimulus.NO_ERROR:
+                end = start
+        for switch_id in switch_ids:
+            changes[switch_id] = (
+                [start], [self.devices.get_device(switch_id).switch_state])
+
+        while self.stimulus is not None and \
+                error_type == self.stimulus.NO_ERROR:
+            cycle = self.stimulus.get_next_cycle()
+            if cycle is None or cycle >= first_cycle + end:
+                break
+            error_type = self.stimulus.apply_changes(cycle)
+            last_change = cycle - first_cycle
+            if error_type != self.stimulus.NO_ERROR:
+                end = last_change
+            for switch_id in switch_ids:
+                (offsets, signals) = changes[switch_id]
+                switch_state = self.devices.get_device(switch_id).switch_state
+                if switch_state != signals[-1]:
+                    offsets.append(last_change)
+                    signals.append(switch_state)
+
+        switch_changes = {
+            switch_id: (np.array(offsets), np.array(signals, dtype=bool))
+            for switch_id, (offsets, signals) in changes.items()}
+        if self.stimulus is not None and \
+                error_type != self.stimulus.NO_ERROR:
+            return (switch_changes, end, self.BAD_STIMULUS)
+        if to_last_change and (self.stimulus is None or
+                               self.stimulus.get_next_cycle() is None):
+            end = last_change + 1
+        return (switch_changes, end, self.NO_ERROR)
+
+    def get_source_signals(self, key, start, end, switch_changes):
+        """Return the signals of a source from cycle start to end.
+
+        start and end count from the start of the run, and the clock and
+        signal generator counters are those at the start of the run.
+        """
+        (device_id, port_id) = key
+        device = self.devices.get_device(device_id)
+        if device_id in switch_changes:
+            (offsets, signals) = switch_changes[device_id]
+            return signals[np.searchsorted(
+                offsets, np.arange(start, end), side="right") - 1]
+        if self.network.active_devices is None or \
+                device_id in self.network.active_devices:
+            # Counters wrap at cycles counted from 0 at which
+            # (cycle + clock_counter) is a multiple of the half period
+            wraps = ((np.arange(start, end) + device.clock_counter) //
+                     device.clock_half_period)
+            if device.device_kind == self.devices.CLOCK:
+                return (wraps & 1).astype(bool) ^ (
+                    device.outputs[None] in [self.devices.HIGH,
+                                             self.devices.RISING])
+            sequence = np.array(device.siggen_signal, dtype=bool)
+            return sequence[(wraps + device.siggen_counter) % len(sequence)]
+        return np.full(end - start, device.outputs[port_id] ==
+                       self.devices.HIGH)
+
+    def run(self, cycles, first_cycle=0):
+        """Run the network for the specified number of simulation cycles.
+
+        first_cycle is the number of cycles already run, used to apply the
+        stimulus at the right cycles. If cycles is None, run until the last
+        change in the stimulus has been applied. The number of cycles run is
+        left in cycles_run. Return self.NO_ERROR if successful, or the
+        corresponding error if not.
+        """
+        self.cycles_run = 0
+        compiled = self.compile_network()
+        if compiled is None:
+            return self.NOT_COMBINATIONAL
+        (gates, sources) = compiled
+        monitored_keys = list(self.monitors.monitors_dictionary)
+        source_keys = list(sources)
+        for key in monitored_keys:
+            if key[0] not in self.gate_ids and key not in source_keys:
+                if not self.is_source(key):
+                    return self.NOT_COMBINATIONAL
+                source_keys.append(key)
+
+        last_signals = {}
+        switch_changes = None  # the changes of the last block run
+        error_type = self.NO_ERROR
+        while error_type == self.NO_ERROR:
+            start = self.cycles_run
+            if cycles is None:
+                if self.stimulus is None or \
+                        self.stimulus.get_next_cycle() is None:
+                    break
+                end = start + self.block_cycles
+            elif start < cycles:
+                end = min(start + self.block_cycles, cycles)
+            else:
+                break
+            (block_changes, end, error_type) = self.get_switch_changes(
+                start, end, first_cycle, to_last_change=cycles is None)
+            if end <= start:
+                break
+            block_sources = {key: self.get_source_signals(
+                key, start, end, block_changes) for key in source_keys}
+            signals = self.evaluate(block_sources, monitored_keys,
+                                    last_signals)
+            for key in monitored_keys:
+                self.monitors.monitors_dictionary[key].extend(
+                    signals[key].tolist())
+            if self.monitors.publisher is not None:
+                self.monitors.publisher.append(self.monitors)
+            switch_changes = block_changes
+            self.cycles_run = end
+
+        if self.cycles_run > 0:
+            self.set_final_state(self.cycles_run, switch_changes,
+                                 last_signals)
+        return error_type
+
+    def set_final_state(self, cycles, switch_changes, last_signals):
+        """Leave the devices as they are after the last cycle of the run."""
+        schedule = self.network.get_schedule()
+        for device_id in (schedule[self.devices.CLOCK] +
+                          schedule[self.devices.SIGGEN]):
+            device = self.devices.get_device(device_id)
+            wraps = ((device.clock_counter + cycles - 1) //
+                     device.clock_half_period)
+            if device.device_kind == self.devices.CLOCK:
+                if (device.outputs[None] in [self.devices.HIGH,
+                                             self.devices.RISING]) ^ \
+                        (wraps & 1):
+                    device.outputs[None] = self.devices.HIGH
+                else:
+                    device.outputs[None] = self.devices.LOW
+            else:
+                device.siggen_counter = ((device.siggen_counter + wraps) %
+                                         len(device.siggen_signal))
+                device.outputs[None] = \
+                    device.siggen_signal[device.siggen_counter]
+            device.clock_counter += cycles - wraps * device.clock_half_period
+
+        for switch_id, (offsets, signals) in switch_changes.items():
+            device = self.devices.get_device(switch_id)
+            device.outputs[None] = int(signals[
+                np.searchsorted(offsets, cycles - 1, side="right") - 1])
+        for (device_id, port_id), signal in last_signals.items():
+            self.devices.get_device(device_id).outputs[port_id] = signal
+
+        # The gate outputs were set without updating the words the scalar
+        # engine uses to skip gates, so every gate is executed next time
+        self.network.gate_words = {}
+        self.network.steady_state = True
+
+    def get_report(self):
+        """Return a description of the last run."""
+        return "".join(["Evaluated ", str(self.cycles_run), " cycles of ",
+                        str(len(self.gate_ids)), " gates at once."])